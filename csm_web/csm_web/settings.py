@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
+import datetime
 import os
 
 import sentry_sdk
@@ -67,6 +68,7 @@ INSTALLED_APPS = [
     "frontend",
     "django_extensions",
     "django.contrib.postgres",
+    "psqlextra",
 ]
 
 SHELL_PLUS_SUBCLASSES_IMPORT = [ModelSerializer, Serializer, DjangoModelFactory]
@@ -108,6 +110,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
 POSTGRES_EXTRA_AUTO_EXTENSION_SET_UP = False
 POSTGRES_EXTRA_DB_BACKEND_BASE = "django.db.backends.postgresql"
+# creates upcoming partitions of partitioned tables (`manage.py manage_partitions`)
+PSQLEXTRA_PARTITIONING_MANAGER = "scheduler.partitioning.manager"
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
@@ -241,12 +245,12 @@ SESSION_COOKIE_SAMESITE = None
 
 # REST Framework
 REST_FRAMEWORK = {
-    "DEFAULT_RENDERER_CLASSES": [
-        "djangorestframework_camel_case.render.CamelCaseJSONRenderer"
-    ],
+    # drop-in replacements for djangorestframework_camel_case's renderer and parser,
+    # which use orjson if it is installed
+    "DEFAULT_RENDERER_CLASSES": ["scheduler.camel_case.CamelCaseJSONRenderer"],
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
     "DEFAULT_PARSER_CLASSES": [
-        "djangorestframework_camel_case.parser.CamelCaseJSONParser",
+        "scheduler.camel_case.CamelCaseJSONParser",
     ],
 }
 
@@ -263,6 +267,12 @@ CACHES = {
     }
 }
 
+# Background exports (see scheduler.models.ExportJob)
+# identical export requests reuse an export finished within this time
+EXPORT_JOB_MAX_AGE = datetime.timedelta(minutes=15)
+# running exports that have made no progress within this time are restarted
+EXPORT_JOB_TIMEOUT = datetime.timedelta(minutes=10)
+
 # Logging
 LOGGING = {
     "version": 1,
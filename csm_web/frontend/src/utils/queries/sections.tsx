@@ -75,7 +75,7 @@ export const useSectionAttendances = (id: number): UseQueryResult<RawAttendance[
       if (isNaN(id)) {
         throw new PermissionError("Invalid section id");
       }
-      const response = await fetchNormalized(`/sections/${id}/attendance`);
+      const response = await fetchNormalized(`/sections/${id}/attendance?all=true`);
       if (response.ok) {
         return await response.json();
       } else {
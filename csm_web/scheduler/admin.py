@@ -1,3 +1,5 @@
+from collections import Counter
+
 from django.contrib import admin, messages
 from django.core.exceptions import ValidationError
 from django.db import transaction
@@ -8,6 +10,7 @@ from scheduler.models import (
     Attendance,
     Coordinator,
     Course,
+    Holiday,
     Mentor,
     Override,
     Section,
@@ -180,6 +183,11 @@ class AttendanceInline(admin.TabularInline):
     show_change_link = True
 
 
+class HolidayInline(admin.TabularInline):
+    model = Holiday
+    extra = 0
+
+
 # Admin views
 
 
@@ -317,7 +325,7 @@ class StudentAdmin(BasePermissionModelAdmin):
         queryset = (
             super()
             .get_queryset(request)
-            .select_related("user", "course", "section__mentor")
+            .select_related("user", "course", "section__mentor", "attendance_summary")
         )
         if request.user.is_superuser:
             return queryset
@@ -332,7 +340,7 @@ class StudentAdmin(BasePermissionModelAdmin):
     )
     def drop_students(self, request, queryset):
         """Drop students from a section."""
-        queryset.update(active=False)
+        self._set_students_active(queryset, False)
 
     @admin.action(
         description=(
@@ -341,7 +349,26 @@ class StudentAdmin(BasePermissionModelAdmin):
     )
     def undrop_students(self, request, queryset):
         """Undrop students from a section."""
-        queryset.update(active=True)
+        self._set_students_active(queryset, True)
+
+    def _set_students_active(self, queryset, active: bool):
+        """
+        Set the active status for all students in the queryset,
+        adjusting the seat counts of the affected sections in the same transaction.
+        """
+        with transaction.atomic():
+            # lock the students to be changed, so that concurrent changes can't double count
+            changed = dict(
+                queryset.select_for_update()
+                .filter(active=not active)
+                .values_list("pk", "section")
+            )
+            delta = 1 if active else -1
+            section_deltas = Counter()
+            for section_id in changed.values():
+                section_deltas[section_id] += delta
+            Student.objects.filter(pk__in=changed).update(active=active)
+            Section.adjust_enrolled_counts(section_deltas)
 
     # Custom fields
 
@@ -401,17 +428,20 @@ class StudentAdmin(BasePermissionModelAdmin):
     @admin.display(description="Present count")
     def get_present_count(self, obj: Student):
         """Retrieve the number of present attendances for this student."""
-        return obj.attendance_set.filter(presence="PR").count()
+        summary = obj.attendance_summary
+        return summary.present_count if summary is not None else 0
 
     @admin.display(description="Excused count")
     def get_excused_absence_count(self, obj: Student):
         """Retrieve the number of excused absences for this student."""
-        return obj.attendance_set.filter(presence="EX").count()
+        summary = obj.attendance_summary
+        return summary.excused_count if summary is not None else 0
 
     @admin.display(description="Unexcused count")
     def get_unexcused_absence_count(self, obj: Student):
         """Retrieve the number of unexcused absences for this student."""
-        return obj.attendance_set.filter(presence="UN").count()
+        summary = obj.attendance_summary
+        return summary.unexcused_count if summary is not None else 0
 
 
 @admin.register(Mentor)
@@ -691,9 +721,27 @@ class CourseAdmin(BasePermissionModelAdmin):
         "title",
     )
 
+    inlines = (HolidayInline,)
+    actions = ("materialize_occurrences",)
+
     def get_queryset(self, request):
         return super().get_queryset(request).prefetch_related("mentor_set")
 
+    @admin.action(
+        description=(
+            "Create the section occurrences of the whole term, skipping holidays."
+            " Safe to repeat after changing spacetimes or holidays."
+        )
+    )
+    def materialize_occurrences(self, request, queryset):
+        """Materialize the section occurrences of the courses."""
+        created, deleted = Course.materialize_occurrences(queryset)
+        self.message_user(
+            request,
+            f"Created {created} and deleted {deleted} section occurrence(s).",
+            messages.SUCCESS,
+        )
+
     def get_fields(self, request, obj=None):
         all_fields = (
             "name",
@@ -817,7 +865,7 @@ class AttendanceAdmin(BasePermissionModelAdmin):
     list_filter = (
         "presence",
         ("student__section__mentor__course", admin.RelatedOnlyFieldListFilter),
-        *day_filters_on_field("sectionOccurrence__date"),
+        *day_filters_on_field("date"),
     )
     search_fields = (
         "student__user__first_name",
@@ -828,7 +876,7 @@ class AttendanceAdmin(BasePermissionModelAdmin):
         "student__section__spacetimes__day_of_week",
         "presence",
     )
-    ordering = ("-sectionOccurrence__date",)
+    ordering = ("-date",)
 
     def get_queryset(self, request):
         queryset = (
@@ -882,13 +930,13 @@ class AttendanceAdmin(BasePermissionModelAdmin):
         """Retrieve associated student email."""
         return obj.student.user.email
 
-    @admin.display(description="Date", ordering="sectionOccurrence__date")
+    @admin.display(description="Date", ordering="date")
     def get_date(self, obj: Attendance):
         """Retrieve the date associated with this attendance object."""
         return get_admin_link_for(
             obj.sectionOccurrence,
             "admin:scheduler_sectionoccurrence_change",
-            display_text=obj.sectionOccurrence.date,
+            display_text=obj.date,
         )
 
 
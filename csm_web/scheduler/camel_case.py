@@ -0,0 +1,179 @@
+"""
+Drop-in replacements for the `djangorestframework_camel_case` JSON renderer and parser,
+configured through `DEFAULT_RENDERER_CLASSES`/`DEFAULT_PARSER_CLASSES` in `REST_FRAMEWORK`.
+
+Key translations are memoized (the API only ever uses a small, fixed set of keys),
+the data is walked with type checks for the common cases instead of generic iteration,
+and JSON is encoded/decoded with `orjson` when it is installed. The output is byte for
+byte the same as the original classes, except that orjson writes floats of 1e16 and up
+or below 1e-4 as e.g. `1e16` rather than `1e+16` (which parse to the same value).
+"""
+
+import datetime
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from djangorestframework_camel_case import util
+from djangorestframework_camel_case.settings import api_settings as camel_case_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# types that are returned as-is when camelizing/underscoreizing
+SCALAR_TYPES = (str, int, float, bool, type(None), datetime.date, datetime.time)
+
+
+@lru_cache(maxsize=4096)
+def camelize_key(key):
+    """Same translation as `djangorestframework_camel_case.util.camelize`."""
+    if "_" not in key:
+        return key
+    return util.camelize_re.sub(util.underscore_to_camel, key)
+
+
+@lru_cache(maxsize=4096)
+def underscoreize_key(key, no_underscore_before_number=False):
+    """Same translation as `djangorestframework_camel_case.util.underscoreize`."""
+    return util.camel_to_underscore(
+        key, no_underscore_before_number=no_underscore_before_number
+    )
+
+
+def camelize(data):
+    """
+    Same as `djangorestframework_camel_case.util.camelize` without options,
+    for data that is only going to be rendered.
+    """
+    data_type = type(data)
+    if data_type in SCALAR_TYPES:
+        return data
+    if isinstance(data, dict):
+        new_dict = {}
+        for key, value in data.items():
+            if isinstance(key, Promise):
+                key = force_str(key)
+            new_key = camelize_key(key) if isinstance(key, str) else key
+            new_dict[new_key] = camelize(value)
+        return new_dict
+    if data_type is list or data_type is tuple:
+        return [camelize(item) for item in data]
+    if isinstance(data, Promise):
+        return force_str(data)
+    if isinstance(data, SCALAR_TYPES) or not util.is_iterable(data):
+        return data
+    return [camelize(item) for item in data]
+
+
+def underscoreize(data, no_underscore_before_number=False):
+    """
+    Same as `djangorestframework_camel_case.util.underscoreize` without
+    `ignore_fields`/`ignore_keys`, for parsed JSON.
+    """
+    if isinstance(data, dict):
+        return {
+            (
+                underscoreize_key(key, no_underscore_before_number)
+                if isinstance(key, str)
+                else key
+            ): underscoreize(value, no_underscore_before_number)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [underscoreize(item, no_underscore_before_number) for item in data]
+    return data
+
+
+def has_ignored_fields(options):
+    """Whether the camel case settings ignore some fields or keys."""
+    return bool(options.get("ignore_fields") or options.get("ignore_keys"))
+
+
+def orjson_default(obj):
+    """
+    Encode the types orjson does not handle itself (dates and times are passed
+    through) exactly like the DRF `JSONEncoder`.
+    """
+    return JSONEncoder().default(obj)
+
+
+class CamelCaseJSONRenderer(JSONRenderer):
+    """
+    Renders camelized JSON, exactly like
+    `djangorestframework_camel_case.render.CamelCaseJSONRenderer`.
+    """
+
+    json_underscoreize = camel_case_settings.JSON_UNDERSCOREIZE
+    use_orjson = orjson is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if has_ignored_fields(self.json_underscoreize):
+            data = util.camelize(data, **self.json_underscoreize)
+        else:
+            data = camelize(data)
+
+        if (
+            not self.use_orjson
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=orjson_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers that do not fit in 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # escape \u2028 and \u2029 like the DRF renderer
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
+
+
+class CamelCaseJSONParser(JSONParser):
+    """
+    Parses camelized JSON into underscored data, exactly like
+    `djangorestframework_camel_case.parser.CamelCaseJSONParser`.
+    """
+
+    json_underscoreize = camel_case_settings.JSON_UNDERSCOREIZE
+    use_orjson = orjson is not None
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read().decode(encoding)
+            try:
+                if not self.use_orjson:
+                    raise ValueError
+                parsed = orjson.loads(data)
+            except ValueError:
+                # orjson is stricter than the json module (e.g. NaN, big integers)
+                parsed = json.loads(data)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}") from exc
+
+        if has_ignored_fields(self.json_underscoreize):
+            return util.underscoreize(parsed, **self.json_underscoreize)
+        return underscoreize(
+            parsed,
+            no_underscore_before_number=bool(
+                self.json_underscoreize.get("no_underscore_before_number")
+            ),
+        )
@@ -232,6 +232,7 @@ class AttendanceFactory(factory.django.DjangoModelFactory):
 
     presence = factory.fuzzy.FuzzyChoice(Attendance.Presence.values)
     student = factory.SubFactory(StudentFactory)
+    date = factory.LazyAttribute(lambda o: o.sectionOccurrence.date)
 
 
 class OverrideFactory(factory.django.DjangoModelFactory):
@@ -267,7 +268,7 @@ def build_attendances_for(student):
     today = timezone.datetime.today().date()
     section_start_week = week_bounds(student.course.section_start)[0]
     existing_attendance_dates = set(
-        student.attendance_set.values_list("sectionOccurrence__date", flat=True)
+        student.attendance_set.values_list("date", flat=True)
     )
     attendance_objects = []
     for so in student.section.sectionoccurrence_set.all():
@@ -645,6 +646,8 @@ def generate_test_data(preconfirm=False):
     Spacetime.objects.bulk_create(spacetime_objects)
     SectionOccurrence.objects.bulk_create(section_occurrence_objects)
     Student.objects.bulk_create(student_objects)
+    # bulk creation bypasses Student.save, so seat counters must be computed separately
+    Section.recompute_enrolled_counts()
 
     print(f"({(time.perf_counter_ns() - _save_models_start)/1e6:.6f} ms)")
 
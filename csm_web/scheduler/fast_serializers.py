@@ -0,0 +1,526 @@
+"""
+Fast-path read serializers for hot GET endpoints.
+
+Each function builds exactly the same data as the corresponding serializer in
+`serializers.py`, but from `.values()` querysets with plain dict construction,
+avoiding model instantiation, per-field attribute traversal and per-row queries.
+The parity tests in `tests/models/test_fast_serializers.py` assert that the rendered
+output is identical; any change to the serializers must be mirrored here.
+"""
+
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Trim
+from django.utils import timezone
+
+from .models import (
+    Attendance,
+    Coordinator,
+    DayOfWeekField,
+    Mentor,
+    Override,
+    Spacetime,
+    Student,
+)
+from .serializers import Role
+
+
+def full_name(first_name, last_name):
+    """Same as `User.get_full_name`."""
+    return f"{first_name} {last_name}".strip()
+
+
+def day_time(day_of_week, start_time):
+    """Same as `Section.day_time`, given the section's first spacetime."""
+    if day_of_week is None:
+        return None
+    return f"{day_of_week[:3]} {start_time.strftime('%I:%M%p')}"
+
+
+def serialize_spacetime(row, omit_links=False, override=None, prefix=""):
+    """
+    Same as `SpacetimeSerializer` for a `.values()` row of a spacetime (whose fields
+    may be prefixed, e.g. with "spacetime__" for the spacetime of an override).
+    """
+    location = row[f"{prefix}location"]
+    return {
+        "start_time": row[f"{prefix}start_time"].isoformat(),
+        "day_of_week": DayOfWeekField.DAYS.index(row[f"{prefix}day_of_week"]) + 1,
+        "location": None if omit_links and location.startswith("http") else location,
+        "id": row[f"{prefix}pk"],
+        "duration": row[f"{prefix}duration"].total_seconds(),
+        "override": override,
+    }
+
+
+def serialize_section_spacetimes(section_ids, omit_links=False, omit_overrides=False):
+    """
+    Same as `SpacetimeSerializer(section.spacetimes, many=True).data` for each of the
+    sections, with the spacetimes ordered by day and start time, as a
+    {section id: [spacetime, ...]} dict. `omit_links` and `omit_overrides` correspond
+    to the `omit_spacetime_links` and `omit_overrides` context keys.
+    """
+    rows = list(
+        Spacetime.objects.filter(section__in=section_ids)
+        .order_by("day_of_week", "start_time")
+        .values("pk", "section", "start_time", "day_of_week", "location", "duration")
+    )
+
+    overrides = {}
+    if not omit_overrides:
+        # as `Spacetime.override`, expired overrides are left out
+        today = timezone.now().astimezone(timezone.get_default_timezone()).date()
+        for override in Override.objects.filter(
+            overriden_spacetime__in=[row["pk"] for row in rows], date__gte=today
+        ).values(
+            "overriden_spacetime",
+            "date",
+            "spacetime__pk",
+            "spacetime__start_time",
+            "spacetime__day_of_week",
+            "spacetime__location",
+            "spacetime__duration",
+        ):
+            overrides[override["overriden_spacetime"]] = {
+                "spacetime": serialize_spacetime(override, prefix="spacetime__"),
+                "date": override["date"].strftime("%b. %-d"),
+            }
+
+    spacetimes = {}
+    for row in rows:
+        spacetimes.setdefault(row["section"], []).append(
+            serialize_spacetime(row, omit_links, overrides.get(row["pk"]))
+        )
+    return spacetimes
+
+
+def associated_role(row, profiles, user):
+    """
+    Same as `SectionSerializer.user_associated_role` for a `.values()` row of a section
+    (see `serialize_sections`), given the profiles of the user.
+    """
+    if profiles is None:
+        return None
+    if row["pk"] in profiles["students"]:
+        return Role.STUDENT.value, profiles["students"][row["pk"]]
+    if row["mentor"] is None:
+        return None
+    if row["mentor__course"] in profiles["coordinators"]:
+        return Role.COORDINATOR.value, profiles["coordinators"][row["mentor__course"]]
+    if row["mentor__user"] == user.pk:
+        return Role.MENTOR.value, row["mentor"]
+    return None  # no profile
+
+
+def serialize_sections(sections, user=None, catalog=False, group_by=None):
+    """
+    Same as `SectionSerializer(sections, many=True).data` in a request by `user`
+    (or with no request if None), or with the catalog context (`omit_spacetime_links`,
+    `omit_mentor_emails` and `omit_overrides`) if `catalog` is True.
+
+    If `group_by` is the name of an annotation on the queryset, the sections are
+    grouped into a {value: [section, ...]} dict, assuming the queryset is ordered
+    by the annotation (as with `itertools.groupby`).
+    """
+    rows = list(
+        sections.values(
+            "pk",
+            "capacity",
+            "description",
+            "enrolled_count",
+            "mentor",
+            "mentor__user",
+            "mentor__user__first_name",
+            "mentor__user__last_name",
+            "mentor__user__email",
+            "mentor__course",
+            "mentor__course__name",
+            "mentor__course__title",
+            "mentor__course__is_restricted",
+            *([group_by] if group_by else []),
+        )
+    )
+    spacetimes = serialize_section_spacetimes(
+        [row["pk"] for row in rows], omit_links=catalog, omit_overrides=catalog
+    )
+
+    # as `SectionSerializer.user_profiles`
+    profiles = None
+    if user is not None:
+        profiles = {
+            "students": dict(
+                Student.objects.filter(user=user).values_list("section", "pk")
+            ),
+            "coordinators": dict(
+                Coordinator.objects.filter(user=user).values_list("course", "pk")
+            ),
+        }
+
+    serialized = []
+    for row in rows:
+        mentor = None
+        if row["mentor"] is not None:
+            mentor = {
+                "id": row["mentor"],
+                "name": full_name(
+                    row["mentor__user__first_name"], row["mentor__user__last_name"]
+                ),
+                "email": None if catalog else row["mentor__user__email"],
+                "section": row["pk"],
+            }
+
+        role = associated_role(row, profiles, user)
+        serialized.append(
+            {
+                "id": row["pk"],
+                "spacetimes": spacetimes.get(row["pk"], []),
+                "mentor": mentor,
+                "capacity": row["capacity"],
+                "associated_profile_id": role and role[1],
+                "num_students_enrolled": row["enrolled_count"],
+                "description": row["description"],
+                "course": row["mentor__course__name"],
+                "user_role": role and role[0],
+                "course_title": row["mentor__course__title"],
+                "course_restricted": row["mentor__course__is_restricted"],
+            }
+        )
+
+    if group_by is None:
+        return serialized
+    grouped = {}
+    for row, section in zip(rows, serialized):
+        grouped.setdefault(row[group_by], []).append(section)
+    return grouped
+
+
+def serialize_catalog_sections(sections, group_by=None):
+    """
+    Same as `SectionSerializer(sections, many=True).data` with the catalog context
+    and no request (see `serialize_sections`).
+    """
+    return serialize_sections(sections, catalog=True, group_by=group_by)
+
+
+def serialize_profiles(user):
+    """
+    Same as `ProfileSerializer(profiles, many=True).data` for the active and unbanned
+    student profiles, the mentor profiles and the coordinator profiles of the user,
+    in that order; as with the serializer, profiles without a section have no
+    `section_id` or `section_spacetimes`.
+    """
+    fields = ("pk", "section", "course", "course__name", "course__title")
+    rows = [
+        *(
+            (Role.STUDENT.value, row)
+            for row in Student.objects.filter(user=user, active=True, banned=False)
+            .order_by("pk")
+            .values(*fields)
+        ),
+        *(
+            (Role.MENTOR.value, row)
+            for row in Mentor.objects.filter(user=user).order_by("pk").values(*fields)
+        ),
+        *(
+            (Role.COORDINATOR.value, {**row, "section": None})
+            for row in Coordinator.objects.filter(user=user)
+            .order_by("pk")
+            .values(*(field for field in fields if field != "section"))
+        ),
+    ]
+    spacetimes = serialize_section_spacetimes(
+        [row["section"] for _, row in rows if row["section"] is not None]
+    )
+
+    serialized = []
+    for role, row in rows:
+        profile = {"id": row["pk"]}
+        if row["section"] is not None:
+            profile["section_id"] = row["section"]
+            profile["section_spacetimes"] = spacetimes.get(row["section"], [])
+        profile["course"] = row["course__name"]
+        profile["course_title"] = row["course__title"]
+        profile["course_id"] = row["course"]
+        profile["role"] = role
+        serialized.append(profile)
+    return serialized
+
+
+def serialize_students(students):
+    """Same as `StudentSerializer(students, many=True).data`."""
+    rows = list(
+        students.values(
+            "pk",
+            "user__first_name",
+            "user__last_name",
+            "user__email",
+            "section",
+            "course__word_of_the_day_limit",
+        )
+    )
+    attendances = {}
+    for attendance in (
+        Attendance.objects.filter(student__in=[row["pk"] for row in rows])
+        .order_by("date", "sectionOccurrence_id")
+        .values("pk", "student", "presence", "date")
+    ):
+        attendances.setdefault(attendance["student"], []).append(attendance)
+
+    serialized = []
+    for row in rows:
+        name = full_name(row["user__first_name"], row["user__last_name"])
+        # attendances are in the student's course, so the limit is resolved once
+        limit = row["course__word_of_the_day_limit"]
+        student_attendances = []
+        for attendance in attendances.get(row["pk"], []):
+            date = attendance["date"]
+            student_attendances.append(
+                {
+                    "id": attendance["pk"],
+                    "date": date.isoformat(),
+                    "presence": attendance["presence"],
+                    "student_name": name,
+                    "student_id": row["pk"],
+                    "student_email": row["user__email"],
+                    "word_of_the_day_deadline": (
+                        None if limit is None else date + limit
+                    ),
+                }
+            )
+        serialized.append(
+            {
+                "id": row["pk"],
+                "name": name,
+                "email": row["user__email"],
+                "attendances": student_attendances,
+                "section": row["section"],
+            }
+        )
+    return serialized
+
+
+def serialize_section_occurrences(section_occurrences, word_of_the_day_limit):
+    """
+    Same as `SectionOccurrenceSerializer(section_occurrences, many=True).data` with
+    the `word_of_the_day_limit` of their course in the context; the attendances of
+    each occurrence are ordered by id.
+    """
+    rows = list(section_occurrences.values("pk", "date", "section"))
+    attendances = {}
+    if rows:
+        # bounded by date as well, so that only the partitions in range are scanned
+        for attendance in (
+            Attendance.objects.filter(
+                sectionOccurrence__in=[row["pk"] for row in rows],
+                date__gte=min(row["date"] for row in rows),
+                date__lte=max(row["date"] for row in rows),
+            )
+            .order_by("date", "sectionOccurrence_id", "pk")
+            .values(
+                "pk",
+                "sectionOccurrence",
+                "date",
+                "presence",
+                "student",
+                "student__user__first_name",
+                "student__user__last_name",
+                "student__user__email",
+            )
+        ):
+            date = attendance["date"]
+            attendances.setdefault(attendance["sectionOccurrence"], []).append(
+                {
+                    "id": attendance["pk"],
+                    "date": date.isoformat(),
+                    "presence": attendance["presence"],
+                    "student_name": full_name(
+                        attendance["student__user__first_name"],
+                        attendance["student__user__last_name"],
+                    ),
+                    "student_id": attendance["student"],
+                    "student_email": attendance["student__user__email"],
+                    "word_of_the_day_deadline": (
+                        None
+                        if word_of_the_day_limit is None
+                        else date + word_of_the_day_limit
+                    ),
+                }
+            )
+
+    return [
+        {
+            "id": row["pk"],
+            "date": row["date"].isoformat(),
+            "section": row["section"],
+            "attendances": attendances.get(row["pk"], []),
+        }
+        for row in rows
+    ]
+
+
+def annotate_full_name(queryset, user="user"):
+    """Annotate `full_name` (as `User.get_full_name`, for searching and sorting)."""
+    return queryset.annotate(
+        full_name=Trim(Concat(f"{user}__first_name", Value(" "), f"{user}__last_name"))
+    )
+
+
+def annotate_coord_students(students):
+    """
+    Annotate the students with the number of unexcused absences and the day and time
+    of their section, as needed by `serialize_coord_students`; the counts are read
+    from the attendance summaries and the first spacetimes are correlated subqueries,
+    so the annotations can be filtered on and sorted by without grouping.
+    """
+    first_spacetime = Spacetime.objects.filter(section=OuterRef("section")).order_by(
+        "pk"
+    )
+    return annotate_full_name(students).annotate(
+        num_unexcused=Coalesce("attendance_summary__unexcused_count", 0),
+        day_of_week=Subquery(first_spacetime.values("day_of_week")[:1]),
+        start_time=Subquery(first_spacetime.values("start_time")[:1]),
+    )
+
+
+def serialize_coord_students(students):
+    """
+    Same as `CoordStudentSerializer(students, many=True).data`,
+    for students annotated with `annotate_coord_students`.
+    """
+    return [
+        {
+            "id": row["pk"],
+            "name": full_name(row["user__first_name"], row["user__last_name"]),
+            "email": row["user__email"],
+            "num_unexcused": row["num_unexcused"],
+            "section": row["section"],
+            "mentor_name": full_name(
+                row["section__mentor__user__first_name"],
+                row["section__mentor__user__last_name"],
+            ),
+            "day_time": day_time(row["day_of_week"], row["start_time"]),
+        }
+        for row in students.values(
+            "pk",
+            "user__first_name",
+            "user__last_name",
+            "user__email",
+            "section",
+            "section__mentor__user__first_name",
+            "section__mentor__user__last_name",
+            "num_unexcused",
+            "day_of_week",
+            "start_time",
+        )
+    ]
+
+
+def annotate_coord_mentors(mentors):
+    """
+    Annotate the mentors with the number of active students in their section and its
+    day and time, as needed by `serialize_coord_mentors` (see `annotate_coord_students`).
+    """
+    num_students = (
+        Student.objects.filter(section__mentor=OuterRef("pk"), active=True)
+        .order_by()
+        .values("section__mentor")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    first_spacetime = Spacetime.objects.filter(section__mentor=OuterRef("pk")).order_by(
+        "pk"
+    )
+    return annotate_full_name(mentors).annotate(
+        num_students=Coalesce(Subquery(num_students), 0),
+        day_of_week=Subquery(first_spacetime.values("day_of_week")[:1]),
+        start_time=Subquery(first_spacetime.values("start_time")[:1]),
+    )
+
+
+def serialize_coord_mentors(mentors):
+    """
+    Same as `CoordMentorSerializer(mentors, many=True).data`,
+    for mentors annotated with `annotate_coord_mentors`.
+    """
+    return [
+        {
+            "id": row["pk"],
+            "name": full_name(row["user__first_name"], row["user__last_name"]),
+            "email": row["user__email"],
+            "num_students": row["num_students"],
+            "section": row["section"],
+            "family": row["family"],
+            "day_time": day_time(row["day_of_week"], row["start_time"]),
+        }
+        for row in mentors.values(
+            "pk",
+            "user__first_name",
+            "user__last_name",
+            "user__email",
+            "section",
+            "family",
+            "num_students",
+            "day_of_week",
+            "start_time",
+        )
+    ]
+
+
+def serialize_attendance_grid(section_occurrences):
+    """
+    Compact attendance grid of the section occurrences: the occurrences in order,
+    and for each student with attendances among them, their presence codes at each
+    occurrence (None if the student has no attendance for it).
+
+    Built from a single query over the section occurrences left joined to their
+    attendances and students.
+
+    format: {
+        "occurrences": [{"id": int, "date": str}, ...],
+        "students": [{"id": int, "name": str, "email": str, "presence": [str | None]}]
+    }
+    """
+    rows = section_occurrences.order_by("date", "pk").values(
+        "pk",
+        "date",
+        "attendance__student",
+        "attendance__presence",
+        "attendance__student__user__first_name",
+        "attendance__student__user__last_name",
+        "attendance__student__user__email",
+    )
+
+    occurrences = []
+    students = {}
+    for row in rows:
+        if not occurrences or occurrences[-1]["id"] != row["pk"]:
+            occurrences.append({"id": row["pk"], "date": row["date"].isoformat()})
+        student_id = row["attendance__student"]
+        if student_id is None:
+            continue
+        student = students.get(student_id)
+        if student is None:
+            student = students[student_id] = {
+                "id": student_id,
+                "name": full_name(
+                    row["attendance__student__user__first_name"],
+                    row["attendance__student__user__last_name"],
+                ),
+                "email": row["attendance__student__user__email"],
+                "presence": {},
+            }
+        student["presence"][len(occurrences) - 1] = row["attendance__presence"]
+
+    return {
+        "occurrences": occurrences,
+        "students": [
+            {
+                **student,
+                "presence": [
+                    student["presence"].get(index) for index in range(len(occurrences))
+                ],
+            }
+            for student in sorted(
+                students.values(), key=lambda student: (student["name"], student["id"])
+            )
+        ],
+    }
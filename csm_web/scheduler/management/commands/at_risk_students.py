@@ -0,0 +1,64 @@
+import csv
+
+from django.core.management import BaseCommand
+from scheduler.models import Course
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a CSV of the active students whose unexcused absences exceed, or are"
+        " within --within absences of exceeding, their course's permitted absences."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=str,
+            help=(
+                "only include students in the course with this id, or with this name"
+                " (among courses that have not ended)"
+            ),
+        )
+        parser.add_argument(
+            "--within",
+            type=int,
+            default=0,
+            help=(
+                "also include students within this many absences of exceeding the"
+                " permitted absences (default 0: only students over the limit)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = Course.by_id_or_name([options["course"]])
+
+        students = (
+            Course.at_risk_students(courses, options["within"])
+            .order_by("course__name", "-num_unexcused", "user__email")
+            .values_list(
+                "course__name",
+                "user__email",
+                "user__first_name",
+                "user__last_name",
+                "section",
+                "num_unexcused",
+                "course__permitted_absences",
+                "attendance_summary__last_attended",
+            )
+        )
+        writer = csv.writer(self.stdout)
+        writer.writerow(
+            [
+                "Course",
+                "Email",
+                "First name",
+                "Last name",
+                "Section ID",
+                "Unexcused count",
+                "Permitted absences",
+                "Last attended",
+            ]
+        )
+        writer.writerows(students)
@@ -0,0 +1,105 @@
+import io
+import time
+
+from django.core.management import BaseCommand
+from djangorestframework_camel_case.parser import CamelCaseJSONParser as LibraryParser
+from djangorestframework_camel_case.render import (
+    CamelCaseJSONRenderer as LibraryRenderer,
+)
+from scheduler.camel_case import CamelCaseJSONParser, CamelCaseJSONRenderer, orjson
+from scheduler.fast_serializers import (
+    annotate_coord_students,
+    serialize_catalog_sections,
+    serialize_coord_students,
+    serialize_students,
+)
+from scheduler.management.commands.benchmark_serializers import catalog_sections
+from scheduler.models import Course, Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the djangorestframework_camel_case JSON renderer and parser with"
+        " the ones in `scheduler.camel_case` on API payloads built from the data in"
+        " the database (e.g. after `createtestdata`), reporting the time taken by each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=str,
+            help="only benchmark the course with this name (default: the largest course)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="number of times to run each renderer/parser; the best time is reported",
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = courses.filter(name=options["course"])
+        course = max(
+            courses, key=lambda course: course.student_set.count(), default=None
+        )
+        if course is None:
+            self.stderr.write("No courses to benchmark; run `createtestdata` first.")
+            return
+
+        students = Student.objects.filter(active=True, course=course)
+        payloads = [
+            (
+                "course catalog",
+                serialize_catalog_sections(
+                    catalog_sections(course), group_by="day_key"
+                ),
+            ),
+            ("section students (all sections)", serialize_students(students)),
+            (
+                "coordinator students",
+                serialize_coord_students(
+                    annotate_coord_students(students).order_by("user__first_name")
+                ),
+            ),
+        ]
+        self.stdout.write(
+            f"Benchmarking {course.name} (orjson {'enabled' if orjson else 'not installed'})"
+        )
+
+        for name, data in payloads:
+            rendered = LibraryRenderer().render(data)
+            if CamelCaseJSONRenderer().render(data) != rendered:
+                self.stderr.write(f"{name}: rendered output differs")
+            self.report(
+                f"render {name}",
+                lambda data=data: LibraryRenderer().render(data),
+                lambda data=data: CamelCaseJSONRenderer().render(data),
+                options["repeat"],
+            )
+            self.report(
+                f"parse {name}",
+                lambda body=rendered: LibraryParser().parse(io.BytesIO(body)),
+                lambda body=rendered: CamelCaseJSONParser().parse(io.BytesIO(body)),
+                options["repeat"],
+            )
+
+    def report(self, name, func, fast_func, repeat):
+        """Time both functions and write the comparison."""
+        slow = self.best_time(func, repeat)
+        fast = self.best_time(fast_func, repeat)
+        self.stdout.write(
+            f"{name:>40}: {slow * 1000:9.1f}ms -> {fast * 1000:7.1f}ms"
+            f" ({slow / fast:.1f}x)"
+        )
+
+    @staticmethod
+    def best_time(func, repeat):
+        """Best wall clock time of `repeat` calls to the function, in seconds."""
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
@@ -0,0 +1,215 @@
+import time
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.management import BaseCommand
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from scheduler.fast_serializers import (
+    annotate_coord_mentors,
+    annotate_coord_students,
+    serialize_catalog_sections,
+    serialize_coord_mentors,
+    serialize_coord_students,
+    serialize_profiles,
+    serialize_section_occurrences,
+    serialize_sections,
+    serialize_students,
+)
+from scheduler.models import (
+    Attendance,
+    Course,
+    Mentor,
+    Section,
+    SectionOccurrence,
+    Spacetime,
+    Student,
+)
+from scheduler.serializers import (
+    CoordMentorSerializer,
+    CoordStudentSerializer,
+    ProfileSerializer,
+    SectionOccurrenceSerializer,
+    SectionSerializer,
+    StudentSerializer,
+)
+
+
+def catalog_sections(course):
+    """The course catalog queryset, as built by `CourseViewSet.get_sections_by_day`."""
+    return (
+        Section.objects.filter(mentor__course=course)
+        .annotate(
+            day_key=ArrayAgg(
+                "spacetimes__day_of_week",
+                ordering="spacetimes__day_of_week",
+                distinct=True,
+            ),
+        )
+        .order_by("day_key", "pk")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the DRF serializers of the hot read endpoints with their fast-path"
+        " equivalents on the data in the database (e.g. after `createtestdata`),"
+        " reporting the time taken by each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=str,
+            help="only benchmark the course with this name (default: the largest course)",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="number of times to run each serializer; the best time is reported",
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = courses.filter(name=options["course"])
+        course = max(
+            courses, key=lambda course: course.student_set.count(), default=None
+        )
+        if course is None:
+            self.stderr.write("No courses to benchmark; run `createtestdata` first.")
+            return
+
+        students = Student.objects.filter(active=True, course=course)
+        mentors = Mentor.objects.filter(course=course)
+        sections = Section.objects.filter(mentor__course=course).order_by("pk")
+        section_occurrences = SectionOccurrence.objects.filter(
+            section__mentor__course=course
+        )
+        mentor_users = [mentor.user for mentor in mentors.select_related("user")]
+        # section details as seen by one of the mentors
+        request = RequestFactory().get("/")
+        request.user = mentor_users[0] if mentor_users else None
+        self.stdout.write(
+            f"Benchmarking {course.name}: {mentors.count()} mentors,"
+            f" {students.count()} students"
+        )
+
+        benchmarks = [
+            (
+                "course catalog",
+                lambda: SectionSerializer(
+                    catalog_sections(course)
+                    .select_related("mentor__user", "mentor__course")
+                    .prefetch_related(
+                        Prefetch(
+                            "spacetimes",
+                            queryset=Spacetime.objects.order_by(
+                                "day_of_week", "start_time"
+                            ),
+                        )
+                    ),
+                    many=True,
+                    context={
+                        "omit_spacetime_links": True,
+                        "omit_mentor_emails": True,
+                        "omit_overrides": True,
+                    },
+                ).data,
+                lambda: serialize_catalog_sections(
+                    catalog_sections(course), group_by="day_key"
+                ),
+            ),
+            (
+                "section students (all sections)",
+                lambda: StudentSerializer(
+                    students.select_related("user").prefetch_related("attendance_set"),
+                    many=True,
+                ).data,
+                lambda: serialize_students(students),
+            ),
+            (
+                "coordinator students",
+                lambda: CoordStudentSerializer(
+                    students.order_by("user__first_name"), many=True
+                ).data,
+                lambda: serialize_coord_students(
+                    annotate_coord_students(students).order_by("user__first_name")
+                ),
+            ),
+            (
+                "coordinator mentors",
+                lambda: CoordMentorSerializer(
+                    mentors.order_by("user__first_name"), many=True
+                ).data,
+                lambda: serialize_coord_mentors(
+                    annotate_coord_mentors(mentors).order_by("user__first_name")
+                ),
+            ),
+            (
+                "section details (all sections)",
+                lambda: SectionSerializer(
+                    sections.select_related(
+                        "mentor__user", "mentor__course"
+                    ).prefetch_related(
+                        Prefetch(
+                            "spacetimes",
+                            queryset=Spacetime.objects.order_by(
+                                "day_of_week", "start_time"
+                            ),
+                        )
+                    ),
+                    many=True,
+                    context={"request": request},
+                ).data,
+                lambda: serialize_sections(sections, request.user),
+            ),
+            (
+                "section attendance (all sections)",
+                lambda: SectionOccurrenceSerializer(
+                    section_occurrences.prefetch_related(
+                        Prefetch(
+                            "attendance_set",
+                            queryset=Attendance.objects.select_related("student__user"),
+                        )
+                    ),
+                    many=True,
+                    context={"word_of_the_day_limit": course.word_of_the_day_limit},
+                ).data,
+                lambda: serialize_section_occurrences(
+                    section_occurrences, course.word_of_the_day_limit
+                ),
+            ),
+            (
+                "profiles (all mentors)",
+                lambda: [
+                    ProfileSerializer(
+                        [
+                            *user.student_set.filter(active=True, banned=False),
+                            *user.mentor_set.all(),
+                            *user.coordinator_set.all(),
+                        ],
+                        many=True,
+                    ).data
+                    for user in mentor_users
+                ],
+                lambda: [serialize_profiles(user) for user in mentor_users],
+            ),
+        ]
+        for name, serializer, fast_serializer in benchmarks:
+            slow = self.best_time(serializer, options["repeat"])
+            fast = self.best_time(fast_serializer, options["repeat"])
+            self.stdout.write(
+                f"{name:>32}: {slow * 1000:9.1f}ms -> {fast * 1000:7.1f}ms"
+                f" ({slow / fast:.1f}x)"
+            )
+
+    @staticmethod
+    def best_time(func, repeat):
+        """Best wall clock time of `repeat` calls to the function, in seconds."""
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
@@ -0,0 +1,136 @@
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from scheduler.models import Attendance, Section
+
+WORD = "benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates every student of a section submitting the word of the day at once,"
+        " through the real endpoint from concurrent threads, and reports the latency"
+        " of correct and of rejected submissions. Attendances, the word of the day and"
+        " the course's deadline are restored afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--section",
+            type=int,
+            help=(
+                "id of the section to benchmark (default: the section with the most"
+                " attendances at a single occurrence)"
+            ),
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=30,
+            help="number of submissions in flight at once (default 30)",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        attendances = Attendance.objects.filter(student__active=True)
+        if options["section"]:
+            attendances = attendances.filter(student__section=options["section"])
+        occurrence = (
+            attendances.values("sectionOccurrence")
+            .annotate(count=Count("pk"))
+            .order_by("-count", "-date")
+            .first()
+        )
+        if occurrence is None:
+            raise CommandError(
+                "No attendances to benchmark; run `createtestdata` first."
+            )
+        attendances = list(
+            attendances.filter(
+                sectionOccurrence=occurrence["sectionOccurrence"]
+            ).select_related("student__user", "sectionOccurrence")
+        )
+        section_occurrence = attendances[0].sectionOccurrence
+        section = Section.objects.select_related("mentor__course").get(
+            pk=section_occurrence.section_id
+        )
+        course = section.mentor.course
+        self.stdout.write(
+            f"Benchmarking section {section.pk} ({course.name}), occurrence on"
+            f" {section_occurrence.date}: {len(attendances)} students"
+        )
+
+        clients = []
+        for attendance in attendances:
+            client = Client(SERVER_NAME="localhost")
+            client.force_login(attendance.student.user)
+            clients.append((client, attendance))
+        url = reverse("section-wotd", kwargs={"pk": section.pk})
+
+        saved_word = section_occurrence.word_of_the_day
+        saved_limit = course.word_of_the_day_limit
+        saved_presences = {
+            attendance.pk: attendance.presence for attendance in attendances
+        }
+        try:
+            section_occurrence.word_of_the_day = WORD
+            section_occurrence.save()
+            course.word_of_the_day_limit = None
+            course.save()
+            self.reset_presences(section_occurrence, {pk: "" for pk in saved_presences})
+
+            for name, word in (("rejected", "wrong"), ("correct", WORD)):
+                self.burst(name, clients, url, word, options["concurrency"])
+        finally:
+            self.reset_presences(section_occurrence, saved_presences)
+            section_occurrence.word_of_the_day = saved_word
+            section_occurrence.save()
+            course.word_of_the_day_limit = saved_limit
+            course.save()
+            for client, _ in clients:
+                client.logout()
+
+    def burst(self, name, clients, url, word, concurrency):
+        """Submit the word for every client concurrently, and report the latencies."""
+
+        def submit(client_attendance):
+            client, attendance = client_attendance
+            start = time.perf_counter()
+            response = client.put(
+                url,
+                {"attendanceId": attendance.pk, "wordOfTheDay": word},
+                content_type="application/json",
+            )
+            return time.perf_counter() - start, response.status_code
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(submit, clients))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for latency, _ in results)
+        statuses = Counter(status for _, status in results)
+        self.stdout.write(
+            f"{name:>9}: {elapsed * 1000:7.1f}ms total,"
+            f" median {statistics.median(latencies) * 1000:6.1f}ms,"
+            f" max {latencies[-1] * 1000:6.1f}ms;"
+            f" statuses {dict(sorted(statuses.items()))}"
+        )
+
+    @staticmethod
+    def reset_presences(section_occurrence, presences):
+        """Set the presences of the section occurrence's attendances, by attendance id."""
+        for presence in set(presences.values()):
+            Attendance.objects.filter(
+                sectionOccurrence=section_occurrence,
+                date=section_occurrence.date,
+                pk__in=[pk for pk, value in presences.items() if value == presence],
+            ).update(presence=presence)
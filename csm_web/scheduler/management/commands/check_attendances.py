@@ -1,48 +1,307 @@
-from django.core.management import BaseCommand
-from scheduler.models import Student, Section
-from datetime import datetime
+import csv
+import datetime
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from scheduler.models import Attendance, Course, SectionOccurrence, Student
+
+# (occurrence, student) pairs of active students of a course that have no attendance
+# for an occurrence of their section; expects the parameters (course id, start, end).
+# Enrollment dates are not recorded, so the student's first attendance in their section
+# stands in for the date they joined it: earlier occurrences are not expected to have
+# an attendance. Students without any attendance in their section cannot be dated,
+# and are reported for every occurrence (with a NULL `first_attendance_date`).
+MISSING_SQL = f"""
+    SELECT
+        student.id AS student_id,
+        occurrence.section_id,
+        occurrence.id AS section_occurrence_id,
+        occurrence.date,
+        first_attendance.date AS first_attendance_date
+    FROM {SectionOccurrence._meta.db_table} AS occurrence
+    JOIN {Student._meta.db_table} AS student
+        ON student.section_id = occurrence.section_id AND student.active
+    CROSS JOIN LATERAL (
+        SELECT MIN(attendance.date) AS date
+        FROM {Attendance._meta.db_table} AS attendance
+        JOIN {SectionOccurrence._meta.db_table} AS own
+            ON own.id = attendance."sectionOccurrence_id"
+        WHERE attendance.student_id = student.id
+            AND own.section_id = student.section_id
+    ) AS first_attendance
+    WHERE student.course_id = %s AND occurrence.date BETWEEN %s AND %s
+        AND (
+            first_attendance.date IS NULL OR occurrence.date >= first_attendance.date
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM {Attendance._meta.db_table} AS attendance
+            WHERE attendance."sectionOccurrence_id" = occurrence.id
+                AND attendance.student_id = student.id
+                AND attendance.date = occurrence.date
+        )
+"""
+
+# only backfills students whose first attendance in their section dates their joining
+INSERT_MISSING_SQL = f"""
+    INSERT INTO {Attendance._meta.db_table}
+        (student_id, "sectionOccurrence_id", date, presence)
+    SELECT missing.student_id, missing.section_occurrence_id, missing.date, ''
+    FROM ({MISSING_SQL}) AS missing
+    WHERE missing.first_attendance_date IS NOT NULL
+    ON CONFLICT ("sectionOccurrence_id", student_id, date) DO NOTHING
+    RETURNING student_id, "sectionOccurrence_id"
+"""
+
+# attendances of students of a course for occurrences of a section other than their
+# own, along with the occurrence of their own section on the same date (if any);
+# expects the parameters (course id, start, end)
+MISPLACED_SQL = f"""
+    SELECT
+        attendance.id AS attendance_id,
+        attendance.student_id,
+        occurrence.section_id,
+        attendance."sectionOccurrence_id" AS section_occurrence_id,
+        attendance.date,
+        student.active,
+        expected.id AS expected_section_occurrence_id
+    FROM {Attendance._meta.db_table} AS attendance
+    JOIN {Student._meta.db_table} AS student ON student.id = attendance.student_id
+    JOIN {SectionOccurrence._meta.db_table} AS occurrence
+        ON occurrence.id = attendance."sectionOccurrence_id"
+    LEFT JOIN {SectionOccurrence._meta.db_table} AS expected
+        ON expected.section_id = student.section_id AND expected.date = attendance.date
+    WHERE student.course_id = %s AND attendance.date BETWEEN %s AND %s
+        AND (NOT student.active OR occurrence.section_id <> student.section_id)
+"""
+
+# move attendances to the expected occurrence, unless the student already has one there;
+# expects the parameters ((attendance id, expected occurrence id) pairs)
+MOVE_MISPLACED_SQL = f"""
+    UPDATE {Attendance._meta.db_table} AS attendance
+    SET "sectionOccurrence_id" = moved.section_occurrence_id
+    FROM (VALUES {{values}}) AS moved (attendance_id, section_occurrence_id)
+    WHERE attendance.id = moved.attendance_id
+        AND NOT EXISTS (
+            SELECT 1 FROM {Attendance._meta.db_table} AS existing
+            WHERE existing."sectionOccurrence_id" = moved.section_occurrence_id
+                AND existing.student_id = attendance.student_id
+                AND existing.date = attendance.date
+        )
+    RETURNING attendance.id
+"""
+
+REPORT_FIELDS = (
+    "course",
+    "anomaly",
+    "student",
+    "section",
+    "section_occurrence",
+    "attendance",
+    "date",
+    "repaired",
+)
+
+
+def fetch_dicts(cursor):
+    """Fetch the remaining rows of the cursor as dicts."""
+    columns = [column.name for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def check_course(course_id, course_name, start, end, repair):
+    """
+    Find the attendance anomalies of the course between the dates (inclusive),
+    repairing the ones that can be repaired if `repair` is True.
+
+    Anomalies are:
+        - missing: an active student has no attendance for an occurrence of their
+          section, on or after their first attendance in the section; repaired by
+          creating a blank attendance, unless the student has no attendance in the
+          section to tell when they joined it
+        - wrong_section: an active student has an attendance for an occurrence of another
+          section; repaired by moving it to the occurrence of their own section on the
+          same date, if there is one and it does not have an attendance already
+        - not_enrolled: a dropped student has an attendance; never repaired, as past
+          attendances of dropped students are kept
+    """
+    params = [course_id, start, end]
+    anomalies = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(MISSING_SQL, params)
+        missing = fetch_dicts(cursor)
+        cursor.execute(MISPLACED_SQL, params)
+        misplaced = fetch_dicts(cursor)
+
+        # attendances are moved first, as they may fill in missing attendances
+        moved = set()
+        movable = [
+            (row["attendance_id"], row["expected_section_occurrence_id"])
+            for row in misplaced
+            if row["active"] and row["expected_section_occurrence_id"] is not None
+        ]
+        if repair and movable:
+            values = ", ".join(["(%s::integer, %s::integer)"] * len(movable))
+            cursor.execute(
+                MOVE_MISPLACED_SQL.format(values=values),
+                [param for pair in movable for param in pair],
+            )
+            moved = {attendance_id for (attendance_id,) in cursor.fetchall()}
+        # (student, occurrence) pairs that now have an attendance
+        filled = {
+            (row["student_id"], row["expected_section_occurrence_id"])
+            for row in misplaced
+            if row["attendance_id"] in moved
+        }
+        if repair and missing:
+            cursor.execute(INSERT_MISSING_SQL, params)
+            filled.update(cursor.fetchall())
+
+    for row in missing:
+        anomalies.append(
+            {
+                "course": course_name,
+                "anomaly": "missing",
+                "student": row["student_id"],
+                "section": row["section_id"],
+                "section_occurrence": row["section_occurrence_id"],
+                "attendance": None,
+                "date": row["date"].isoformat(),
+                "repaired": (row["student_id"], row["section_occurrence_id"]) in filled,
+            }
+        )
+    for row in misplaced:
+        anomalies.append(
+            {
+                "course": course_name,
+                "anomaly": "wrong_section" if row["active"] else "not_enrolled",
+                "student": row["student_id"],
+                "section": row["section_id"],
+                "section_occurrence": row["section_occurrence_id"],
+                "attendance": row["attendance_id"],
+                "date": row["date"].isoformat(),
+                "repaired": row["attendance_id"] in moved,
+            }
+        )
+    return anomalies
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD command line argument."""
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as e:
+        raise CommandError(f"Invalid date {value!r}; expected YYYY-MM-DD") from e
 
 
 class Command(BaseCommand):
+    help = (
+        "Checks that every active student has exactly the attendances of their own"
+        " section's occurrences between the dates, with a few set-based queries per"
+        " course, run in parallel worker processes. Writes a JSON or CSV report of"
+        " the anomalies, and optionally repairs them."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument("start-date", help="start date, in the form yyyy-mm-dd")
-        parser.add_argument("end-date", help="end date, in the form yyyy-mm-dd")
+        parser.add_argument(
+            "start-date", type=parse_date, help="start date, in the form yyyy-mm-dd"
+        )
+        parser.add_argument(
+            "end-date", type=parse_date, help="end date, in the form yyyy-mm-dd"
+        )
+        parser.add_argument(
+            "--course",
+            action="append",
+            help=(
+                "only check the course with this id, or the course with this name held"
+                " since start-date (repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--format",
+            choices=("json", "csv"),
+            default="json",
+            help="format of the report (default json)",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="path of the file to write the report to (default: standard output)",
+        )
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help=(
+                "create missing attendances and move attendances to the student's own"
+                " section where possible"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                "number of worker processes, each checking one course at a time"
+                " (default: the number of CPUs; 1 checks in this process)"
+            ),
+        )
 
     def handle(self, *args, **options):
-        start, end = options['start-date'], options['end-date']
-        start, end = datetime.strptime(start, "%Y-%m-%d"), datetime.strptime(end, "%Y-%m-%d")
-        self._check_attendance_sets(start, end)
-        self._check_attendance_sections(start, end)
-
-    def _check_attendance_sets(self, start, end):
-        print("checking attendance section enrollment...")
-        sections = Section.objects.prefetch_related('sectionoccurrence_set')
-        for section in sections:
-            # only get active students (these will be shown to the mentor)
-            enrolled_student_objs = section.students.filter(active=True)
-            enrolled = set(enrolled_student_objs.values_list('id', flat=True))
-            for so in section.sectionoccurrence_set.filter(date__gte=start, date__lte=end).prefetch_related('attendance_set__student'):
-                # print(so.attendance_set.values_list('student').first())
-                so_students = set(so.attendance_set.values_list('student', flat=True))
-                if enrolled != so_students:
-                    print(f"Incorrect for section (id {section.pk}) {section}")
-                    print(f"\tenrolled: ids {enrolled}\n\t\t{enrolled_student_objs}")
-                    print(
-                        f"\tattendance ({so.date}): ids {so_students}\n\t\t{Student.objects.filter(id__in=so_students)}")
-
-    def _check_attendance_sections(self, start, end):
-        print("checking section occurrence sections...")
-        for student in Student.objects.all():
-            section = student.section
-            for attendance in student.attendance_set.filter(sectionOccurrence__date__gte=start, sectionOccurrence__date__lte=end).prefetch_related('sectionOccurrence__section').select_related('sectionOccurrence'):
-                att_so = attendance.sectionOccurrence
-                att_so_section = att_so.section
-                # get the section occurrence for the section on the same date
-                expected_so = section.sectionoccurrence_set.get(date=att_so.date)
-                if att_so_section != student.section:
-                    print(
-                        f"Incorrect for student (id {student.pk}) {student}, attendance (id {attendance.pk}) {attendance}")
-                    print(f"\tgot (id {att_so_section.pk}) {att_so_section}\n\t\texpected (id {section.pk}) {section}")
-                    print(
-                        f"\tSectionOccurrence (id {att_so.pk}) {att_so}\n\t\texpected (id {expected_so.pk}) {expected_so}")
+        start, end = options["start-date"], options["end-date"]
+        if end < start:
+            raise CommandError("end-date must not be before start-date")
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        courses = Course.objects.order_by("name")
+        if options["course"]:
+            courses = courses & Course.by_id_or_name(options["course"], start)
+        jobs = [
+            (course_id, course_name, start, end, options["repair"])
+            for course_id, course_name in courses.values_list("pk", "name")
+        ]
+
+        workers = min(options["workers"], len(jobs))
+        if workers <= 1:
+            results = [check_course(*job) for job in jobs]
+        else:
+            # forked workers must not share this process's database connection
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("fork")
+            ) as executor:
+                results = list(executor.map(check_course, *zip(*jobs)))
+        anomalies = [anomaly for result in results for anomaly in result]
+
+        report = self.render_report(anomalies, start, end, options["format"])
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as file:
+                file.write(report)
+        else:
+            self.stdout.write(report, ending="")
+
+        num_repaired = sum(anomaly["repaired"] for anomaly in anomalies)
+        self.stderr.write(
+            f"Checked {len(jobs)} course(s) from {start} to {end}:"
+            f" {len(anomalies)} anomalies, {num_repaired} repaired."
+        )
+
+    @staticmethod
+    def render_report(anomalies, start, end, report_format):
+        """Render the anomalies as JSON or CSV."""
+        if report_format == "csv":
+            report = io.StringIO()
+            writer = csv.DictWriter(report, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(anomalies)
+            return report.getvalue()
+        report = {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "anomalies": anomalies,
+        }
+        return json.dumps(report, indent=2) + "\n"
@@ -2,60 +2,230 @@
 Makes sure nothing in the system is overly screwed up.
 """
 
-from django.core.management import BaseCommand
-from scheduler.models import User, Mentor, Section, Spacetime
-import datetime as dt
+import datetime
+import heapq
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.management import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from scheduler.models import Course, Mentor, Section, Spacetime, Student
+
+
+def issue(check, message, course=None, user=None, objects=()):
+    """An integrity issue, as included in the report."""
+    return {
+        "check": check,
+        "course": course,
+        "user": user,
+        "objects": list(objects),
+        "message": message,
+    }
+
+
+def find_overlaps(intervals):
+    """
+    Find the overlapping pairs among (start, end, item) intervals sorted by start,
+    by sweeping over them while keeping the intervals that have not ended yet in a heap;
+    takes O(n log n + number of overlaps) time.
+    """
+    ongoing = []
+    for index, (start, end, item) in enumerate(intervals):
+        while ongoing and ongoing[0][0] <= start:
+            heapq.heappop(ongoing)
+        for _, _, other in ongoing:
+            yield other, item
+        heapq.heappush(ongoing, (end, index, item))
+
+
+def time_of_day(time):
+    """Time elapsed since midnight, as a timedelta."""
+    return datetime.timedelta(hours=time.hour, minutes=time.minute, seconds=time.second)
+
+
+def check_course(course_id, course_name, section_start, valid_until, checked=None):
+    """
+    Run the integrity checks of the course, returning the issues found:
+        - duplicate_students: a user has several student profiles in the course, active
+          or not
+        - student_and_mentor: a user is both an active student and a mentor in the course
+        - overlapping_spacetimes: a mentor of the course teaches sections at overlapping
+          times, in this course or another course held at the same time
+
+    Overlaps between two courses are reported by only one of them: the one with the
+    smallest id among the `checked` course ids (all courses if None).
+    """
+    issues = []
+
+    duplicate_students = (
+        Student.objects.filter(course=course_id)
+        .values("user")
+        .annotate(count=Count("pk"), students=ArrayAgg("pk", ordering="pk"))
+        .filter(count__gt=1)
+        .values_list("user", "students")
+        .order_by("user")
+    )
+    for user_id, student_ids in duplicate_students:
+        issues.append(
+            issue(
+                "duplicate_students",
+                f"User {user_id} has multiple student profiles",
+                course=course_name,
+                user=user_id,
+                objects=student_ids,
+            )
+        )
+
+    mentor_users = Mentor.objects.filter(course=course_id).values("user")
+    mentor_students = (
+        Student.objects.filter(course=course_id, active=True, user__in=mentor_users)
+        .values_list("user", "pk")
+        .order_by("user", "pk")
+    )
+    for user_id, student_id in mentor_students:
+        issues.append(
+            issue(
+                "student_and_mentor",
+                f"User {user_id} is both a student and a mentor",
+                course=course_name,
+                user=user_id,
+                objects=[student_id],
+            )
+        )
+
+    # spacetimes of every section taught by the course's mentors in courses held at
+    # the same time (whether they are checked or not), sorted for the sweep
+    spacetimes = (
+        Spacetime.objects.filter(
+            section__mentor__user__in=mentor_users,
+            section__mentor__course__section_start__lte=valid_until,
+            section__mentor__course__valid_until__gte=section_start,
+        )
+        .values_list(
+            "pk",
+            "section__mentor__user",
+            "section__mentor__course",
+            "day_of_week",
+            "start_time",
+            "duration",
+        )
+        .order_by("section__mentor__user", "day_of_week", "start_time", "pk")
+    )
+    for (user_id, day_of_week), day_spacetimes in itertools.groupby(
+        spacetimes, key=lambda spacetime: (spacetime[1], spacetime[3])
+    ):
+        intervals = [
+            (time_of_day(start_time), time_of_day(start_time) + duration, (pk, course))
+            for pk, _, course, _, start_time, duration in day_spacetimes
+        ]
+        for (first, first_course), (second, second_course) in find_overlaps(intervals):
+            if course_id not in (first_course, second_course) or course_id != min(
+                course
+                for course in (first_course, second_course)
+                if checked is None or course in checked
+            ):
+                continue
+            issues.append(
+                issue(
+                    "overlapping_spacetimes",
+                    f"User {user_id} teaches overlapping sections on {day_of_week}",
+                    course=course_name,
+                    user=user_id,
+                    objects=[first, second],
+                )
+            )
+    return issues
 
 
 class Command(BaseCommand):
-    help = "Runs through all objects in the database and makes sure nothing funky is up with them."
+    help = (
+        "Runs integrity checks over the whole database and makes sure nothing funky is"
+        " up: queries for users with several student profiles in a course and for"
+        " students who also mentor, and a sort-and-sweep for mentors teaching at"
+        " overlapping times, run concurrently per course. Writes a report of the issues"
+        " found, and fails if there are any."
+    )
 
-    failed = []
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            help=(
+                "only check the course with this id, or the current course with this"
+                " name (repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--format",
+            choices=("text", "json"),
+            default="text",
+            help="format of the report (default text)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                "number of worker processes, each checking one course at a time"
+                " (default: the number of CPUs; 1 checks in this process)"
+            ),
+        )
 
     def handle(self, *args, **options):
-        self._check_section_integrities()
-        self._check_profile_integries()
-        if self.failed:
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+
+        courses = Course.objects.order_by("name")
+        if options["course"]:
+            courses = courses & Course.by_id_or_name(options["course"])
+        jobs = list(courses.values_list("pk", "name", "section_start", "valid_until"))
+        # overlaps with unchecked courses are reported by the checked course
+        checked = {job[0] for job in jobs} if options["course"] else None
+
+        issues = []
+        if not options["course"]:
+            # sections without a mentor do not belong to any course
+            for section_id in Section.objects.filter(mentor__isnull=True).values_list(
+                "pk", flat=True
+            ):
+                issues.append(
+                    issue(
+                        "section_without_mentor",
+                        f"Section {section_id} has no mentor",
+                        objects=[section_id],
+                    )
+                )
+
+        workers = min(options["workers"], len(jobs))
+        if workers <= 1:
+            results = [check_course(*job, checked) for job in jobs]
+        else:
+            # forked workers must not share this process's database connection
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("fork")
+            ) as executor:
+                results = list(
+                    executor.map(check_course, *zip(*jobs), itertools.repeat(checked))
+                )
+        issues.extend(found for result in results for found in result)
+
+        if options["format"] == "json":
+            self.stdout.write(json.dumps({"issues": issues}, indent=2))
+        elif issues:
             self.stderr.write("Integrity check failed with these errors:")
-            for f in self.failed:
-                self.stderr.write(f)
-            raise Exception()
+            for found in issues:
+                course = f"[{found['course']}] " if found["course"] else ""
+                self.stderr.write(
+                    f"{found['check']}: {course}{found['message']} {found['objects']}"
+                )
         else:
             self.stdout.write("All clear. Hopefully. Good luck.")
 
-    def _err(self, msg):
-        # self.stderr.write(msg)
-        self.failed.append(msg)
-
-    def _check_profile_integries(self):
-        """
-        Makes sure no student has two profiles in the same course.
-        """
-        for user in User.objects.all():
-            student_set = user.student_set
-            if student_set.values("section__course").distinct().count() != student_set.count():
-                self._err(f"User {user} had multiple Student profiles in same course: {student_set.all()}")
-
-    def _check_section_integrities(self):
-        """
-        Makes sure that every single section has a mentor.
-        Also makes sure no mentor teaches sections at overlapping times.
-        """
-        sections = Section.objects.all()
-        for section in sections:
-            if section.mentor is None:
-                self._err(f"Section {section} has no mentor")
-
-        mentors = Mentor.objects.select_related("section__spacetime")
-        emails = mentors.values_list("user__email", flat=True).distinct()
-        for email in emails:
-            spacetimes = Spacetime.objects.filter(section__mentor__user__email=email)
-            # Naive n^2 algorithm since n is almost certainly < 2
-            for i, st in enumerate(spacetimes):
-                st_start = dt.datetime.combine(dt.date.today(), st.start_time)
-                st_end = st_start + st.duration
-                for st_2 in spacetimes[i + 1:]:
-                    st_2_start = dt.datetime.combine(dt.date.today(), st_2.start_time)
-                    st_2_end = st_2_start + st_2.duration
-                    if st_2_start <= st_start < st_2_end or st_2_start < st_end <= st_2_end:
-                        self._err(f"Mentor {email} has overlapping sections at {st_2} and {st}")
+        if issues:
+            raise CommandError(f"Integrity check failed with {len(issues)} issue(s)")
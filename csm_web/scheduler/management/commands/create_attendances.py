@@ -1,71 +1,130 @@
-from django.utils import timezone
-from django.core.management import BaseCommand
-from scheduler.models import Attendance, SectionOccurrence, Section, week_bounds, day_to_number
-from psqlextra.util import postgres_manager
-from psqlextra.types import ConflictAction
-from datetime import timedelta
+import datetime
 import logging
-from django.db import transaction, Error
+import time
 
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from scheduler.models import (
+    Attendance,
+    Course,
+    Mentor,
+    Section,
+    SectionOccurrence,
+    Student,
+    week_bounds,
+)
 
 logger = logging.getLogger(__name__)
 logger.info = logger.warning
 
+# attendances of the active students of the courses' sections in every section
+# occurrence within the dates; expects the parameters (course ids, start, end)
+INSERT_ATTENDANCES_SQL = f"""
+    INSERT INTO {Attendance._meta.db_table}
+        (student_id, "sectionOccurrence_id", date, presence)
+    SELECT student.id, occurrence.id, occurrence.date, ''
+    FROM {SectionOccurrence._meta.db_table} AS occurrence
+    JOIN {Section._meta.db_table} AS section ON section.id = occurrence.section_id
+    JOIN {Mentor._meta.db_table} AS mentor ON mentor.id = section.mentor_id
+    JOIN {Student._meta.db_table} AS student
+        ON student.section_id = occurrence.section_id AND student.active
+    WHERE mentor.course_id = ANY(%s) AND occurrence.date BETWEEN %s AND %s
+    ON CONFLICT ("sectionOccurrence_id", student_id, date) DO NOTHING
+"""
 
-class Command(BaseCommand):
-    help = "Creates attendances for the current week"
 
-    def handle(self, *args, **options):
-        now = timezone.now().astimezone(timezone.get_default_timezone())
-        week_start, _ = week_bounds(now.date())
-        sections = Section.objects.all()
-        logger.info(f"Updating attendance for week of {week_start}")
-        with transaction.atomic():
-            # with postgres_manager(SectionOccurrence) as so_db:
-            #     so_manager = so_db.on_conflict(["date", "section"], ConflictAction.NOTHING)
+def parse_date(value):
+    """Parse a YYYY-MM-DD command line argument."""
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as e:
+        raise CommandError(f"Invalid date {value!r}; expected YYYY-MM-DD") from e
 
-            sos = [{"date": week_start + timedelta(days=day_to_number(spacetime.day_of_week)),
-                    "section": section} for section in sections for spacetime in section.spacetimes.all()]
-            sos_models = []  # list of section occurrence models
-            for so in sos:
-                section = so["section"]
-                date = so["date"]
-                if date < section.mentor.course.section_start:
-                    # skip section occurrence if it's before section start date
-                    continue
-                try:
-                    cur, _ = SectionOccurrence.objects.get_or_create(**so)
-                    sos_models.append(cur)
-                except Error as e:
-                    logger.error("<Logging> Failed to save {so};", e)
-            # sos = so_manager.bulk_insert(sos, return_model=True)
-            logger.info(f"Inserted {len(sos_models)} SectionOccurrences.")
 
-            # with postgres_manager(Attendance) as attend_db:
-            #     attendance_manager = attend_db.on_conflict(["sectionOccurrence", "student"], ConflictAction.NOTHING)
-            attendances = [{"student": student, "sectionOccurrence": so}
-                           for so in sos_models for student in so.section.students.filter(active=True)]
+class Command(BaseCommand):
+    help = (
+        "Creates attendances for the current week, or for the given week or date range,"
+        " in the section occurrences of the courses held then. The occurrences are"
+        " materialized first (see `Course.materialize_occurrences`), so that overrides,"
+        " holidays and the end of the term are honoured; attendances are inserted with"
+        " a set-based INSERT ... ON CONFLICT DO NOTHING, leaving existing rows untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            help=(
+                "only create attendances for the course with this id, or with this name"
+                " (among courses that had not ended by the first date; repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--week",
+            type=parse_date,
+            help="create attendances for the week containing this date (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--start",
+            type=parse_date,
+            help="first date (inclusive) of a range to backfill (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--end",
+            type=parse_date,
+            help="last date (inclusive) of a range to backfill (YYYY-MM-DD)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="report the number of rows that would be inserted, without saving them",
+        )
 
-            # validate attendances
-            valid = True
-            for attendance in attendances:
-                student = attendance.get("student")
-                SO = attendance.get("sectionOccurrence")
-                if student and SO:
-                    if student.section.pk != SO.section.pk:
-                        valid = False
-                        logger.error(
-                            f"<Logging> student.section.pk != SO.section.pk, attendance to add: {attendances}")
-                        break
+    def handle(self, *args, **options):
+        if options["week"] and (options["start"] or options["end"]):
+            raise CommandError("--week cannot be combined with --start/--end")
+        if options["start"] or options["end"]:
+            if not (options["start"] and options["end"]):
+                raise CommandError("--start and --end must be given together")
+            start, end = options["start"], options["end"]
+            if end < start:
+                raise CommandError("--end must not be before --start")
+        else:
+            now = timezone.now().astimezone(timezone.get_default_timezone())
+            start = week_bounds(options["week"] or now.date())[0]
+            end = start + datetime.timedelta(days=6)
 
-            if attendances and valid:
-                for attendance in attendances:
-                    try:
-                        Attendance.objects.get_or_create(**attendance)
-                    except Error as e:
-                        logger.error("<Logging> Failed to save {attendance};", e)
-                # inserted = attendance_manager.bulk_insert(attendances)
+        # only courses held during the dates, so that past terms are left untouched
+        courses = Course.objects.filter(valid_until__gte=start, section_start__lte=end)
+        if options["course"]:
+            courses = courses & Course.by_id_or_name(options["course"], start)
+        course_ids = list(courses.values_list("pk", flat=True))
+
+        logger.info(
+            "<Attendance> Creating attendances from %s to %s%s",
+            start,
+            end,
+            " (dry run)" if options["dry_run"] else "",
+        )
+        start_time = time.perf_counter()
+        with transaction.atomic():
+            num_created, num_deleted = Course.materialize_occurrences(
+                Course.objects.filter(pk__in=course_ids)
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(INSERT_ATTENDANCES_SQL, [course_ids, start, end])
+                num_attendances = cursor.rowcount
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+        elapsed = time.perf_counter() - start_time
 
-                logger.info(f"Inserted {len(attendances)} attendances.")
-            else:
-                logger.info("No attendances to insert or error.")
+        logger.info(
+            "<Attendance> %s: %s SectionOccurrences created and %s deleted,"
+            " %s attendances inserted in %.2fs.",
+            "Dry run" if options["dry_run"] else "Done",
+            num_created,
+            num_deleted,
+            num_attendances,
+            elapsed,
+        )
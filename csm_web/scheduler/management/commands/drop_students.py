@@ -31,7 +31,7 @@ class Command(BaseCommand):
                 now = timezone.now().astimezone(timezone.get_default_timezone())
                 student.attendance_set.filter(
                     Q(
-                        sectionOccurrence__date__gte=now.date(),
+                        date__gte=now.date(),
                         sectionOccurrence__section=student.section,
                     )
                 ).delete()
@@ -30,13 +30,11 @@ class Command(BaseCommand):
         course = Course.objects.get(name=options["course"].upper())
         attendances = (
             Attendance.objects.filter(student__active=True, student__course=course)
-            .select_related(
-                "student__user", "student__section__mentor", "sectionOccurrence"
-            )
+            .select_related("student__user", "student__section__mentor")
             .prefetch_related("student__section__spacetimes")
             .order_by(
                 "student__pk",
-                "sectionOccurrence__date",
+                "date",
                 "student__section__mentor",
             )
         )
@@ -50,7 +48,7 @@ class Command(BaseCommand):
             row = (
                 student.user.get_full_name(),
                 student.user.email,
-                str(attendance.sectionOccurrence.date),
+                str(attendance.date),
                 attendance.get_presence_display(),
                 mentor.user.get_full_name(),
                 mentor.user.email,
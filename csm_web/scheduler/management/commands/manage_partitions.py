@@ -0,0 +1,94 @@
+import datetime
+import logging
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+from scheduler.partitioning import (
+    add_months,
+    create_partition,
+    detach_partition,
+    manager,
+    range_partitions,
+)
+
+logger = logging.getLogger(__name__)
+logger.info = logger.warning
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the upcoming monthly partitions of the partitioned tables (Attendance),"
+        " and optionally detaches (or drops) partitions of past terms. Should be run"
+        " regularly, e.g. daily alongside create_attendances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--detach-before",
+            type=datetime.date.fromisoformat,
+            help=(
+                "detach partitions that only contain dates before this date"
+                " (YYYY-MM-DD); detached partitions are kept as standalone tables"
+            ),
+        )
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            help=(
+                "detach partitions that end more than this many months ago"
+                " (alternative to --detach-before)"
+            ),
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="drop old partitions instead of detaching them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the partitions that would be created and detached",
+        )
+
+    def handle(self, *args, **options):
+        if options["detach_before"] and options["keep_months"] is not None:
+            raise CommandError("--detach-before cannot be combined with --keep-months")
+        detach_before = options["detach_before"]
+        if options["keep_months"] is not None:
+            if options["keep_months"] < 0:
+                raise CommandError("--keep-months must not be negative")
+            now = timezone.now().astimezone(timezone.get_default_timezone())
+            detach_before = add_months(now.date(), -options["keep_months"])
+        if options["drop"] and detach_before is None:
+            raise CommandError("--drop requires --detach-before or --keep-months")
+        dry_run = " (dry run)" if options["dry_run"] else ""
+
+        for model_plan in manager.plan(skip_delete=True).model_plans:
+            model = model_plan.config.model
+            for partition in model_plan.creations:
+                if not options["dry_run"]:
+                    create_partition(model, partition)
+                logger.info(
+                    "<Partitions> Created partition %s_%s [%s, %s)%s",
+                    model._meta.db_table,
+                    partition.name(),
+                    partition.from_values,
+                    partition.to_values,
+                    dry_run,
+                )
+
+        if detach_before is None:
+            return
+        for config in manager.configs:
+            model = config.model
+            for name, _, end in range_partitions(model):
+                if end > detach_before:
+                    continue
+                if not options["dry_run"]:
+                    detach_partition(model, name, drop=options["drop"])
+                logger.info(
+                    "<Partitions> %s partition %s%s",
+                    "Dropped" if options["drop"] else "Detached",
+                    name,
+                    dry_run,
+                )
@@ -0,0 +1,76 @@
+import datetime
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from scheduler.models import Course, Holiday
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD command line argument."""
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as e:
+        raise CommandError(f"Invalid date {value!r}; expected YYYY-MM-DD") from e
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the section occurrences of the whole term (from section_start to"
+        " valid_until) for every section, skipping the course's holidays, in a single"
+        " bulk statement. Safe to rerun after spacetimes or holidays change: upcoming"
+        " occurrences that no longer match are removed, unless attendance was taken."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            help=(
+                "only materialize occurrences of the course with this id, or with this"
+                " name (among courses that have not ended; repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--holiday",
+            action="append",
+            type=parse_date,
+            default=[],
+            help=(
+                "add a holiday on this date, in the form yyyy-mm-dd, to the courses"
+                " before materializing (repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the number of occurrences that would change",
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course"]:
+            courses = Course.by_id_or_name(options["course"])
+
+        with transaction.atomic():
+            Holiday.objects.bulk_create(
+                [
+                    Holiday(course=course, date=date)
+                    for course in courses
+                    for date in options["holiday"]
+                ],
+                ignore_conflicts=True,
+            )
+            created, deleted = Course.materialize_occurrences(courses)
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+                self.stdout.write(
+                    f"Would create {created} and delete {deleted} section"
+                    " occurrence(s)."
+                )
+                return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} and deleted {deleted} section occurrence(s)."
+            )
+        )
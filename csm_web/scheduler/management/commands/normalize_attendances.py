@@ -1,32 +1,211 @@
 from django.core.management import BaseCommand
-from scheduler.models import Attendance, Student, Spacetime, day_to_number, week_bounds
-from itertools import groupby
-from django.db.models import Prefetch
-from datetime import timedelta
+from django.db import connection, transaction
+from scheduler.models import Attendance, Course, SectionOccurrence, Student
+
+# For every week of every active student, attendances for occurrences of a section
+# other than the student's current one (misaligned, e.g. after switching sections)
+# are paired up, in date order, with the occurrences of the current section that week
+# which the student has no attendance for; the window functions number both sides.
+# Each misaligned attendance is then either:
+#   - remap: moved to its paired occurrence
+#   - delete: a duplicate, as every occurrence of the current section that week
+#     already has an attendance
+#   - keep: a duplicate unexcused absence, which is kept so that it is not lost
+#   - unmatched: the current section has no occurrence that week; left alone
+# Expects the course filter to be formatted in, and its parameters.
+PLAN_SQL = f"""
+    WITH attendance AS (
+        SELECT
+            attendance.id,
+            attendance.student_id,
+            attendance."sectionOccurrence_id" AS section_occurrence_id,
+            attendance.date,
+            attendance.presence,
+            occurrence.section_id,
+            student.section_id AS current_section_id,
+            date_trunc('week', attendance.date)::date AS week
+        FROM {Attendance._meta.db_table} AS attendance
+        JOIN {Student._meta.db_table} AS student ON student.id = attendance.student_id
+        JOIN {SectionOccurrence._meta.db_table} AS occurrence
+            ON occurrence.id = attendance."sectionOccurrence_id"
+        WHERE student.active AND occurrence.section_id <> student.section_id
+            {{course_filter}}
+    ),
+    misaligned AS (
+        SELECT
+            attendance.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY attendance.student_id, attendance.week
+                ORDER BY attendance.date, attendance.id
+            ) AS position
+        FROM attendance
+    ),
+    weeks AS (
+        SELECT DISTINCT student_id, week, current_section_id FROM attendance
+    ),
+    targets AS (
+        SELECT
+            weeks.student_id,
+            weeks.week,
+            occurrence.id AS section_occurrence_id,
+            occurrence.date,
+            EXISTS (
+                SELECT 1 FROM {Attendance._meta.db_table} AS taken
+                WHERE taken."sectionOccurrence_id" = occurrence.id
+                    AND taken.student_id = weeks.student_id
+                    AND taken.date = occurrence.date
+            ) AS taken
+        FROM weeks
+        JOIN {SectionOccurrence._meta.db_table} AS occurrence
+            ON occurrence.section_id = weeks.current_section_id
+            AND occurrence.date >= weeks.week
+            AND occurrence.date < weeks.week + 7
+    ),
+    free_targets AS (
+        SELECT
+            targets.*,
+            ROW_NUMBER() OVER (
+                PARTITION BY targets.student_id, targets.week
+                ORDER BY targets.date, targets.section_occurrence_id
+            ) AS position
+        FROM targets
+        WHERE NOT targets.taken
+    )
+    SELECT
+        misaligned.id,
+        misaligned.student_id,
+        misaligned.presence,
+        misaligned.section_id,
+        misaligned.section_occurrence_id,
+        misaligned.date,
+        free_targets.section_occurrence_id AS target_section_occurrence_id,
+        free_targets.date AS target_date,
+        CASE
+            WHEN free_targets.section_occurrence_id IS NOT NULL THEN 'remap'
+            WHEN NOT EXISTS (
+                SELECT 1 FROM targets
+                WHERE targets.student_id = misaligned.student_id
+                    AND targets.week = misaligned.week
+            ) THEN 'unmatched'
+            WHEN misaligned.presence = 'UN' THEN 'keep'
+            ELSE 'delete'
+        END AS action
+    FROM misaligned
+    LEFT JOIN free_targets
+        ON free_targets.student_id = misaligned.student_id
+        AND free_targets.week = misaligned.week
+        AND free_targets.position = misaligned.position
+    ORDER BY misaligned.student_id, misaligned.date, misaligned.id
+"""
+
+REMAP_SQL = f"""
+    UPDATE {Attendance._meta.db_table} AS attendance
+    SET "sectionOccurrence_id" = remapped.section_occurrence_id, date = remapped.date
+    FROM (VALUES {{values}}) AS remapped (id, section_occurrence_id, date)
+    WHERE attendance.id = remapped.id
+"""
+
+DELETE_SQL = f"""
+    DELETE FROM {Attendance._meta.db_table}
+    WHERE id = ANY(%s::integer[]) AND date = ANY(%s::date[])
+"""
 
 
 class Command(BaseCommand):
+    help = (
+        "Normalize attendances such that they are for occurrences of the student's"
+        " CURRENT section, and delete attendances duplicated for the week resulting"
+        " from students swapping sections in the same course, so long as they aren't"
+        " unexcused absences. Prints the changes as a diff."
+    )
 
-    help = """Normalize attendances such that they fall on the same day of the week as the student's CURRENT section, and delete
-attendances duplicated for the week resulting from students swapping sections in the same course,
-so long as they aren't unexecused absences"""
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            action="append",
+            help=(
+                "only normalize attendances in the course with this id, or the current"
+                " course with this name (repeatable)"
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only print the changes that would be made",
+        )
 
     def handle(self, *args, **options):
-        attendances_to_update = []
-        for student in Student.objects.all().prefetch_related(
-                Prefetch("section__spacetimes", queryset=Spacetime.objects.all().order_by(
-                    "day_of_week").only("day_of_week")),
-                Prefetch("attendance_set", queryset=Attendance.objects.all().order_by("date"))):
-            days = student.section.spacetimes.values_list("day_of_week", flat=True)
-            for _, attendances in groupby(student.attendance_set.all(), lambda attendance: week_bounds(attendance.date)):
-                attendances = list(attendances)
-                for attendance, day in zip(attendances, days):
-                    if attendance.date.strftime("%A") != day:
-                        if not any(attendance.date.strftime("%A") == day for attendance in attendances):
-                            attendance.date = attendance.date + \
-                                timedelta(days=day_to_number(day) - attendance.date.weekday())
-                            attendances_to_update.append(attendance)
-                        elif attendance.presence != Attendance.Presence.UNEXCUSED_ABSENCE:
-                            attendance.delete()
-
-        Attendance.objects.bulk_update(attendances_to_update, ("date",))
+        course_filter, params = "", []
+        if options["course"]:
+            course_filter = "AND student.course_id = ANY(%s)"
+            params = [
+                list(
+                    Course.by_id_or_name(options["course"]).values_list("pk", flat=True)
+                )
+            ]
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(PLAN_SQL.format(course_filter=course_filter), params)
+            columns = [column.name for column in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+            for row in plan:
+                self.stdout.write(self.format_change(row))
+
+            remapped = [row for row in plan if row["action"] == "remap"]
+            deleted = [row for row in plan if row["action"] == "delete"]
+            if not options["dry_run"]:
+                if remapped:
+                    values = ", ".join(
+                        ["(%s::integer, %s::integer, %s::date)"] * len(remapped)
+                    )
+                    cursor.execute(
+                        REMAP_SQL.format(values=values),
+                        [
+                            param
+                            for row in remapped
+                            for param in (
+                                row["id"],
+                                row["target_section_occurrence_id"],
+                                row["target_date"],
+                            )
+                        ],
+                    )
+                if deleted:
+                    cursor.execute(
+                        DELETE_SQL,
+                        [
+                            [row["id"] for row in deleted],
+                            sorted({row["date"] for row in deleted}),
+                        ],
+                    )
+
+        counts = {
+            action: sum(row["action"] == action for row in plan)
+            for action in ("remap", "delete", "keep", "unmatched")
+        }
+        self.stdout.write(
+            f"{'Would remap' if options['dry_run'] else 'Remapped'} {counts['remap']},"
+            f" {'would delete' if options['dry_run'] else 'deleted'} {counts['delete']}"
+            f" attendance(s); kept {counts['keep']} duplicate unexcused absence(s),"
+            f" {counts['unmatched']} attendance(s) have no occurrence to move to."
+        )
+
+    @staticmethod
+    def format_change(row):
+        """Format a planned change to a misaligned attendance as a diff line."""
+        attendance = (
+            f"attendance {row['id']} (student {row['student_id']},"
+            f" {row['presence'] or '--'}): {row['date']} section {row['section_id']}"
+            f" occurrence {row['section_occurrence_id']}"
+        )
+        if row["action"] == "remap":
+            return (
+                f"~ {attendance} -> {row['target_date']}"
+                f" occurrence {row['target_section_occurrence_id']}"
+            )
+        if row["action"] == "delete":
+            return f"- {attendance}"
+        if row["action"] == "keep":
+            return f"  {attendance} (duplicate unexcused absence, kept)"
+        return f"  {attendance} (no occurrence of the current section that week)"
@@ -0,0 +1,44 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from scheduler.models import AttendanceSummary, Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the attendance summary of every student from their attendances,"
+        " in a single set-based statement. Summaries are kept up to date by triggers;"
+        " this is only needed after attendances were modified behind their back"
+        " (e.g. after detaching a partition)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=str,
+            help="only rebuild the summaries of students in the course with this name",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report students with an incorrect summary; do not modify them",
+        )
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        if options["course"]:
+            students = students.filter(course__name=options["course"])
+
+        with transaction.atomic():
+            rebuilt = AttendanceSummary.rebuild(students)
+            for student_id in rebuilt:
+                self.stdout.write(f"Student {student_id}: summary was out of date")
+
+            if options["dry_run"]:
+                transaction.set_rollback(True)
+                self.stdout.write(
+                    f"{len(rebuilt)} student(s) have an incorrect summary."
+                )
+                return
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(rebuilt)} attendance summaries.")
+        )
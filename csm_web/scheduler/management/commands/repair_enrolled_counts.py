@@ -0,0 +1,50 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+from scheduler.models import Section
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the stored enrolled student count of every section from the active"
+        " students, in a single set-based UPDATE."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=str,
+            help="only repair sections in the course with this name",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report sections with an incorrect count; do not modify them",
+        )
+
+    def handle(self, *args, **options):
+        sections = Section.objects.all()
+        if options["course"]:
+            sections = sections.filter(mentor__course__name=options["course"])
+
+        with transaction.atomic():
+            drifted = (
+                sections.annotate(
+                    actual_count=Count("students", filter=Q(students__active=True))
+                )
+                .exclude(enrolled_count=F("actual_count"))
+                .values_list("pk", "enrolled_count", "actual_count")
+            )
+            for section_id, stored, actual in drifted:
+                self.stdout.write(
+                    f"Section {section_id}: stored count {stored}, actual count {actual}"
+                )
+
+            if options["dry_run"]:
+                self.stdout.write(f"{len(drifted)} section(s) have an incorrect count.")
+                return
+
+            Section.recompute_enrolled_counts(sections)
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired {len(drifted)} section count(s).")
+        )
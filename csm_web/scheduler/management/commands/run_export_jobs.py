@@ -0,0 +1,48 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from scheduler.models import ExportJob
+from scheduler.views.export import run_export_job
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker running the background export jobs created through /api/export/jobs,"
+        " writing their CSV files to the default storage. Several workers may run at"
+        " once; each job is claimed by a single worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="exit once there are no pending jobs left, instead of polling for more",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2,
+            help="seconds to wait between checks for new jobs (default 2)",
+        )
+
+    def handle(self, *args, **options):
+        num_jobs = 0
+        while True:
+            job = ExportJob.claim()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                # the connection may have been closed by the database while idle
+                close_old_connections()
+                continue
+
+            started = time.perf_counter()
+            run_export_job(job)
+            num_jobs += 1
+            self.stdout.write(
+                f"Export job {job.pk} ({job.export_type}, {job.rows_written} rows):"
+                f" {job.status} in {time.perf_counter() - started:.1f}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Ran {num_jobs} export job(s)."))
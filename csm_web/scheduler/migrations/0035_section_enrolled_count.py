@@ -0,0 +1,38 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0034_mentor_family"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="section",
+            name="enrolled_count",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                editable=False,
+                help_text=(
+                    "Number of active students in the section; only ever modified"
+                    " through atomic updates."
+                ),
+            ),
+        ),
+        # backfill the seat counter from the current enrollments
+        migrations.RunSQL(
+            sql="""
+            UPDATE scheduler_section AS section
+            SET enrolled_count = counts.num_students
+            FROM (
+                SELECT section_id, COUNT(*) AS num_students
+                FROM scheduler_student
+                WHERE active
+                GROUP BY section_id
+            ) AS counts
+            WHERE counts.section_id = section.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
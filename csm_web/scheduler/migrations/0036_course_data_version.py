@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0035_section_enrolled_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="data_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text=(
+                    "Incremented whenever the course's sections change; used to key"
+                    " cached section catalogs."
+                ),
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0036_course_data_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="section",
+            name="seats_updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="When the seat counter of the section last changed.",
+            ),
+        ),
+    ]
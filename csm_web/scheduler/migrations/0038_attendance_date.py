@@ -0,0 +1,53 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0037_section_seats_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attendance",
+            name="date",
+            field=models.DateField(
+                editable=False,
+                help_text="Date of the section occurrence (denormalized).",
+                null=True,
+            ),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE scheduler_attendance AS attendance
+            SET date = occurrence.date
+            FROM scheduler_sectionoccurrence AS occurrence
+            WHERE occurrence.id = attendance."sectionOccurrence_id"
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="attendance",
+            name="date",
+            field=models.DateField(
+                editable=False,
+                help_text="Date of the section occurrence (denormalized).",
+            ),
+        ),
+        migrations.AlterModelOptions(
+            name="attendance",
+            options={"ordering": ("date", "sectionOccurrence_id")},
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["student", "date"], name="scheduler_a_student_a914ab_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="attendance",
+            index=models.Index(
+                fields=["presence", "student"], name="scheduler_a_presenc_3ed98d_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,169 @@
+import datetime
+
+import django.db.models.deletion
+import psqlextra.manager.manager
+import psqlextra.models.partitioned
+from django.db import migrations, models
+from psqlextra.backend.migrations.operations import (
+    PostgresAddDefaultPartition,
+    PostgresCreatePartitionedModel,
+)
+from psqlextra.partitioning import PostgresTimePartition, PostgresTimePartitionSize
+from psqlextra.partitioning.constants import AUTO_PARTITIONED_COMMENT
+from psqlextra.types import PostgresPartitioningMethod
+
+# the existing table is renamed, and its rows copied into the partitioned table
+OLD_TABLE = "scheduler_attendance_unpartitioned"
+
+# number of monthly partitions to create ahead of the current month
+PARTITIONS_AHEAD = 8
+
+# rename the existing table, along with its indexes and id sequence,
+# so that the names are free for the partitioned table
+RENAME_TABLE_SQL = f"""
+    ALTER TABLE scheduler_attendance RENAME TO {OLD_TABLE};
+    DO $$
+    DECLARE
+        index_name text;
+    BEGIN
+        FOR index_name IN
+            SELECT index_class.relname
+            FROM pg_index
+            JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+            WHERE pg_index.indrelid = '{OLD_TABLE}'::regclass
+        LOOP
+            EXECUTE format(
+                'ALTER INDEX %I RENAME TO %I', index_name, left(index_name, 55) || '_unpart'
+            );
+        END LOOP;
+        EXECUTE format(
+            'ALTER SEQUENCE %s RENAME TO {OLD_TABLE}_id_seq',
+            pg_get_serial_sequence('{OLD_TABLE}', 'id')
+        );
+    END $$;
+"""
+
+COPY_ROWS_SQL = f"""
+    INSERT INTO scheduler_attendance
+        (id, presence, student_id, "sectionOccurrence_id", date)
+    SELECT id, presence, student_id, "sectionOccurrence_id", date FROM {OLD_TABLE};
+    SELECT setval(
+        pg_get_serial_sequence('scheduler_attendance', 'id'),
+        COALESCE((SELECT MAX(id) FROM scheduler_attendance), 1),
+        (SELECT MAX(id) FROM scheduler_attendance) IS NOT NULL
+    );
+    DROP TABLE {OLD_TABLE};
+"""
+
+
+def add_months(date, months):
+    """First day of the month `months` months after that of the date."""
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def create_partitions(apps, schema_editor):
+    """
+    Create monthly partitions for every month with existing attendances,
+    up to `PARTITIONS_AHEAD` months from now.
+    """
+    model = apps.get_model("scheduler", "Attendance")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(date), MAX(date) FROM {OLD_TABLE}")
+        first, last = cursor.fetchone()
+    today = datetime.date.today()
+    month = min(first or today, today).replace(day=1)
+    last = max((last or today).replace(day=1), add_months(today, PARTITIONS_AHEAD - 1))
+    while month <= last:
+        PostgresTimePartition(
+            size=PostgresTimePartitionSize(months=1),
+            start_datetime=datetime.datetime(month.year, month.month, 1),
+        ).create(model, schema_editor, comment=AUTO_PARTITIONED_COMMENT)
+        month = add_months(month, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0038_attendance_date"),
+    ]
+
+    operations = [
+        migrations.RunSQL(RENAME_TABLE_SQL),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.DeleteModel(name="Attendance")]
+        ),
+        PostgresCreatePartitionedModel(
+            name="Attendance",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "presence",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("PR", "Present"),
+                            ("UN", "Unexcused absence"),
+                            ("EX", "Excused absence"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="scheduler.student",
+                    ),
+                ),
+                (
+                    "sectionOccurrence",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="scheduler.sectionoccurrence",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateField(
+                        editable=False,
+                        help_text="Date of the section occurrence (denormalized).",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("date", "sectionOccurrence_id"),
+                "indexes": [
+                    models.Index(
+                        fields=["student", "date"],
+                        name="scheduler_a_student_a914ab_idx",
+                    ),
+                    models.Index(
+                        fields=["presence", "student"],
+                        name="scheduler_a_presenc_3ed98d_idx",
+                    ),
+                ],
+                "unique_together": {("sectionOccurrence", "student", "date")},
+            },
+            partitioning_options={
+                "method": PostgresPartitioningMethod["RANGE"],
+                "key": ["date"],
+            },
+            bases=(psqlextra.models.partitioned.PostgresPartitionedModel,),
+            managers=[
+                ("objects", psqlextra.manager.manager.PostgresManager()),
+            ],
+        ),
+        PostgresAddDefaultPartition(model_name="attendance", name="default"),
+        # the partitions are dropped along with the partitioned table
+        migrations.RunPython(create_partitions, migrations.RunPython.noop),
+        migrations.RunSQL(COPY_ROWS_SQL),
+    ]
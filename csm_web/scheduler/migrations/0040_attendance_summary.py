@@ -0,0 +1,126 @@
+import django.db.models.deletion
+import scheduler.models
+from django.db import migrations, models
+
+# keeps the attendance summaries up to date, from the transition tables of the
+# statement that modified the attendances: rows of `old_rows` are subtracted
+# (recomputing the last attended date if it may have been removed), and rows
+# of `new_rows` are added
+CREATE_TRIGGERS_SQL = """
+    CREATE FUNCTION scheduler_attendancesummary_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE scheduler_attendancesummary AS summary SET
+                present_count = summary.present_count - removed.present_count,
+                excused_count = summary.excused_count - removed.excused_count,
+                unexcused_count = summary.unexcused_count - removed.unexcused_count,
+                last_attended = CASE
+                    WHEN removed.last_attended >= summary.last_attended THEN (
+                        SELECT MAX(attendance.date) FROM scheduler_attendance AS attendance
+                        WHERE attendance.student_id = summary.student_id
+                            AND attendance.presence = 'PR'
+                    )
+                    ELSE summary.last_attended
+                END
+            FROM (
+                SELECT
+                    student_id,
+                    COUNT(*) FILTER (WHERE presence = 'PR') AS present_count,
+                    COUNT(*) FILTER (WHERE presence = 'EX') AS excused_count,
+                    COUNT(*) FILTER (WHERE presence = 'UN') AS unexcused_count,
+                    MAX(date) FILTER (WHERE presence = 'PR') AS last_attended
+                FROM old_rows
+                GROUP BY student_id
+            ) AS removed
+            WHERE summary.student_id = removed.student_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO scheduler_attendancesummary AS summary
+                (student_id, present_count, excused_count, unexcused_count, last_attended)
+            SELECT
+                student_id,
+                COUNT(*) FILTER (WHERE presence = 'PR'),
+                COUNT(*) FILTER (WHERE presence = 'EX'),
+                COUNT(*) FILTER (WHERE presence = 'UN'),
+                MAX(date) FILTER (WHERE presence = 'PR')
+            FROM new_rows
+            GROUP BY student_id
+            ORDER BY student_id
+            ON CONFLICT (student_id) DO UPDATE SET
+                present_count = summary.present_count + EXCLUDED.present_count,
+                excused_count = summary.excused_count + EXCLUDED.excused_count,
+                unexcused_count = summary.unexcused_count + EXCLUDED.unexcused_count,
+                last_attended = GREATEST(summary.last_attended, EXCLUDED.last_attended);
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+
+    CREATE TRIGGER scheduler_attendancesummary_insert
+        AFTER INSERT ON scheduler_attendance
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION scheduler_attendancesummary_apply();
+    CREATE TRIGGER scheduler_attendancesummary_update
+        AFTER UPDATE ON scheduler_attendance
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION scheduler_attendancesummary_apply();
+    CREATE TRIGGER scheduler_attendancesummary_delete
+        AFTER DELETE ON scheduler_attendance
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION scheduler_attendancesummary_apply();
+"""
+
+DROP_TRIGGERS_SQL = """
+    DROP TRIGGER scheduler_attendancesummary_insert ON scheduler_attendance;
+    DROP TRIGGER scheduler_attendancesummary_update ON scheduler_attendance;
+    DROP TRIGGER scheduler_attendancesummary_delete ON scheduler_attendance;
+    DROP FUNCTION scheduler_attendancesummary_apply();
+"""
+
+BACKFILL_SQL = """
+    INSERT INTO scheduler_attendancesummary
+        (student_id, present_count, excused_count, unexcused_count, last_attended)
+    SELECT
+        student_id,
+        COUNT(*) FILTER (WHERE presence = 'PR'),
+        COUNT(*) FILTER (WHERE presence = 'EX'),
+        COUNT(*) FILTER (WHERE presence = 'UN'),
+        MAX(date) FILTER (WHERE presence = 'PR')
+    FROM scheduler_attendance
+    GROUP BY student_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0039_partition_attendance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttendanceSummary",
+            fields=[
+                (
+                    "student",
+                    scheduler.models.OneToOneOrNoneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="attendance_summary",
+                        serialize=False,
+                        to="scheduler.student",
+                    ),
+                ),
+                ("present_count", models.PositiveIntegerField(default=0)),
+                ("excused_count", models.PositiveIntegerField(default=0)),
+                ("unexcused_count", models.PositiveIntegerField(default=0)),
+                ("last_attended", models.DateField(blank=True, null=True)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_students(apps, schema_editor):
+    """Fail with the offending students if a user is enrolled twice in a course."""
+    Student = apps.get_model("scheduler", "Student")
+    duplicates = list(
+        Student.objects.filter(active=True)
+        .values("user", "course")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Users with several active student profiles in a course must be dropped"
+            f" from all but one section before migrating: {duplicates}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0042_export_job"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            check_duplicate_students, reverse_code=migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="student",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("active", True)),
+                fields=("user", "course"),
+                name="unique_active_student_per_course",
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations, models
+
+# the trigger function of migration 0040, which also increments the version of every
+# summary it changes; `{version}` is filled in with the version assignments
+APPLY_FUNCTION_SQL = """
+    CREATE OR REPLACE FUNCTION scheduler_attendancesummary_apply() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE scheduler_attendancesummary AS summary SET
+                present_count = summary.present_count - removed.present_count,
+                excused_count = summary.excused_count - removed.excused_count,
+                unexcused_count = summary.unexcused_count - removed.unexcused_count,
+                last_attended = CASE
+                    WHEN removed.last_attended >= summary.last_attended THEN (
+                        SELECT MAX(attendance.date) FROM scheduler_attendance AS attendance
+                        WHERE attendance.student_id = summary.student_id
+                            AND attendance.presence = 'PR'
+                    )
+                    ELSE summary.last_attended
+                END{version}
+            FROM (
+                SELECT
+                    student_id,
+                    COUNT(*) FILTER (WHERE presence = 'PR') AS present_count,
+                    COUNT(*) FILTER (WHERE presence = 'EX') AS excused_count,
+                    COUNT(*) FILTER (WHERE presence = 'UN') AS unexcused_count,
+                    MAX(date) FILTER (WHERE presence = 'PR') AS last_attended
+                FROM old_rows
+                GROUP BY student_id
+            ) AS removed
+            WHERE summary.student_id = removed.student_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO scheduler_attendancesummary AS summary
+                (student_id, present_count, excused_count, unexcused_count, last_attended)
+            SELECT
+                student_id,
+                COUNT(*) FILTER (WHERE presence = 'PR'),
+                COUNT(*) FILTER (WHERE presence = 'EX'),
+                COUNT(*) FILTER (WHERE presence = 'UN'),
+                MAX(date) FILTER (WHERE presence = 'PR')
+            FROM new_rows
+            GROUP BY student_id
+            ORDER BY student_id
+            ON CONFLICT (student_id) DO UPDATE SET
+                present_count = summary.present_count + EXCLUDED.present_count,
+                excused_count = summary.excused_count + EXCLUDED.excused_count,
+                unexcused_count = summary.unexcused_count + EXCLUDED.unexcused_count,
+                last_attended = GREATEST(summary.last_attended, EXCLUDED.last_attended){version};
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0043_student_unique_active_per_course"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attendancesummary",
+            name="version",
+            field=models.PositiveBigIntegerField(db_default=0, default=0),
+        ),
+        migrations.RunSQL(
+            APPLY_FUNCTION_SQL.format(version=", version = summary.version + 1"),
+            APPLY_FUNCTION_SQL.format(version=""),
+        ),
+    ]
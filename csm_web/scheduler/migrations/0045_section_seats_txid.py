@@ -0,0 +1,25 @@
+import scheduler.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("scheduler", "0044_attendance_summary_version"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="section",
+            name="seats_updated_at",
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="seats_txid",
+            field=models.BigIntegerField(
+                db_default=scheduler.models.CurrentTransactionId(),
+                editable=False,
+                help_text="Id of the transaction that last changed the seat counter of the section.",
+            ),
+        ),
+    ]
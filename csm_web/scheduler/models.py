@@ -1,14 +1,22 @@
 import datetime
+import hashlib
+import json
 import logging
 import re
+import uuid
+from functools import cached_property
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import EmptyResultSet, ObjectDoesNotExist
+from django.db import connection, models, transaction
 from django.db.models.fields.related_descriptors import ReverseOneToOneDescriptor
+from django.db.models.functions import Coalesce
 from django.dispatch import receiver
-from django.utils import functional, timezone
+from django.utils import timezone
+from psqlextra.models import PostgresPartitionedModel
+from psqlextra.types import PostgresPartitioningMethod
 from rest_framework.serializers import ValidationError
 
 logger = logging.getLogger(__name__)
@@ -48,31 +56,91 @@ def week_bounds(date):
     return week_start, week_end
 
 
-class User(AbstractUser):
-    priority_enrollment = models.DateTimeField(null=True, blank=True)
+class CurrentTransactionId(models.Func):
+    """
+    The id of the current transaction; unlike timestamps, these can be compared
+    against the oldest transaction still running (see `Section.seat_feed_watermark`).
+    """
 
-    def can_enroll_in_course(self, course, bypass_enrollment_time=False):
-        """Determine whether this user is allowed to enroll in the given course."""
+    template = "pg_current_xact_id()::text::bigint"
+    output_field = models.BigIntegerField()
+
+
+class SectionFullError(Exception):
+    """Raised when a seat cannot be claimed in a section that is already at capacity."""
+
+
+class EnrollmentEligibility:
+    """
+    Resolves whether a user may enroll in courses.
+
+    The user's whitelist and course associations are loaded once, up front,
+    so that any number of courses can be checked without further queries.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.whitelisted_course_ids = set(user.whitelist.values_list("pk", flat=True))
+        # courses in which the user is an active student or mentors a section
+        self.associated_course_ids = set(
+            user.student_set.filter(active=True)
+            .values_list("section__mentor__course", flat=True)
+            .union(
+                user.mentor_set.filter(section__isnull=False).values_list(
+                    "course", flat=True
+                )
+            )
+        )
+
+    def is_whitelisted_for(self, course):
+        """Determine whether the user is whitelisted for the given course."""
+        return not course.is_restricted or course.pk in self.whitelisted_course_ids
+
+    def enrollment_open(self, course):
+        """Determine whether enrollment is open; takes priority enrollment into account."""
+        priority_enrollment = self.user.priority_enrollment
+        if priority_enrollment and priority_enrollment < course.enrollment_start:
+            now = timezone.now().astimezone(timezone.get_default_timezone())
+            return priority_enrollment < now < course.enrollment_end
+        return course.is_open()
+
+    def can_enroll(self, course, bypass_enrollment_time=False):
+        """Determine whether the user is allowed to enroll in the given course."""
         # check restricted first
-        if course.is_restricted and not self.is_whitelisted_for(course):
+        if not self.is_whitelisted_for(course):
             return False
 
-        is_associated = (
-            self.student_set.filter(active=True, section__mentor__course=course).count()
-            or self.mentor_set.filter(section__mentor__course=course).count()
-        )
+        is_associated = course.pk in self.associated_course_ids
         if bypass_enrollment_time:
             return not is_associated
 
-        if self.priority_enrollment:
+        if self.user.priority_enrollment:
             now = timezone.now().astimezone(timezone.get_default_timezone())
             is_valid_enrollment_time = (
-                self.priority_enrollment < now < course.enrollment_end
+                self.user.priority_enrollment < now < course.enrollment_end
             )
         else:
             is_valid_enrollment_time = course.is_open()
         return is_valid_enrollment_time and not is_associated
 
+
+class User(AbstractUser):
+    priority_enrollment = models.DateTimeField(null=True, blank=True)
+
+    @cached_property
+    def enrollment_eligibility(self):
+        """
+        Enrollment eligibility of this user, loaded once per instance
+        (i.e. once per request for `request.user`).
+        """
+        return EnrollmentEligibility(self)
+
+    def can_enroll_in_course(self, course, bypass_enrollment_time=False):
+        """Determine whether this user is allowed to enroll in the given course."""
+        return EnrollmentEligibility(self).can_enroll(
+            course, bypass_enrollment_time=bypass_enrollment_time
+        )
+
     def is_whitelisted_for(self, course: "Course"):
         """Determine whether this user is whitelisted for the given course."""
         return not course.is_restricted or self.whitelist.filter(pk=course.pk).exists()
@@ -114,7 +182,15 @@ class OneToOneOrNoneField(models.OneToOneField):
     related_accessor_class = ReverseOneToOneOrNoneDescriptor
 
 
-class Attendance(ValidatingModel):
+class Attendance(ValidatingModel, PostgresPartitionedModel):
+    """
+    Attendance of a student at a section occurrence.
+
+    The table is range partitioned by date, in monthly partitions (see
+    `scheduler.partitioning`), so queries on recent dates only touch recent
+    partitions and past terms can be detached in one statement.
+    """
+
     class Presence(models.TextChoices):
         PRESENT = "PR", "Present"
         UNEXCUSED_ABSENCE = "UN", "Unexcused absence"
@@ -123,9 +199,19 @@ class Attendance(ValidatingModel):
     presence = models.CharField(max_length=2, choices=Presence.choices, blank=True)
     student = models.ForeignKey("Student", on_delete=models.CASCADE)
     sectionOccurrence = models.ForeignKey("SectionOccurrence", on_delete=models.CASCADE)
+    # denormalized from the section occurrence, so that date range scans don't need
+    # to join through it; set on save, kept in sync when the occurrence's date changes,
+    # and must be given explicitly for bulk inserts
+    date = models.DateField(
+        editable=False, help_text="Date of the section occurrence (denormalized)."
+    )
+
+    def save(self, *args, **kwargs):
+        self.date = self.sectionOccurrence.date
+        super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.sectionOccurrence.date} {self.presence} {self.student.name}"
+        return f"{self.date} {self.presence} {self.student.name}"
 
     @property
     def section(self):
@@ -135,12 +221,183 @@ class Attendance(ValidatingModel):
     @property
     def week_start(self):
         """Retrieve the date corresonding to the beginning of the week for this attendance."""
-        return week_bounds(self.sectionOccurrence.date)[0]
+        return week_bounds(self.date)[0]
+
+    @staticmethod
+    def mark_presences(section_occurrence_id, presences):
+        """
+        Set the presence of the attendances of the students at a section occurrence,
+        given a {student id: presence} dict, with a single UPDATE ... FROM (VALUES ...).
+
+        Returns the set of ids of the students whose attendances were updated;
+        students without an attendance for the section occurrence are skipped.
+        """
+        if not presences:
+            return set()
+        table = Attendance._meta.db_table
+        values = ", ".join(["(%s::integer, %s::varchar)"] * len(presences))
+        params = [param for item in presences.items() for param in item]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS attendance
+                SET presence = updated.presence
+                FROM (VALUES {values}) AS updated (student_id, presence)
+                WHERE attendance.student_id = updated.student_id
+                    AND attendance."sectionOccurrence_id" = %s
+                RETURNING attendance.student_id
+                """,
+                [*params, section_occurrence_id],
+            )
+            return {student_id for (student_id,) in cursor.fetchall()}
+
+    @staticmethod
+    def submit_word_of_the_day(user, section_id, attendance_id, word):
+        """
+        Mark the user's attendance as present for the section occurrence of the given
+        attendance, if the user is an active student of the section, the word matches
+        the occurrence's word of the day, attendance has not been taken yet and the
+        course's word of the day deadline has not passed.
+
+        Authorizes and updates with a single UPDATE ... FROM ... RETURNING; returns
+        whether the attendance was marked present. Nothing is changed otherwise,
+        and it is up to the caller to find out why.
+        """
+        today = timezone.now().astimezone(timezone.get_default_timezone()).date()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {Attendance._meta.db_table} AS attendance
+                SET presence = %(present)s
+                FROM {Attendance._meta.db_table} AS submitted
+                JOIN {SectionOccurrence._meta.db_table} AS occurrence
+                    ON occurrence.id = submitted."sectionOccurrence_id"
+                JOIN {Section._meta.db_table} AS section
+                    ON section.id = occurrence.section_id
+                JOIN {Mentor._meta.db_table} AS mentor ON mentor.id = section.mentor_id
+                JOIN {Course._meta.db_table} AS course ON course.id = mentor.course_id
+                JOIN {Student._meta.db_table} AS student
+                    ON student.section_id = occurrence.section_id
+                WHERE submitted.id = %(attendance)s
+                    AND occurrence.section_id = %(section)s
+                    AND lower(occurrence.word_of_the_day) = %(word)s
+                    AND (
+                        course.word_of_the_day_limit IS NULL
+                        OR %(today)s
+                            <= (occurrence.date + course.word_of_the_day_limit)::date
+                    )
+                    AND student.user_id = %(user)s AND student.active
+                    AND attendance.student_id = student.id
+                    AND attendance."sectionOccurrence_id" = occurrence.id
+                    AND attendance.date = occurrence.date
+                    AND attendance.presence = ''
+                RETURNING attendance.id
+                """,
+                {
+                    "present": Attendance.Presence.PRESENT,
+                    "attendance": attendance_id,
+                    "section": section_id,
+                    "word": word,
+                    "today": today,
+                    "user": user.pk,
+                },
+            )
+            return cursor.fetchone() is not None
+
+    class PartitioningMeta:
+        method = PostgresPartitioningMethod.RANGE
+        key = ["date"]
 
     class Meta:
-        unique_together = ("sectionOccurrence", "student")
-        ordering = ("sectionOccurrence",)
-        # indexes = (models.Index(fields=("date",)),)
+        # unique constraints on a partitioned table must include the partition key;
+        # the date is determined by the section occurrence, so this is equivalent
+        # to (sectionOccurrence, student)
+        unique_together = ("sectionOccurrence", "student", "date")
+        ordering = ("date", "sectionOccurrence_id")
+        indexes = (
+            models.Index(fields=("student", "date")),
+            models.Index(fields=("presence", "student")),
+        )
+
+
+class AttendanceSummary(ValidatingModel):
+    """
+    Attendance counts of a student for each presence, and the last date the student
+    was present; read instead of counting the student's attendances.
+
+    Summaries are maintained by statement-level triggers on the attendance table
+    (see migration 0040), in the same transaction as every insert, update or delete
+    of attendances, including bulk and raw SQL writes; a student without attendances
+    may not have a summary yet. Statements run directly on a partition (e.g. detaching
+    or archiving one) bypass the triggers; `rebuild` recomputes the summaries.
+    """
+
+    student = OneToOneOrNoneField(
+        "Student",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="attendance_summary",
+    )
+    present_count = models.PositiveIntegerField(default=0)
+    excused_count = models.PositiveIntegerField(default=0)
+    unexcused_count = models.PositiveIntegerField(default=0)
+    last_attended = models.DateField(null=True, blank=True)
+    # incremented by every write to the student's attendances, in the same transaction
+    version = models.PositiveBigIntegerField(default=0, db_default=0)
+
+    def __str__(self):
+        return f"Attendance summary for {self.student.name}"
+
+    @staticmethod
+    def rebuild(students):
+        """
+        Recompute the summaries of the students in the queryset from their attendances,
+        with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+
+        Writes to attendances are blocked until the surrounding transaction ends,
+        so that the triggers cannot race with the recomputation.
+        Returns the ids of the students whose summaries were missing or out of date.
+        """
+        table = AttendanceSummary._meta.db_table
+        attendance_table = Attendance._meta.db_table
+        students_sql, params = students.order_by().values("pk").query.sql_with_params()
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {attendance_table} IN SHARE MODE")
+            cursor.execute(
+                f"""
+                INSERT INTO {table} AS summary
+                    (student_id, present_count, excused_count, unexcused_count,
+                    last_attended)
+                SELECT
+                    student.id,
+                    COUNT(*) FILTER (WHERE attendance.presence = 'PR'),
+                    COUNT(*) FILTER (WHERE attendance.presence = 'EX'),
+                    COUNT(*) FILTER (WHERE attendance.presence = 'UN'),
+                    MAX(attendance.date) FILTER (WHERE attendance.presence = 'PR')
+                FROM {Student._meta.db_table} AS student
+                LEFT JOIN {attendance_table} AS attendance
+                    ON attendance.student_id = student.id
+                WHERE student.id IN ({students_sql})
+                GROUP BY student.id
+                ORDER BY student.id
+                ON CONFLICT (student_id) DO UPDATE SET
+                    present_count = EXCLUDED.present_count,
+                    excused_count = EXCLUDED.excused_count,
+                    unexcused_count = EXCLUDED.unexcused_count,
+                    last_attended = EXCLUDED.last_attended,
+                    version = summary.version + 1
+                WHERE (
+                    summary.present_count, summary.excused_count,
+                    summary.unexcused_count, summary.last_attended
+                ) IS DISTINCT FROM (
+                    EXCLUDED.present_count, EXCLUDED.excused_count,
+                    EXCLUDED.unexcused_count, EXCLUDED.last_attended
+                )
+                RETURNING student_id
+                """,
+                params,
+            )
+            return [student_id for (student_id,) in cursor.fetchall()]
 
 
 class SectionOccurrence(ValidatingModel):
@@ -162,6 +419,16 @@ class SectionOccurrence(ValidatingModel):
         ordering = ("date",)
 
 
+@receiver(models.signals.post_save, sender=SectionOccurrence)
+def sync_attendance_dates(instance, created, update_fields=None, **kwargs):
+    """Keeps the denormalized `Attendance.date` in sync with its section occurrence."""
+    if created or (update_fields is not None and "date" not in update_fields):
+        return
+    Attendance.objects.filter(sectionOccurrence=instance).exclude(
+        date=instance.date
+    ).update(date=instance.date)
+
+
 class Course(ValidatingModel):
     name = models.SlugField(max_length=16, unique_for_month="enrollment_start")
     title = models.CharField(max_length=100)
@@ -177,9 +444,64 @@ class Course(ValidatingModel):
     is_restricted = models.BooleanField(default=False)
     whitelist = models.ManyToManyField("User", blank=True, related_name="whitelist")
 
+    data_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=(
+            "Incremented whenever the course's sections change; used to key cached"
+            " section catalogs."
+        ),
+    )
+
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def bump_data_version(courses):
+        """
+        Increment the data version of the courses in the queryset,
+        once the current transaction (if any) has committed.
+
+        Bumping after the commit guarantees that a catalog cached under the new version
+        was built from data that includes the change.
+        """
+        transaction.on_commit(
+            lambda: courses.update(data_version=models.F("data_version") + 1)
+        )
+
+    @staticmethod
+    def by_id_or_name(values, date=None):
+        """
+        Retrieve the courses given by id or by name (e.g. on the command line); as names
+        are reused every term, a name only selects courses that have not ended by the
+        date (today by default).
+        """
+        if date is None:
+            date = timezone.now().astimezone(timezone.get_default_timezone()).date()
+        ids = [int(value) for value in values if value.isdigit()]
+        names = [value for value in values if not value.isdigit()]
+        return Course.objects.filter(
+            # pylint: disable-next=unsupported-binary-operation
+            models.Q(pk__in=ids)
+            | models.Q(name__in=names, valid_until__gte=date)
+        )
+
+    @staticmethod
+    def at_risk_students(courses, within=0):
+        """
+        Retrieve the active students of the courses in the queryset whose number of
+        unexcused absences exceeds their course's permitted absences, or is within
+        `within` absences of exceeding it, annotated with `num_unexcused`.
+
+        The counts are read from the attendance summaries, so this is a single query
+        across all of the courses, without grouping attendances.
+        """
+        return (
+            Student.objects.filter(active=True, course__in=courses)
+            .annotate(num_unexcused=Coalesce("attendance_summary__unexcused_count", 0))
+            .filter(num_unexcused__gt=models.F("course__permitted_absences") - within)
+        )
+
     def clean(self):
         super().clean()
         if (
@@ -204,6 +526,156 @@ class Course(ValidatingModel):
         now = timezone.now().astimezone(timezone.get_default_timezone())
         return self.enrollment_start < now < self.enrollment_end
 
+    @staticmethod
+    def materialize_occurrences(courses, sections=None):
+        """
+        Create the section occurrences of every section of the courses in the queryset,
+        on every date from the course's `section_start` to its `valid_until` that one of
+        the section's spacetimes falls on, except for the course's holidays. An override
+        of a spacetime moves the spacetime's occurrence in the override's week to the
+        override's date.
+
+        Upcoming occurrences that no longer match a spacetime (or fall on a holiday) are
+        deleted along with their attendances, unless attendance was already taken or the
+        word of the day set. Everything is done in a single statement, and calling it
+        again only creates or deletes what changed since.
+
+        If `sections` (a queryset) is given, only the occurrences of those sections
+        are materialized.
+
+        Returns the number of occurrences created and deleted.
+        """
+        now = timezone.now().astimezone(timezone.get_default_timezone())
+        try:
+            courses_sql, params = (
+                courses.order_by().values("pk").query.sql_with_params()
+            )
+            section_filter = ""
+            if sections is not None:
+                sections_sql, section_params = (
+                    sections.order_by().values("pk").query.sql_with_params()
+                )
+                section_filter = f"AND section.id IN ({sections_sql})"
+                params = (*params, *section_params)
+        except EmptyResultSet:
+            # e.g. filtered by an empty list of ids
+            return 0, 0
+        occurrence_table = SectionOccurrence._meta.db_table
+        attendance_table = Attendance._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH meetings AS (
+                    SELECT course.id AS course_id, spacetime.section_id, day::date AS date
+                    FROM {Course._meta.db_table} AS course
+                    JOIN {Mentor._meta.db_table} AS mentor ON mentor.course_id = course.id
+                    JOIN {Section._meta.db_table} AS section
+                        ON section.mentor_id = mentor.id
+                    JOIN {Spacetime._meta.db_table} AS spacetime
+                        ON spacetime.section_id = section.id
+                    CROSS JOIN LATERAL generate_series(
+                        -- first date on the spacetime's day of the week
+                        course.section_start::timestamp + make_interval(days => (
+                            array_position(
+                                enum_range(NULL::day_of_week), spacetime.day_of_week
+                            )
+                            - extract(isodow FROM course.section_start)::integer + 7
+                        ) %% 7),
+                        course.valid_until::timestamp,
+                        interval '7 days'
+                    ) AS day
+                    WHERE course.id IN ({courses_sql}) {section_filter}
+                        AND NOT EXISTS (
+                            SELECT 1 FROM {Override._meta.db_table} AS override
+                            WHERE override.overriden_spacetime_id = spacetime.id
+                                AND date_trunc('week', override.date::timestamp)
+                                    = date_trunc('week', day)
+                        )
+                    UNION
+                    SELECT course.id, spacetime.section_id, override.date
+                    FROM {Course._meta.db_table} AS course
+                    JOIN {Mentor._meta.db_table} AS mentor ON mentor.course_id = course.id
+                    JOIN {Section._meta.db_table} AS section
+                        ON section.mentor_id = mentor.id
+                    JOIN {Spacetime._meta.db_table} AS spacetime
+                        ON spacetime.section_id = section.id
+                    JOIN {Override._meta.db_table} AS override
+                        ON override.overriden_spacetime_id = spacetime.id
+                    WHERE course.id IN ({courses_sql}) {section_filter}
+                        AND override.date
+                            BETWEEN course.section_start AND course.valid_until
+                ),
+                expected AS (
+                    SELECT DISTINCT section_id, date FROM meetings
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {Holiday._meta.db_table} AS holiday
+                        WHERE holiday.course_id = meetings.course_id
+                            AND holiday.date = meetings.date
+                    )
+                ),
+                created AS (
+                    INSERT INTO {occurrence_table} (section_id, date, word_of_the_day)
+                    SELECT section_id, date, '' FROM expected
+                    ON CONFLICT (section_id, date) DO NOTHING
+                    RETURNING id
+                ),
+                stale AS (
+                    SELECT occurrence.id, occurrence.date
+                    FROM {occurrence_table} AS occurrence
+                    JOIN {Section._meta.db_table} AS section
+                        ON section.id = occurrence.section_id
+                    JOIN {Mentor._meta.db_table} AS mentor ON mentor.id = section.mentor_id
+                    WHERE mentor.course_id IN ({courses_sql}) {section_filter}
+                        AND occurrence.date >= %s
+                        AND occurrence.word_of_the_day = ''
+                        AND NOT EXISTS (
+                            SELECT 1 FROM expected
+                            WHERE expected.section_id = occurrence.section_id
+                                AND expected.date = occurrence.date
+                        )
+                        AND NOT EXISTS (
+                            SELECT 1 FROM {attendance_table} AS attendance
+                            WHERE attendance."sectionOccurrence_id" = occurrence.id
+                                AND attendance.date = occurrence.date
+                                AND attendance.presence <> ''
+                        )
+                ),
+                deleted_attendances AS (
+                    DELETE FROM {attendance_table} AS attendance USING stale
+                    WHERE attendance."sectionOccurrence_id" = stale.id
+                        AND attendance.date = stale.date
+                ),
+                deleted AS (
+                    DELETE FROM {occurrence_table}
+                    WHERE id IN (SELECT id FROM stale)
+                    RETURNING id
+                )
+                SELECT (SELECT COUNT(*) FROM created), (SELECT COUNT(*) FROM deleted)
+                """,
+                [*params, *params, *params, now.date()],
+            )
+            return cursor.fetchone()
+
+
+class Holiday(ValidatingModel):
+    """
+    A date on which none of the course's sections are held;
+    no section occurrences are materialized on holidays.
+    """
+
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="holidays"
+    )
+    date = models.DateField()
+    name = models.CharField(max_length=100, blank=True)
+
+    def __str__(self):
+        return f"{self.name or 'Holiday'} on {self.date} ({self.course.name})"
+
+    class Meta:
+        unique_together = ("course", "date")
+        ordering = ("date",)
+
 
 class Profile(ValidatingModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -243,54 +715,141 @@ class Student(Profile):
         ),
     )
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Create an attendance for this week for the student if their section
-        # hasn't already been held this week and no attendance for this week already exists.
+    def save(self, *args, enforce_capacity=False, **kwargs):
+        """
+        Save the student, keeping the seat counts of the affected sections up to date.
+
+        If the student joined a section (either newly enrolled or moved),
+        attendances are created for the sessions that have not been held yet this week.
+
+        If `enforce_capacity` is True and the student is joining a section,
+        the seat is claimed with a single conditional UPDATE on the section counter;
+        a `SectionFullError` is raised (and the save is rolled back) if the section is full.
+        The seat claim is the last statement issued, so the section row lock
+        is only held until the surrounding transaction commits.
+
+        The previous enrollment is read from the database with the student row locked,
+        rather than from the instance, so concurrent saves of the same student (e.g. two
+        drops) and instances that were not loaded from the database only change the seat
+        counts once.
+        """
+        with transaction.atomic():
+            old_section_id, old_active = None, False
+            if self.pk is not None:
+                stored = (
+                    Student.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("section_id", "active")
+                    .first()
+                )
+                if stored is not None:
+                    old_section_id, old_active = stored
+            super().save(*args, **kwargs)
+
+            was_enrolled = old_active and old_section_id is not None
+            is_enrolled = self.active and self.section_id is not None
+            moved = old_section_id != self.section_id
+            if is_enrolled and (not was_enrolled or moved):
+                # only (re)joining a section can require new attendances this week;
+                # drops, bans and other edits leave attendances untouched
+                Student.create_current_week_attendances([self])
+            seat_delta = 0
+            if was_enrolled and (not is_enrolled or moved):
+                Section.release_seat(old_section_id)
+                if not moved:
+                    seat_delta -= 1
+            if is_enrolled and (not was_enrolled or moved):
+                if enforce_capacity:
+                    if not Section.claim_seat(self.section_id):
+                        raise SectionFullError(
+                            "There is no space available in this section"
+                        )
+                else:
+                    Section.claim_seat(self.section_id, enforce_capacity=False)
+                seat_delta += 1
+        if seat_delta and Student.section.is_cached(self):
+            # keep the in-memory section consistent with the stored counter
+            self.section.enrolled_count += seat_delta
+
+    @staticmethod
+    def create_current_week_attendances(students):
+        """
+        Creates an attendance for every active student and every occurrence of their
+        section that has not been held yet this week, unless the student already has
+        an attendance on that date.
+
+        Occurrences are not created here; they are materialized ahead of time for the
+        whole term (see `Course.materialize_occurrences`), or weekly by the
+        `create_attendances` command. The attendances are inserted with a single
+        INSERT ... SELECT ... ON CONFLICT DO NOTHING, regardless of the number of
+        students and spacetimes, so this is safe to call repeatedly.
+
+        This is the only way attendances are created on enrollment, whether students
+        enroll themselves or are added by a coordinator; attendances of later weeks
+        are created by the weekly `create_attendances` command.
+
+        Returns the number of attendances created.
+        """
         now = timezone.now().astimezone(timezone.get_default_timezone())
-        week_start = week_bounds(now.date())[0]
-        for spacetime in self.section.spacetimes.all():
-            section_day_num = day_to_number(spacetime.day_of_week)
-            section_already_held = section_day_num < now.weekday() or (
-                section_day_num == now.weekday() and spacetime.start_time < now.time()
-            )
-            course = self.course
-            if (
-                self.active
-                and course.section_start <= now.date() < course.valid_until
-                and not section_already_held
-                and not self.attendance_set.filter(
-                    sectionOccurrence__date=week_start
-                    + datetime.timedelta(days=section_day_num)
-                ).exists()
-            ):
-                if settings.DJANGO_ENV != settings.DEVELOPMENT:
-                    logger.info(
-                        "<SectionOccurrence> SO automatically created for student"
-                        " %s in course %s for date %s",
-                        self.user.email,
-                        course.name,
-                        now.date(),
-                    )
-                    logger.info(
-                        "<Attendance> Attendance automatically created for student"
-                        " %s in course %s for date %s",
-                        self.user.email,
-                        course.name,
-                        now.date(),
+        week_end = week_bounds(now.date())[1]
+        student_ids = [student.pk for student in students if student.active]
+        if not student_ids:
+            return 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {Attendance._meta.db_table}
+                    (student_id, "sectionOccurrence_id", date, presence)
+                SELECT student.id, occurrence.id, occurrence.date, ''
+                FROM {Student._meta.db_table} AS student
+                JOIN {Section._meta.db_table} AS section
+                    ON section.id = student.section_id
+                JOIN {Mentor._meta.db_table} AS mentor ON mentor.id = section.mentor_id
+                JOIN {Course._meta.db_table} AS course ON course.id = mentor.course_id
+                JOIN {SectionOccurrence._meta.db_table} AS occurrence
+                    ON occurrence.section_id = student.section_id
+                WHERE student.id = ANY(%(students)s) AND student.active
+                    -- the course is currently in session
+                    AND course.section_start <= %(today)s
+                    AND course.valid_until > %(today)s
+                    AND occurrence.date >= %(today)s AND occurrence.date < %(week_end)s
+                    -- occurrences today count if one of their spacetimes is still ahead
+                    AND (
+                        occurrence.date > %(today)s
+                        OR EXISTS (
+                            SELECT 1 FROM {Spacetime._meta.db_table} AS spacetime
+                            WHERE spacetime.section_id = occurrence.section_id
+                                AND spacetime.day_of_week = %(day_of_week)s
+                                AND spacetime.start_time >= %(time)s
+                        )
                     )
-                so_qs = SectionOccurrence.objects.filter(
-                    section=self.section,
-                    date=week_start + datetime.timedelta(days=section_day_num),
-                )
-                if not so_qs.exists():
-                    so = SectionOccurrence.objects.create(
-                        section=self.section,
-                        date=week_start + datetime.timedelta(days=section_day_num),
+                    AND NOT EXISTS (
+                        SELECT 1 FROM {Attendance._meta.db_table} AS existing
+                        WHERE existing.student_id = student.id
+                            AND existing.date = occurrence.date
                     )
-                else:
-                    so = so_qs.get()
-                Attendance.objects.create(student=self, sectionOccurrence=so)
+                ON CONFLICT ("sectionOccurrence_id", student_id, date) DO NOTHING
+                RETURNING student_id
+                """,
+                {
+                    "students": student_ids,
+                    "today": now.date(),
+                    "week_end": week_end,
+                    "day_of_week": DayOfWeekField.DAYS[now.weekday()],
+                    "time": now.time(),
+                },
+            )
+            created = cursor.fetchall()
+        num_students = len({student_id for (student_id,) in created})
+        if num_students and settings.DJANGO_ENV != settings.DEVELOPMENT:
+            logger.info(
+                "<Attendance> Attendances automatically created for %s students for"
+                " the week of %s",
+                num_students,
+                week_bounds(now.date())[0],
+            )
+        return len(created)
 
     def clean(self):
         super().clean()
@@ -304,6 +863,14 @@ class Student(Profile):
 
     class Meta:
         unique_together = ("user", "section")
+        constraints = [
+            # a user can only be enrolled in one section of a course at a time
+            models.UniqueConstraint(
+                fields=["user", "course"],
+                condition=models.Q(active=True),
+                name="unique_active_student_per_course",
+            )
+        ]
 
 
 class Mentor(Profile):
@@ -346,6 +913,21 @@ class Section(ValidatingModel):
             ' or "early start".'
         ),
     )
+    enrolled_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text=(
+            "Number of active students in the section; only ever modified through"
+            " atomic updates."
+        ),
+    )
+    seats_txid = models.BigIntegerField(
+        db_default=CurrentTransactionId(),
+        editable=False,
+        help_text=(
+            "Id of the transaction that last changed the seat counter of the section."
+        ),
+    )
 
     @property
     def day_time(self):
@@ -361,10 +943,134 @@ class Section(ValidatingModel):
     # def course(self):
     #     return self.mentor.course
 
-    @functional.cached_property
+    @staticmethod
+    def claim_seat(section_id, enforce_capacity=True):
+        """
+        Atomically increment the seat counter for the section.
+
+        If `enforce_capacity` is True, the counter is only incremented
+        if the section still has space; returns whether a seat was claimed.
+        """
+        sections = Section.objects.filter(pk=section_id)
+        if enforce_capacity:
+            sections = sections.filter(enrolled_count__lt=models.F("capacity"))
+        claimed = bool(
+            sections.update(
+                enrolled_count=models.F("enrolled_count") + 1,
+                seats_txid=CurrentTransactionId(),
+            )
+        )
+        if claimed:
+            Course.bump_data_version(Course.objects.filter(mentor__section=section_id))
+        return claimed
+
+    @staticmethod
+    def release_seat(section_id):
+        """Atomically decrement the seat counter for the section."""
+        Section.objects.filter(pk=section_id).update(
+            enrolled_count=models.F("enrolled_count") - 1,
+            seats_txid=CurrentTransactionId(),
+        )
+        Course.bump_data_version(Course.objects.filter(mentor__section=section_id))
+
+    @staticmethod
+    def seat_feed_watermark():
+        """
+        Get the id of the oldest transaction still running. Every seat change with a
+        lower `seats_txid` has already committed (or rolled back), while changes with
+        a higher one may still be in progress, so they must be read again later.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint"
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def adjust_enrolled_counts(section_deltas):
+        """
+        Atomically apply a {section id: delta} mapping to the seat counters
+        in a single UPDATE.
+        """
+        section_deltas = {pk: delta for pk, delta in section_deltas.items() if delta}
+        if not section_deltas:
+            return
+        Section.objects.filter(pk__in=section_deltas).update(
+            enrolled_count=models.F("enrolled_count")
+            + models.Case(
+                *(
+                    models.When(pk=pk, then=models.Value(delta))
+                    for pk, delta in section_deltas.items()
+                ),
+                output_field=models.IntegerField(),
+            ),
+            seats_txid=CurrentTransactionId(),
+        )
+        Course.bump_data_version(
+            Course.objects.filter(mentor__section__in=list(section_deltas))
+        )
+
+    @staticmethod
+    def recompute_enrolled_counts(sections=None):
+        """
+        Recompute the seat counters from the active students in a single UPDATE.
+
+        Returns the number of sections updated.
+        """
+        if sections is None:
+            sections = Section.objects.all()
+        active_students = (
+            Student.objects.filter(section=models.OuterRef("pk"), active=True)
+            .order_by()
+            .values("section")
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        )
+        Course.bump_data_version(Course.objects.filter(mentor__section__in=sections))
+        return sections.update(
+            enrolled_count=Coalesce(models.Subquery(active_students), 0),
+            seats_txid=CurrentTransactionId(),
+        )
+
+    @staticmethod
+    def materialize_occurrences(sections):
+        """
+        Materialize the section occurrences of the sections in the queryset for the
+        whole term (see `Course.materialize_occurrences`), and create this week's
+        attendances of their students in any new occurrences. Called whenever
+        sections are created or their spacetimes or overrides change.
+
+        Returns the number of occurrences created and deleted.
+        """
+        created, deleted = Course.materialize_occurrences(
+            Course.objects.filter(mentor__section__in=sections), sections=sections
+        )
+        Student.create_current_week_attendances(
+            Student.objects.filter(section__in=sections, active=True)
+        )
+        return created, deleted
+
+    @property
     def current_student_count(self):
-        """Query the number of students currently enrolled in this section."""
-        return self.students.filter(active=True).count()
+        """The number of students currently enrolled in this section."""
+        return self.enrolled_count
+
+    def save(self, *args, **kwargs):
+        if (
+            self.pk is not None
+            and not self._state.adding
+            and kwargs.get("update_fields") is None
+        ):
+            # never overwrite the seat counter with a (possibly stale) in-memory value
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ("enrolled_count", "seats_txid")
+            ]
+        super().save(*args, **kwargs)
+        if self.mentor_id is not None:
+            Course.bump_data_version(Course.objects.filter(mentor=self.mentor_id))
 
     def delete(self, *args, **kwargs):
         if self.current_student_count and not kwargs.get("force"):
@@ -433,6 +1139,189 @@ class Worksheet(ValidatingModel):
     solution_file = models.FileField(blank=True, upload_to=worksheet_path)
 
 
+def export_path(instance, filename):
+    """Compute the path of an export job's CSV file."""
+    # exports contain student data, so their paths must not be guessable
+    # even if the storage bucket is public
+    return f"exports/{uuid.uuid4().hex}/{filename}"
+
+
+class ExportJob(ValidatingModel):
+    """
+    A CSV export (see `scheduler.views.export`) run in the background by the
+    `run_export_jobs` worker, which writes it to the default storage.
+
+    Jobs are keyed by their parameters, the data versions of their courses and the
+    versions of their students' attendance summaries, so that identical requests
+    reuse a recent export instead of recomputing it.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    key = models.CharField(max_length=64, db_index=True, editable=False)
+    export_type = models.CharField(max_length=32)
+    courses = ArrayField(models.IntegerField())
+    fields = ArrayField(models.CharField(max_length=64), blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    status = models.CharField(
+        max_length=7, choices=Status.choices, default=Status.PENDING
+    )
+    # progress, in rows of the CSV file (excluding the header)
+    rows_written = models.PositiveIntegerField(default=0)
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    file = models.FileField(blank=True, upload_to=export_path)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # refreshed as the job makes progress; running jobs that have not been updated
+    # within `EXPORT_JOB_TIMEOUT` are assumed to have been abandoned by their worker
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.export_type} export {self.pk} ({self.status})"
+
+    @staticmethod
+    def job_key(export_type, courses, fields):
+        """
+        Key of an export of the courses, which changes whenever one of the courses'
+        data versions does, or attendances of their students are written (which does
+        not bump the data versions).
+        """
+        versions = list(
+            Course.objects.filter(pk__in=courses)
+            .order_by("pk")
+            .values_list("pk", "data_version")
+        )
+        # every attendance write increments the version of at least one summary
+        attendance_versions = AttendanceSummary.objects.filter(
+            student__course__in=courses
+        ).aggregate(count=models.Count("pk"), version=models.Sum("version"))
+        payload = json.dumps(
+            [
+                export_type,
+                sorted(set(courses)),
+                sorted(set(fields)),
+                versions,
+                [attendance_versions["count"], attendance_versions["version"]],
+            ]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def find_or_create(user, export_type, courses, fields):
+        """
+        Retrieve the job for an identical export that is either in progress, or done
+        within the last `EXPORT_JOB_MAX_AGE`; otherwise create a pending job.
+
+        Returns the job and whether it was created.
+        """
+        courses = sorted(set(courses))
+        fields = sorted({field for field in fields if field})
+        key = ExportJob.job_key(export_type, courses, fields)
+        now = timezone.now()
+        with transaction.atomic(), connection.cursor() as cursor:
+            # serialize identical requests, so that only one of them creates a job
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [key])
+            job = (
+                ExportJob.objects.filter(key=key)
+                .filter(
+                    models.Q(status=ExportJob.Status.PENDING)
+                    | models.Q(
+                        status=ExportJob.Status.RUNNING,
+                        updated_at__gte=now - settings.EXPORT_JOB_TIMEOUT,
+                    )
+                    | models.Q(
+                        status=ExportJob.Status.DONE,
+                        finished_at__gte=now - settings.EXPORT_JOB_MAX_AGE,
+                    )
+                )
+                .order_by("-created_at")
+                .first()
+            )
+            if job is not None:
+                return job, False
+            job = ExportJob.objects.create(
+                key=key,
+                export_type=export_type,
+                courses=courses,
+                fields=fields,
+                created_by=user,
+            )
+            return job, True
+
+    @staticmethod
+    def claim():
+        """
+        Claim the oldest pending job (or running job abandoned by its worker) for the
+        current worker, marking it as running; returns None if there is none.
+
+        Concurrent workers skip the jobs claimed by each other.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                ExportJob.objects.select_for_update(skip_locked=True)
+                .filter(
+                    models.Q(status=ExportJob.Status.PENDING)
+                    | models.Q(
+                        status=ExportJob.Status.RUNNING,
+                        updated_at__lt=now - settings.EXPORT_JOB_TIMEOUT,
+                    )
+                )
+                .order_by("created_at")
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = ExportJob.Status.RUNNING
+            job.rows_written = 0
+            job.save()
+        return job
+
+    @property
+    def progress(self):
+        """Fraction of the rows written so far, or None if not known yet."""
+        if self.status == ExportJob.Status.DONE:
+            return 1.0
+        if not self.total_rows:
+            return None
+        return min(self.rows_written / self.total_rows, 1.0)
+
+
+@receiver(models.signals.post_delete, sender=Student)
+def release_seat_on_delete(instance, **kwargs):
+    """
+    Releases the seat held by an active `Student` when it is deleted,
+    including deletions cascaded from other objects.
+    """
+    if instance.active:
+        Section.release_seat(instance.section_id)
+
+
+@receiver(models.signals.pre_delete, sender=Section)
+def bump_course_version_on_section_delete(instance, **kwargs):
+    """
+    Invalidates the section catalog of the course of a deleted `Section`.
+    The course is resolved before the deletion, as the mentor may be deleted with it.
+    """
+    if instance.mentor_id is not None:
+        Course.bump_data_version(
+            Course.objects.filter(
+                pk__in=list(
+                    Mentor.objects.filter(pk=instance.mentor_id).values_list(
+                        "course", flat=True
+                    )
+                )
+            )
+        )
+
+
 @receiver(models.signals.post_delete, sender=Worksheet)
 def auto_delete_file_on_delete(instance, **kwargs):
     """
@@ -571,6 +1460,27 @@ class Override(ValidatingModel):
         return f"Override for {self.overriden_spacetime.section} : {self.spacetime}"
 
 
+@receiver(models.signals.post_save, sender=Spacetime)
+@receiver(models.signals.post_delete, sender=Spacetime)
+def bump_course_version_on_spacetime_change(instance, **kwargs):
+    """Invalidates the section catalog of the course of a changed `Spacetime`."""
+    if instance.section_id is not None:
+        Course.bump_data_version(
+            Course.objects.filter(mentor__section=instance.section_id)
+        )
+
+
+@receiver(models.signals.post_save, sender=Override)
+@receiver(models.signals.post_delete, sender=Override)
+def bump_course_version_on_override_change(instance, **kwargs):
+    """Invalidates the section catalog of the course of a changed `Override`."""
+    Course.bump_data_version(
+        Course.objects.filter(
+            mentor__section__spacetimes=instance.overriden_spacetime_id
+        )
+    )
+
+
 class Matcher(ValidatingModel):
     course = OneToOneOrNoneField(
         Course, on_delete=models.CASCADE, blank=True, null=True
@@ -0,0 +1,148 @@
+"""
+Partitioning of the range partitioned tables (currently only `Attendance`).
+
+Partitions are monthly, named `<table>_<year>_<month>` (e.g. `scheduler_attendance_2024_jan`).
+Upcoming partitions are created with `manage.py manage_partitions` (or psqlextra's
+`pgpartition`, which uses the `manager` below), which should be run regularly;
+rows outside of every partition go to the `<table>_default` partition.
+"""
+
+import datetime
+import re
+
+from django.db import connection, transaction
+from psqlextra.partitioning import (
+    PostgresPartitioningManager,
+    PostgresTimePartition,
+    PostgresTimePartitionSize,
+    partition_by_current_time,
+)
+from psqlextra.partitioning.constants import AUTO_PARTITIONED_COMMENT
+
+from .models import Attendance
+
+# number of monthly partitions to keep ahead of the current month (including it),
+# enough to cover the rest of a term and all of the next one
+PARTITIONS_AHEAD = 8
+
+DEFAULT_PARTITION = "default"
+
+manager = PostgresPartitioningManager(
+    [partition_by_current_time(Attendance, count=PARTITIONS_AHEAD, months=1)]
+)
+
+PARTITION_BOUND_RE = re.compile(
+    r"FOR VALUES FROM \('(?P<start>[\d-]+)'\) TO \('(?P<end>[\d-]+)'\)"
+)
+
+
+def add_months(date: datetime.date, months: int) -> datetime.date:
+    """First day of the month `months` months after that of the date."""
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def monthly_partition(month: datetime.date) -> PostgresTimePartition:
+    """The monthly partition containing the date."""
+    return PostgresTimePartition(
+        size=PostgresTimePartitionSize(months=1),
+        start_datetime=datetime.datetime(month.year, month.month, 1),
+    )
+
+
+def range_partitions(model):
+    """
+    Retrieve the range partitions of the model's table, as a list of
+    (table name, first date, end date (exclusive)), ordered by date.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [model._meta.db_table],
+        )
+        partitions = []
+        for name, bound in cursor.fetchall():
+            match = PARTITION_BOUND_RE.fullmatch(bound)
+            if match is None:
+                # the default partition
+                continue
+            partitions.append(
+                (
+                    name,
+                    datetime.date.fromisoformat(match["start"]),
+                    datetime.date.fromisoformat(match["end"]),
+                )
+            )
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(model, partition: PostgresTimePartition):
+    """
+    Create the partition of the model's table.
+
+    Rows that were put in the default partition because the partition did not exist
+    yet are moved into it; the default partition is detached while doing so, since
+    Postgres refuses to create a partition for rows that are in the default partition.
+    The rows are moved between the partitions directly, so the statement-level
+    triggers of the table (e.g. the attendance summaries) do not see the move.
+    """
+    table = model._meta.db_table
+    default_table = f"{table}_{DEFAULT_PARTITION}"
+    with transaction.atomic(), connection.schema_editor() as schema_editor:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT EXISTS (
+                    SELECT 1 FROM {schema_editor.quote_name(default_table)}
+                    WHERE date >= %s AND date < %s
+                )
+                """,
+                [partition.from_values, partition.to_values],
+            )
+            (has_default_rows,) = cursor.fetchone()
+            if not has_default_rows:
+                partition.create(model, schema_editor, comment=AUTO_PARTITIONED_COMMENT)
+                return
+
+            quoted_table = schema_editor.quote_name(table)
+            quoted_default = schema_editor.quote_name(default_table)
+            quoted_partition = schema_editor.quote_name(f"{table}_{partition.name()}")
+            cursor.execute(
+                f"ALTER TABLE {quoted_table} DETACH PARTITION {quoted_default}"
+            )
+            partition.create(model, schema_editor, comment=AUTO_PARTITIONED_COMMENT)
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {quoted_default}
+                    WHERE date >= %s AND date < %s
+                    RETURNING *
+                )
+                INSERT INTO {quoted_partition} SELECT * FROM moved
+                """,
+                [partition.from_values, partition.to_values],
+            )
+            cursor.execute(
+                f"ALTER TABLE {quoted_table} ATTACH PARTITION {quoted_default} DEFAULT"
+            )
+
+
+def detach_partition(model, name: str, drop: bool = False):
+    """
+    Detach the partition from the model's table, leaving it as a standalone table
+    (which can then be archived), or drop it altogether.
+    """
+    with connection.cursor() as cursor:
+        quote_name = connection.ops.quote_name
+        cursor.execute(
+            f"ALTER TABLE {quote_name(model._meta.db_table)}"
+            f" DETACH PARTITION {quote_name(name)}"
+        )
+        if drop:
+            cursor.execute(f"DROP TABLE {quote_name(name)}")
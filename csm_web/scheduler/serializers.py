@@ -1,6 +1,5 @@
 from enum import Enum
 
-from django.utils import timezone
 from rest_framework import serializers
 
 from .models import (
@@ -148,20 +147,14 @@ class CourseSerializer(serializers.ModelSerializer):
     def get_enrollment_open(self, obj):
         """Compute enrollment open time; takes priority enrollment into account"""
         user = self.context.get("request") and self.context.get("request").user
-        if (
-            user
-            and user.priority_enrollment
-            and user.priority_enrollment < obj.enrollment_start
-        ):
-            now = timezone.now().astimezone(timezone.get_default_timezone())
-            return user.priority_enrollment < now < obj.enrollment_end
-
+        if user:
+            return user.enrollment_eligibility.enrollment_open(obj)
         return obj.is_open()
 
     def get_user_can_enroll(self, obj):
         """Determine whether the user can currently enroll in the course"""
         user = self.context.get("request") and self.context.get("request").user
-        return user and user.can_enroll_in_course(obj)
+        return user and user.enrollment_eligibility.can_enroll(obj)
 
     class Meta:
         model = Course
@@ -223,18 +216,27 @@ class MentorSerializer(serializers.ModelSerializer):
 
 
 class AttendanceSerializer(serializers.ModelSerializer):
-    date = serializers.DateField(source="sectionOccurrence.date", read_only=True)
+    date = serializers.DateField(read_only=True)
     student_name = serializers.CharField(source="student.name")
     student_id = serializers.IntegerField(source="student.id")
     student_email = serializers.CharField(source="student.user.email")
     word_of_the_day_deadline = serializers.SerializerMethodField()
 
     def get_word_of_the_day_deadline(self, obj):
-        """Compute deadline for the word of the day."""
-        limit = obj.sectionOccurrence.section.mentor.course.word_of_the_day_limit
+        """
+        Compute deadline for the word of the day.
+
+        If all of the attendances are in the same course, views should pass the
+        course's `word_of_the_day_limit` in the context, so that it isn't looked up
+        through the section occurrence, section and mentor of every attendance.
+        """
+        if "word_of_the_day_limit" in self.context:
+            limit = self.context["word_of_the_day_limit"]
+        else:
+            limit = obj.sectionOccurrence.section.mentor.course.word_of_the_day_limit
         if limit is None:
             return None
-        return obj.sectionOccurrence.date + limit
+        return obj.date + limit
 
     class Meta:
         model = Attendance
@@ -281,9 +283,10 @@ class CoordStudentSerializer(serializers.ModelSerializer):
 
     def get_num_unexcused(self, obj):
         """
-        Count the number of unexcused absences for the student
+        Retrieve the number of unexcused absences for the student
         """
-        return obj.attendance_set.filter(presence="UN").count()
+        summary = obj.attendance_summary
+        return summary.unexcused_count if summary is not None else 0
 
     class Meta:
         model = Student
@@ -343,38 +346,65 @@ class SectionSerializer(serializers.ModelSerializer):
 
     def get_num_students_enrolled(self, obj):
         """Retrieve the number of students enrolled in the section"""
-        return (
-            obj.num_students_annotation
-            if hasattr(obj, "num_students_annotation")
-            else obj.current_student_count
-        )
+        return obj.enrolled_count
 
-    def user_associated_profile(self, obj):
-        """Retrieve the user profile associated with the section"""
-        user = self.context.get("request") and self.context.get("request").user
-        if not user:
+    def user_profiles(self):
+        """
+        Retrieve the profiles of the requesting user that can be associated with sections:
+        {"students": {section id: student id}, "coordinators": {course id: coordinator id}}
+
+        Computed once per serializer invocation (shared by every section of a list),
+        so that resolving roles takes a constant number of queries.
+        """
+        # pylint: disable=protected-access
+        root = self.root
+        if not hasattr(root, "_user_profiles"):
+            user = self.context.get("request") and self.context.get("request").user
+            if not user:
+                root._user_profiles = None
+            else:
+                root._user_profiles = {
+                    "students": dict(
+                        Student.objects.filter(user=user).values_list("section", "pk")
+                    ),
+                    "coordinators": dict(
+                        Coordinator.objects.filter(user=user).values_list(
+                            "course", "pk"
+                        )
+                    ),
+                }
+        return root._user_profiles
+
+    def user_associated_role(self, obj):
+        """
+        Retrieve the (role, profile id) of the user profile associated with the section,
+        or None if there is no associated profile
+        """
+        profiles = self.user_profiles()
+        if profiles is None:
+            return None
+        if obj.pk in profiles["students"]:
+            return Role.STUDENT.value, profiles["students"][obj.pk]
+        if obj.mentor is None:
             return None
-        try:
-            return obj.students.get(user=user)
-        except Student.DoesNotExist:
-            coordinator = obj.mentor.course.coordinator_set.filter(user=user).first()
-            if coordinator:
-                return coordinator
-            if obj.mentor and obj.mentor.user == user:
-                return obj.mentor
+        if obj.mentor.course_id in profiles["coordinators"]:
+            return (
+                Role.COORDINATOR.value,
+                profiles["coordinators"][obj.mentor.course_id],
+            )
+        if obj.mentor.user_id == self.context["request"].user.pk:
+            return Role.MENTOR.value, obj.mentor.pk
         return None  # no profile
 
     def get_user_role(self, obj):
         """Retrieve the role of the associated user profile"""
-        profile = self.user_associated_profile(obj)
-        if not profile:
-            return None
-        return get_profile_role(profile)
+        role = self.user_associated_role(obj)
+        return role and role[0]
 
     def get_associated_profile_id(self, obj):
         """Retrieve the id of the associated user profile"""
-        profile = self.user_associated_profile(obj)
-        return profile and profile.pk
+        role = self.user_associated_role(obj)
+        return role and role[1]
 
     class Meta:
         model = Section
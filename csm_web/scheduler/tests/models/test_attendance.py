@@ -1,17 +1,39 @@
+import csv
 import datetime
+import io
+import json
 
 import pytest
+from django.core import management
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from freezegun import freeze_time
 from scheduler.factories import (
+    AttendanceFactory,
+    CoordinatorFactory,
     CourseFactory,
     MentorFactory,
     SectionFactory,
+    SectionOccurrenceFactory,
     SpacetimeFactory,
+    StudentFactory,
     UserFactory,
 )
-from scheduler.models import Attendance, SectionOccurrence, Student
+from scheduler.fast_serializers import annotate_coord_students
+from scheduler.models import (
+    Attendance,
+    AttendanceSummary,
+    Course,
+    Holiday,
+    Override,
+    Section,
+    SectionOccurrence,
+    Student,
+)
+from scheduler.partitioning import create_partition, monthly_partition, range_partitions
+from scheduler.serializers import CoordStudentSerializer
 
 DEFAULT_TZ = timezone.get_default_timezone()
 
@@ -105,10 +127,11 @@ def test_attendance_add_student_on_day(
     client, setup_section, day, num_attendances_added
 ):
     """
-    Check various section occurrence and attendance objects are created
+    Check that attendances are created for the materialized section occurrences
     when a student is added on a given day.
     """
-    _, student_user, _, section = setup_section
+    _, student_user, course, section = setup_section
+    Course.materialize_occurrences(Course.objects.filter(pk=course.pk))
     with freeze_time(day):
         client.force_login(student_user)
         enroll_url = reverse("section-students", kwargs={"pk": section.pk})
@@ -120,12 +143,8 @@ def test_attendance_add_student_on_day(
         assert student.section == section
         assert section.students.count() == 1
 
-        # make sure section occurrence objects have been created
-        assert (
-            SectionOccurrence.objects.filter(section=section).count()
-            == num_attendances_added
-        )
-        assert section.sectionoccurrence_set.count() == num_attendances_added
+        # enrollment does not create section occurrences
+        assert SectionOccurrence.objects.filter(section=section).count() == 11
 
         # make sure student attendances have been created as well
         assert (
@@ -178,7 +197,8 @@ def test_attendance_drop_student_on_day(
     Check that future attendances are deleted when a student is dropped,
     and verify that past section occurrences and attendances are unchanged.
     """
-    _, student_user, _, section = setup_section
+    _, student_user, course, section = setup_section
+    Course.materialize_occurrences(Course.objects.filter(pk=course.pk))
 
     # enroll student first
     with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
@@ -203,7 +223,732 @@ def test_attendance_drop_student_on_day(
         assert section.students.count() == 1
 
         # make sure section occurrence objects are still there
-        assert SectionOccurrence.objects.filter(section=section).count() == 2
+        assert SectionOccurrence.objects.filter(section=section).count() == 11
 
         # make sure attendance objects have been deleted
         assert student.attendance_set.count() == num_attendances_left
+
+
+@pytest.mark.django_db
+def test_create_attendances_command(setup_section):
+    """
+    Check that the create_attendances command materializes the section occurrences
+    of the term, and creates each attendance in the requested dates exactly once,
+    in the occurrences moved by overrides rather than on the spacetimes' days.
+    """
+    _, student_user, course, section = setup_section
+    student = StudentFactory.create(user=student_user, course=course, section=section)
+    StudentFactory.create(course=course, section=section, active=False)
+
+    def attendance_dates():
+        return set(student.attendance_set.values_list("date", flat=True))
+
+    # dry runs and other courses do not create anything
+    management.call_command("create_attendances", "--week", "2020-06-03", "--dry-run")
+    management.call_command(
+        "create_attendances", "--week", "2020-06-03", "--course", "other"
+    )
+    assert not SectionOccurrence.objects.filter(section=section).exists()
+
+    tuesdays = {
+        datetime.date(2020, 5, 26) + datetime.timedelta(weeks=i) for i in range(6)
+    }
+    thursdays = {
+        datetime.date(2020, 5, 28) + datetime.timedelta(weeks=i) for i in range(5)
+    }
+    for _ in range(2):
+        management.call_command("create_attendances", "--week", "2020-06-03")
+        assert (
+            set(section.sectionoccurrence_set.values_list("date", flat=True))
+            == tuesdays | thursdays
+        )
+        assert (
+            Attendance.objects.filter(sectionOccurrence__section=section).count() == 2
+        )
+        assert attendance_dates() == {
+            datetime.date(2020, 6, 2),
+            datetime.date(2020, 6, 4),
+        }
+
+    # backfill a range, skipping dates before the course's sections start
+    management.call_command(
+        "create_attendances", "--start", "2020-05-18", "--end", "2020-05-27"
+    )
+    assert attendance_dates() == {
+        datetime.date(2020, 5, 26),
+        datetime.date(2020, 6, 2),
+        datetime.date(2020, 6, 4),
+    }
+
+    # an override moves the tuesday meeting of the week of 6/15 to wednesday
+    with freeze_time(timezone.datetime(2020, 6, 15, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        Override.objects.create(
+            overriden_spacetime=section.spacetimes.get(day_of_week="Tuesday"),
+            spacetime=SpacetimeFactory.create(day_of_week="Wednesday"),
+            date=datetime.date(2020, 6, 17),
+        )
+        management.call_command("create_attendances")
+        week = {
+            date
+            for date in attendance_dates()
+            if datetime.date(2020, 6, 15) <= date < datetime.date(2020, 6, 22)
+        }
+        assert week == {datetime.date(2020, 6, 17), datetime.date(2020, 6, 18)}
+        assert not section.sectionoccurrence_set.filter(
+            date=datetime.date(2020, 6, 16)
+        ).exists()
+
+        # materializing again agrees with the command, keeping the attendances
+        courses = Course.objects.filter(pk=course.pk)
+        assert Course.materialize_occurrences(courses) == (0, 0)
+        assert week <= attendance_dates()
+
+
+@pytest.mark.django_db
+def test_attendance_endpoints_constant_queries(client, setup_section):
+    """
+    Check that the attendance endpoints take a constant number of queries,
+    regardless of the number of students and attendances.
+    """
+    mentor, _, course, section = setup_section
+    course.word_of_the_day_limit = datetime.timedelta(days=1)
+    course.save()
+    client.force_login(mentor.user)
+
+    def add_week(week, students):
+        """Add a section occurrence with attendances for the students."""
+        occurrence = SectionOccurrenceFactory.create(
+            section=section,
+            date=datetime.date(2020, 5, 26) + datetime.timedelta(weeks=week),
+        )
+        for student in students:
+            AttendanceFactory.create(
+                student=student, sectionOccurrence=occurrence, presence="PR"
+            )
+
+    def num_queries(url):
+        """The number of queries taken by a GET request to the url."""
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(queries), response.data
+
+    students = StudentFactory.create_batch(2, course=course, section=section)
+    add_week(0, students)
+    urls = [
+        reverse("section-attendance", kwargs={"pk": section.pk}) + "?all=true",
+        reverse("section-students", kwargs={"pk": section.pk}),
+        reverse("student-attendances", kwargs={"pk": students[0].pk}),
+    ]
+    counts = [num_queries(url)[0] for url in urls]
+
+    students += StudentFactory.create_batch(3, course=course, section=section)
+    for week in range(1, 4):
+        add_week(week, students)
+    assert [num_queries(url)[0] for url in urls] == counts
+
+    _, occurrences = num_queries(urls[0])
+    attendance = occurrences[-1]["attendances"][0]
+    assert attendance["word_of_the_day_deadline"] == datetime.date(2020, 6, 17)
+    assert attendance["student_email"] in {student.user.email for student in students}
+
+
+@pytest.mark.django_db
+def test_section_attendance_window(client, setup_section):
+    """
+    Check that section attendance is windowed to the current week by default,
+    and that the grid format lays out presence codes by student and date.
+    """
+    mentor, _, _, section = setup_section
+    client.force_login(mentor.user)
+    url = reverse("section-attendance", kwargs={"pk": section.pk})
+    students = StudentFactory.create_batch(
+        2, course=section.mentor.course, section=section
+    )
+    occurrences = [
+        SectionOccurrenceFactory.create(section=section, date=date)
+        for date in (
+            datetime.date(2020, 6, 2),
+            datetime.date(2020, 6, 4),
+            datetime.date(2020, 6, 9),
+        )
+    ]
+    AttendanceFactory.create(
+        student=students[0], sectionOccurrence=occurrences[0], presence="PR"
+    )
+    AttendanceFactory.create(
+        student=students[0], sectionOccurrence=occurrences[1], presence="UN"
+    )
+    AttendanceFactory.create(
+        student=students[1], sectionOccurrence=occurrences[1], presence=""
+    )
+
+    with freeze_time(timezone.datetime(2020, 6, 3, 12, 0, 0, tzinfo=DEFAULT_TZ)):
+        response = client.get(url)
+        assert [occurrence["date"] for occurrence in response.data] == [
+            "2020-06-02",
+            "2020-06-04",
+        ]
+        response = client.get(url, {"layout": "grid"})
+
+    assert response.data["from"] == datetime.date(2020, 6, 1)
+    assert response.data["to"] == datetime.date(2020, 6, 7)
+    assert [occurrence["id"] for occurrence in response.data["occurrences"]] == [
+        occurrences[0].pk,
+        occurrences[1].pk,
+    ]
+    presence = {
+        student["id"]: student["presence"] for student in response.data["students"]
+    }
+    assert presence == {students[0].pk: ["PR", "UN"], students[1].pk: [None, ""]}
+
+    response = client.get(url, {"from": "2020-06-08", "to": "2020-06-30"})
+    assert [occurrence["id"] for occurrence in response.data] == [occurrences[2].pk]
+    response = client.get(url, {"all": "true"})
+    assert len(response.data) == 3
+    response = client.get(url, {"from": "June"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_section_attendance_bulk_update(client, setup_section):
+    """
+    Check that a mentor can record the attendance of a whole section occurrence
+    in one request, and that invalid updates are rejected as a whole.
+    """
+    mentor, student_user, course, section = setup_section
+    url = reverse("section-attendance", kwargs={"pk": section.pk})
+    students = StudentFactory.create_batch(4, course=course, section=section)
+    occurrence = SectionOccurrenceFactory.create(
+        section=section, date=datetime.date(2020, 6, 2)
+    )
+    for student in students[:3]:
+        AttendanceFactory.create(
+            student=student, sectionOccurrence=occurrence, presence=""
+        )
+
+    def put(attendances):
+        """Record the attendances, returning the response and query count."""
+        with CaptureQueriesContext(connection) as queries:
+            response = client.put(
+                url,
+                {"sectionOccurrenceId": occurrence.pk, "attendances": attendances},
+                content_type="application/json",
+            )
+        return response, len(queries)
+
+    def presences():
+        """The presences of the students at the occurrence."""
+        return dict(
+            Attendance.objects.filter(sectionOccurrence=occurrence).values_list(
+                "student", "presence"
+            )
+        )
+
+    client.force_login(student_user)
+    StudentFactory.create(user=student_user, course=course, section=section)
+    response, _ = put([{"studentId": students[0].pk, "presence": "PR"}])
+    assert response.status_code == 403
+
+    client.force_login(mentor.user)
+    response, num_queries = put([{"studentId": students[0].pk, "presence": "PR"}])
+    assert response.status_code == 204
+    response, more_queries = put(
+        [
+            {"studentId": students[1].pk, "presence": "UN"},
+            {"studentId": students[2].pk, "presence": "EX"},
+        ]
+    )
+    assert response.status_code == 204
+    assert more_queries == num_queries
+    assert presences() == {
+        students[0].pk: "PR",
+        students[1].pk: "UN",
+        students[2].pk: "EX",
+    }
+
+    # students[3] has no attendance, so nothing is updated
+    response, _ = put(
+        [
+            {"studentId": students[0].pk, "presence": ""},
+            {"studentId": students[3].pk, "presence": "PR"},
+        ]
+    )
+    assert response.status_code == 400
+    assert response.data["student_ids"] == [students[3].pk]
+    assert presences()[students[0].pk] == "PR"
+
+    response, _ = put([{"studentId": students[0].pk, "presence": "XX"}])
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_attendance_date_denormalized(setup_section):
+    """
+    Check that attendance dates follow their section occurrences,
+    whichever way the attendances are created.
+    """
+    _, student_user, course, section = setup_section
+    student = StudentFactory.create(user=student_user, course=course, section=section)
+    occurrence = SectionOccurrenceFactory.create(
+        section=section, date=datetime.date(2020, 6, 2)
+    )
+    Attendance.objects.create(student=student, sectionOccurrence=occurrence)
+    management.call_command(
+        "create_attendances", "--start", "2020-06-01", "--end", "2020-06-07"
+    )
+    with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        other = StudentFactory.create(course=course, section=section)
+        Student.create_current_week_attendances([other])
+
+    def attendance_dates():
+        """Map of each attendance's date to its section occurrence's date."""
+        return {
+            (attendance.date, attendance.sectionOccurrence.date)
+            for attendance in Attendance.objects.select_related("sectionOccurrence")
+        }
+
+    assert Attendance.objects.count() == 4
+    assert all(date == expected for date, expected in attendance_dates())
+
+    occurrence.date = datetime.date(2020, 6, 10)
+    occurrence.save()
+    assert all(date == expected for date, expected in attendance_dates())
+    assert Attendance.objects.filter(date=datetime.date(2020, 6, 10)).count() == 2
+
+
+@pytest.mark.django_db
+def test_manage_partitions(setup_section):
+    """
+    Check that partitions are created ahead, that creating a partition moves its rows
+    out of the default partition, and that old partitions can be detached.
+    """
+    _, student_user, course, section = setup_section
+    student = StudentFactory.create(user=student_user, course=course, section=section)
+    occurrence = SectionOccurrenceFactory.create(
+        section=section, date=datetime.date(2020, 6, 2)
+    )
+    Attendance.objects.create(student=student, sectionOccurrence=occurrence)
+
+    # the migration creates partitions ahead; the command fills in any missing ones
+    management.call_command("manage_partitions")
+    current_month = monthly_partition(timezone.now().date())
+    assert current_month.from_values in {
+        start.isoformat() for _, start, _ in range_partitions(Attendance)
+    }
+
+    # attendances outside of any partition are in the default partition
+    create_partition(Attendance, monthly_partition(datetime.date(2020, 6, 1)))
+    assert ("scheduler_attendance_2020_jun", datetime.date(2020, 6, 1)) in {
+        (name, start) for name, start, _ in range_partitions(Attendance)
+    }
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM scheduler_attendance_2020_jun")
+        assert cursor.fetchone() == (1,)
+    assert Attendance.objects.filter(student=student).count() == 1
+
+    management.call_command("manage_partitions", "--detach-before", "2020-07-01")
+    assert "scheduler_attendance_2020_jun" not in {
+        name for name, _, _ in range_partitions(Attendance)
+    }
+    assert not Attendance.objects.filter(student=student).exists()
+
+
+@pytest.mark.django_db
+def test_attendance_summary(setup_section):
+    """
+    Check that attendance summaries follow every kind of write to attendances,
+    and that they can be rebuilt.
+    """
+    _, student_user, course, section = setup_section
+    student = StudentFactory.create(user=student_user, course=course, section=section)
+    other = StudentFactory.create(course=course, section=section)
+    first, second = (
+        SectionOccurrenceFactory.create(section=section, date=date)
+        for date in (datetime.date(2020, 6, 2), datetime.date(2020, 6, 4))
+    )
+
+    def summary(student):
+        """Counts and last attended date of the student's summary."""
+        row = AttendanceSummary.objects.get(student=student)
+        return (
+            row.present_count,
+            row.excused_count,
+            row.unexcused_count,
+            row.last_attended,
+        )
+
+    # single and bulk inserts, including raw SQL
+    attendance = Attendance.objects.create(
+        student=student, sectionOccurrence=first, presence="PR"
+    )
+    with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        Student.create_current_week_attendances([other])
+    management.call_command(
+        "create_attendances", "--start", "2020-06-01", "--end", "2020-06-07"
+    )
+    assert Attendance.objects.count() == 4
+    assert summary(student) == (1, 0, 0, datetime.date(2020, 6, 2))
+    assert summary(other) == (0, 0, 0, None)
+
+    # updates
+    Attendance.mark_presences(second.pk, {student.pk: "PR", other.pk: "UN"})
+    assert summary(student) == (2, 0, 0, datetime.date(2020, 6, 4))
+    assert summary(other) == (0, 0, 1, None)
+    Attendance.objects.filter(student=student, sectionOccurrence=second).update(
+        presence="EX"
+    )
+    assert summary(student) == (1, 1, 0, datetime.date(2020, 6, 2))
+
+    # moving attendances across partitions
+    create_partition(Attendance, monthly_partition(datetime.date(2020, 6, 1)))
+    assert summary(student) == (1, 1, 0, datetime.date(2020, 6, 2))
+    first.date = datetime.date(2020, 7, 7)
+    first.save()
+    assert summary(student) == (1, 1, 0, datetime.date(2020, 7, 7))
+
+    # deletes
+    attendance.delete()
+    assert summary(student) == (0, 1, 0, None)
+    other.delete()
+    assert not AttendanceSummary.objects.filter(student_id=other.pk).exists()
+
+    # consumers read the summaries
+    Attendance.mark_presences(second.pk, {student.pk: "UN"})
+    assert CoordStudentSerializer(student).data["num_unexcused"] == 1
+    assert annotate_coord_students(Student.objects.all()).get().num_unexcused == 1
+
+    # rebuilding only touches out of date summaries
+    AttendanceSummary.objects.filter(student=student).update(present_count=5)
+    assert AttendanceSummary.rebuild(Student.objects.all()) == [student.pk]
+    assert summary(student) == (0, 0, 1, None)
+    AttendanceSummary.objects.all().delete()
+    management.call_command("rebuild_attendance_summaries", "--dry-run")
+    assert not AttendanceSummary.objects.exists()
+    management.call_command("rebuild_attendance_summaries")
+    assert summary(student) == (0, 0, 1, None)
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_check_attendances_command(setup_section, tmp_path, workers):
+    """
+    Check that check_attendances reports missing, misplaced and dropped students'
+    attendances, in a single process or in workers, and repairs them; students are
+    only expected to attend from their first attendance in their section onwards.
+    """
+    _, student_user, course, section = setup_section
+    other_section = SectionFactory.create(mentor=MentorFactory.create(course=course))
+    missing = StudentFactory.create(user=student_user, course=course, section=section)
+    moved = StudentFactory.create(course=course, section=section)
+    dropped = StudentFactory.create(course=course, section=section, active=False)
+    # joined the section after the first occurrence in the checked dates
+    late = StudentFactory.create(course=course, section=section)
+    undated = StudentFactory.create(course=course, section=section)
+    date = datetime.date(2020, 6, 2)
+    occurrence = SectionOccurrenceFactory.create(section=section, date=date)
+    other_occurrence = SectionOccurrenceFactory.create(section=other_section, date=date)
+    Attendance.objects.create(
+        student=missing,
+        sectionOccurrence=SectionOccurrenceFactory.create(
+            section=section, date=datetime.date(2020, 5, 28)
+        ),
+    )
+    Attendance.objects.create(
+        student=late,
+        sectionOccurrence=SectionOccurrenceFactory.create(
+            section=section, date=datetime.date(2020, 6, 4)
+        ),
+    )
+    Attendance.objects.create(student=moved, sectionOccurrence=other_occurrence)
+    dropped_attendance = Attendance.objects.create(
+        student=dropped, sectionOccurrence=occurrence
+    )
+    other_course = CourseFactory.create()
+
+    def check(*args):
+        """Run the command, returning the anomalies as {(anomaly, student): repaired}."""
+        out = io.StringIO()
+        management.call_command(
+            "check_attendances",
+            "2020-06-01",
+            "2020-06-07",
+            "--workers",
+            workers,
+            *args,
+            stdout=out,
+            stderr=io.StringIO(),
+        )
+        return {
+            (anomaly["anomaly"], anomaly["student"]): anomaly["repaired"]
+            for anomaly in json.loads(out.getvalue())["anomalies"]
+        }
+
+    expected = {
+        ("missing", missing.pk): False,
+        ("missing", moved.pk): False,
+        ("wrong_section", moved.pk): False,
+        ("not_enrolled", dropped.pk): False,
+        ("missing", undated.pk): False,
+    }
+    assert check() == expected
+    assert check("--course", str(other_course.pk)) == {}
+    assert check("--course", section.mentor.course.name) == expected
+    assert check("--repair") == {**expected, **dict.fromkeys(list(expected)[:3], True)}
+    assert check() == {
+        ("not_enrolled", dropped.pk): False,
+        ("missing", undated.pk): False,
+    }
+    assert set(occurrence.attendance_set.values_list("student", flat=True)) == {
+        missing.pk,
+        moved.pk,
+        dropped.pk,
+    }
+    assert not other_occurrence.attendance_set.exists()
+    assert Attendance.objects.filter(pk=dropped_attendance.pk).exists()
+
+    report = tmp_path / "report.csv"
+    management.call_command(
+        "check_attendances",
+        "2020-06-01",
+        "2020-06-07",
+        "--format",
+        "csv",
+        "--output",
+        str(report),
+        stderr=io.StringIO(),
+    )
+    rows = list(csv.DictReader(report.open(encoding="utf-8")))
+    assert sorted((row["anomaly"], row["student"], row["date"]) for row in rows) == [
+        ("missing", str(undated.pk), "2020-06-02"),
+        ("missing", str(undated.pk), "2020-06-04"),
+        ("not_enrolled", str(dropped.pk), "2020-06-02"),
+    ]
+
+
+@pytest.mark.django_db
+def test_normalize_attendances_command(setup_section):
+    """
+    Check that attendances of a student who switched sections are moved to the
+    current section's occurrences in the same week, and that duplicates are deleted
+    unless they are unexcused absences.
+    """
+    _, student_user, course, old_section = setup_section
+    section = SectionFactory.create(mentor=MentorFactory.create(course=course))
+    student = StudentFactory.create(
+        user=student_user, course=course, section=old_section
+    )
+
+    def occurrence(section, day):
+        """Get or create the occurrence of the section on the day of June 2020."""
+        return SectionOccurrence.objects.get_or_create(
+            section=section, date=datetime.date(2020, 6, day)
+        )[0]
+
+    def attend(section, day, presence):
+        """Create an attendance of the student at the section on the day."""
+        return Attendance.objects.create(
+            student=student,
+            sectionOccurrence=occurrence(section, day),
+            presence=presence,
+        ).pk
+
+    # week of 06/01: both attendances move to the new section
+    moved = {attend(old_section, 2, "PR"): 1, attend(old_section, 4, "EX"): 3}
+    occurrence(section, 1)
+    occurrence(section, 3)
+    # week of 06/08: the new section's only occurrence is already attended
+    attend(section, 8, "PR")
+    deleted = attend(old_section, 9, "PR")
+    kept = attend(old_section, 11, "UN")
+    # week of 06/15: the new section does not meet
+    unmatched = attend(old_section, 16, "")
+    Student.objects.filter(pk=student.pk).update(section=section)
+
+    def attendances():
+        """The student's attendances, as {id: (section, day)}."""
+        return {
+            attendance.pk: (attendance.sectionOccurrence.section, attendance.date.day)
+            for attendance in Attendance.objects.filter(student=student)
+        }
+
+    before = attendances()
+    out = io.StringIO()
+    management.call_command("normalize_attendances", "--dry-run", stdout=out)
+    assert out.getvalue().count("~ attendance") == 2
+    assert out.getvalue().count("- attendance") == 1
+    management.call_command(
+        "normalize_attendances", "--course", "other", stdout=io.StringIO()
+    )
+    assert attendances() == before
+
+    management.call_command(
+        "normalize_attendances", "--course", str(course.pk), stdout=io.StringIO()
+    )
+    after = attendances()
+    assert {pk: after[pk] for pk in moved} == {
+        pk: (section, day) for pk, day in moved.items()
+    }
+    assert deleted not in after
+    assert after[kept] == (old_section, 11)
+    assert after[unmatched] == (old_section, 16)
+
+    out = io.StringIO()
+    management.call_command("normalize_attendances", stdout=out)
+    assert "Remapped 0, deleted 0" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_materialize_occurrences(client, setup_section):
+    """
+    Check that section occurrences are materialized for the whole term, skipping
+    holidays, and that rematerializing after spacetimes change only removes upcoming
+    occurrences that nobody took attendance for.
+    """
+    mentor, student_user, course, section = setup_section
+    courses = Course.objects.filter(pk=course.pk)
+    Holiday.objects.create(course=course, date=datetime.date(2020, 6, 4))
+
+    def dates():
+        return set(section.sectionoccurrence_set.values_list("date", flat=True))
+
+    tuesdays = {
+        datetime.date(2020, 5, 26) + datetime.timedelta(weeks=i) for i in range(6)
+    }
+    thursdays = {
+        datetime.date(2020, 5, 28) + datetime.timedelta(weeks=i) for i in range(5)
+    } - {datetime.date(2020, 6, 4)}
+
+    with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        assert Course.materialize_occurrences(courses) == (10, 0)
+        assert dates() == tuesdays | thursdays
+        # idempotent
+        assert Course.materialize_occurrences(courses) == (0, 0)
+
+        # enrolling only creates attendances for the materialized occurrences
+        client.force_login(student_user)
+        client.put(reverse("section-students", kwargs={"pk": section.pk}))
+        student = Student.objects.get(user=student_user)
+        assert set(student.attendance_set.values_list("date", flat=True)) == {
+            datetime.date(2020, 6, 2)
+        }
+
+    with freeze_time(timezone.datetime(2020, 6, 8, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        # mark an upcoming tuesday occurrence, then move the section to wednesdays
+        SectionOccurrence.objects.filter(
+            section=section, date=datetime.date(2020, 6, 16)
+        ).update(word_of_the_day="marked")
+        section.spacetimes.filter(day_of_week="Tuesday").update(day_of_week="Wednesday")
+
+        created, deleted = Course.materialize_occurrences(courses)
+        wednesdays = {
+            datetime.date(2020, 5, 27) + datetime.timedelta(weeks=i) for i in range(6)
+        }
+        # past and marked tuesdays are kept
+        kept = {date for date in tuesdays if date < datetime.date(2020, 6, 8)} | {
+            datetime.date(2020, 6, 16)
+        }
+        assert dates() == wednesdays | thursdays | kept
+        assert (created, deleted) == (6, 3)
+
+    # only coordinators may materialize occurrences through the API
+    url = reverse("course-occurrences", kwargs={"pk": course.pk})
+    coordinator_user = UserFactory.create()
+    course.coordinator_set.create(user=coordinator_user)
+    with freeze_time(timezone.datetime(2020, 6, 8, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        client.force_login(mentor.user)
+        assert client.post(url).status_code == 403
+
+        client.force_login(coordinator_user)
+        response = client.post(
+            url, {"holidays": ["not a date"]}, content_type="application/json"
+        )
+        assert response.status_code == 400
+        response = client.post(
+            url, {"holidays": ["2020-06-11"]}, content_type="application/json"
+        )
+        assert response.status_code == 200
+        assert response.json() == {"created": 0, "deleted": 1}
+        assert datetime.date(2020, 6, 11) not in dates()
+
+
+@pytest.mark.django_db
+def test_section_changes_materialize_occurrences(client, setup_section):
+    """
+    Check that creating a section, and changing its spacetimes or overrides,
+    materializes its occurrences and this week's attendances of its students.
+    """
+    _, student_user, course, _ = setup_section
+    coord_user = UserFactory.create()
+    CoordinatorFactory.create(user=coord_user, course=course)
+
+    def weekly(first, weeks=6):
+        return {first + datetime.timedelta(weeks=i) for i in range(weeks)}
+
+    with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        client.force_login(coord_user)
+        response = client.post(
+            reverse("section-list"),
+            {
+                "course_id": course.pk,
+                "mentor_email": "new_mentor@berkeley.edu",
+                "capacity": 5,
+                "spacetimes": [
+                    {
+                        "day_of_week": 2,
+                        "start_time": "10:00",
+                        "duration": 60,
+                        "location": "Cory 400",
+                    }
+                ],
+            },
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        section = Section.objects.get(pk=response.json()["id"])
+        spacetime = section.spacetimes.get()
+
+        def dates():
+            return set(section.sectionoccurrence_set.values_list("date", flat=True))
+
+        def attendance_dates():
+            return set(
+                Attendance.objects.filter(student__user=student_user).values_list(
+                    "date", flat=True
+                )
+            )
+
+        tuesdays = weekly(datetime.date(2020, 5, 26))
+        assert dates() == tuesdays
+
+        client.force_login(student_user)
+        client.put(reverse("section-students", kwargs={"pk": section.pk}))
+        assert attendance_dates() == {datetime.date(2020, 6, 2)}
+
+        # moving the spacetime moves the upcoming occurrences and attendances
+        client.force_login(coord_user)
+        response = client.put(
+            reverse("spacetime-modify", kwargs={"pk": spacetime.pk}),
+            {"day_of_week": 3},
+            content_type="application/json",
+        )
+        assert response.status_code == 202
+        wednesdays = weekly(datetime.date(2020, 5, 27))
+        assert dates() == {datetime.date(2020, 5, 26)} | wednesdays
+        assert attendance_dates() == {datetime.date(2020, 6, 3)}
+
+        # an override moves the occurrence of its week
+        override_url = reverse("spacetime-override", kwargs={"pk": spacetime.pk})
+        response = client.put(
+            override_url,
+            {"location": "Soda 380", "start_time": "12:00", "date": "2020-06-12"},
+            content_type="application/json",
+        )
+        assert response.status_code == 201
+        assert dates() == {datetime.date(2020, 5, 26), datetime.date(2020, 6, 12)} | (
+            wednesdays - {datetime.date(2020, 6, 10)}
+        )
+
+        response = client.delete(override_url)
+        assert response.status_code == 200
+        assert dates() == {datetime.date(2020, 5, 26)} | wednesdays
@@ -0,0 +1,95 @@
+import datetime
+import decimal
+import io
+import uuid
+
+import pytest
+from django.utils.translation import gettext_lazy
+from djangorestframework_camel_case.parser import CamelCaseJSONParser as LibraryParser
+from djangorestframework_camel_case.render import (
+    CamelCaseJSONRenderer as LibraryRenderer,
+)
+from rest_framework.exceptions import ParseError
+from scheduler.camel_case import CamelCaseJSONParser, CamelCaseJSONRenderer
+
+PAYLOADS = [
+    None,
+    [],
+    {},
+    "plain_string",
+    {
+        "snake_case_key": 1,
+        "already_camelCase": [{"nested_key": True, "other_key": None}],
+        "_leading": "x",
+        "trailing_": "y",
+        "double__underscore": 2,
+        "key_1_2": 3.5,
+        1: "int key",
+        "unicode_värde": "ünïcödé – 中文",
+        "separators": "line\u2028paragraph\u2029end",
+        "tuple_value": ("a_b", {"in_tuple": 1}),
+        gettext_lazy("lazy_key"): gettext_lazy("lazy value"),
+    },
+    {
+        "date_value": datetime.date(2024, 1, 2),
+        "time_value": datetime.time(13, 45, 6, 789),
+        "datetime_value": datetime.datetime(
+            2024, 1, 2, 3, 4, 5, 678, tzinfo=datetime.timezone.utc
+        ),
+        "naive_datetime": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "offset_datetime": datetime.datetime(
+            2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=-8))
+        ),
+        "duration_value": datetime.timedelta(hours=1, minutes=20),
+        "decimal_value": decimal.Decimal("1.25"),
+        "uuid_value": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "big_int": 2**70,
+        "floats": [0.1, 1.0, -2.5, 1e10],
+    },
+]
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_renderer_parity(payload):
+    """
+    Check that the renderer output is identical to djangorestframework_camel_case's.
+    """
+    assert CamelCaseJSONRenderer().render(payload) == LibraryRenderer().render(payload)
+
+
+def test_renderer_indent_parity():
+    """
+    Check that requested indentation is honored like djangorestframework_camel_case.
+    """
+    payload = PAYLOADS[4]
+    media_type = "application/json; indent=2"
+    assert CamelCaseJSONRenderer().render(
+        payload, media_type
+    ) == LibraryRenderer().render(payload, media_type)
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"snakeCase": {"nestedKey": [1, {"deepKey": "valueKey"}]}, "HTTPHeader": 1}',
+        b'[{"key1": 1.5, "aB": null, "Ab": true}]',
+        '{"ünïcödeKey": "värde"}'.encode(),
+        b'{"notANumber": NaN}',
+        b'"justAString"',
+    ],
+)
+def test_parser_parity(body):
+    """
+    Check that parsed data is identical to djangorestframework_camel_case's.
+    """
+    assert CamelCaseJSONParser().parse(io.BytesIO(body)) == LibraryParser().parse(
+        io.BytesIO(body)
+    )
+
+
+def test_parser_error():
+    """
+    Check that invalid JSON raises a parse error.
+    """
+    with pytest.raises(ParseError):
+        CamelCaseJSONParser().parse(io.BytesIO(b'{"unterminated": '))
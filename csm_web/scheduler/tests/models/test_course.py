@@ -0,0 +1,364 @@
+import datetime
+import io
+import threading
+from decimal import Decimal
+
+import pytest
+from django.core import management
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from scheduler.factories import (
+    CoordinatorFactory,
+    CourseFactory,
+    MentorFactory,
+    SectionFactory,
+    SpacetimeFactory,
+    StudentFactory,
+    UserFactory,
+)
+from scheduler.models import Attendance, Course, Section, SectionOccurrence
+from scheduler.views.utils import decode_cursor, encode_cursor
+
+
+# avoid pylint warning redefining name in outer scope
+@pytest.fixture(name="setup_course")
+def fixture_setup_course(db):  # pylint: disable=unused-argument
+    """
+    Set up a course with a few sections, and clear any cached catalogs.
+    """
+    cache.clear()
+    course = CourseFactory.create()
+    sections = [
+        SectionFactory.create(mentor=MentorFactory.create(course=course), capacity=3)
+        for _ in range(3)
+    ]
+    return course, sections
+
+
+def get_sections(client, course, etag=None):
+    """Fetch the section catalog of the course, returning the response and query count."""
+    headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            reverse("course-sections", kwargs={"pk": course.pk}), **headers
+        )
+    return response, len(queries)
+
+
+def num_enrolled(response, section):
+    """Find the number of students enrolled in the section in a catalog response."""
+    return next(
+        catalog_section["num_students_enrolled"]
+        for day_sections in response.data["sections"].values()
+        for catalog_section in day_sections
+        if catalog_section["id"] == section.pk
+    )
+
+
+@pytest.mark.django_db
+def test_section_catalog_cached_by_version(
+    client, setup_course, django_capture_on_commit_callbacks
+):
+    """
+    Check that the catalog is served from the cache and revalidated with ETags
+    until the course's sections change.
+    """
+    course, sections = setup_course
+    client.force_login(UserFactory.create())
+
+    response, uncached_queries = get_sections(client, course)
+    assert response.status_code == 200
+    assert response.data["userIsCoordinator"] is False
+    etag = response["ETag"]
+
+    response, cached_queries = get_sections(client, course)
+    assert response.status_code == 200
+    assert response["ETag"] == etag
+    assert cached_queries < uncached_queries
+
+    response, _ = get_sections(client, course, etag=etag)
+    assert response.status_code == 304
+
+    # enrolling a student changes the catalog
+    with django_capture_on_commit_callbacks(execute=True):
+        StudentFactory.create(course=course, section=sections[0])
+    response, _ = get_sections(client, course, etag=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    assert num_enrolled(response, sections[0]) == 1
+    etag = response["ETag"]
+
+    # as does changing a section's spacetimes
+    with django_capture_on_commit_callbacks(execute=True):
+        SpacetimeFactory.create(section=sections[1])
+    response, _ = get_sections(client, course, etag=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db(transaction=True)
+def test_seat_feed(client, setup_course):
+    """
+    Check that the seat feed only reports sections whose seat counts changed
+    since the cursor, including changes committed after a later cursor was handed out.
+    """
+    course, sections = setup_course
+    client.force_login(UserFactory.create())
+    seats_url = reverse("course-seats", kwargs={"pk": course.pk})
+
+    response = client.get(seats_url)
+    assert response.data["seats"] == {section.pk: 0 for section in sections}
+    cursor = response.data["cursor"]
+
+    response = client.get(seats_url, {"since": cursor})
+    assert response.data["seats"] == {}
+
+    student = StudentFactory.create(course=course, section=sections[1])
+    response = client.get(seats_url, {"since": cursor})
+    assert response.data["seats"] == {sections[1].pk: 1}
+
+    student.active = False
+    student.save()
+    response = client.get(seats_url, {"since": cursor})
+    assert response.data["seats"] == {sections[1].pk: 0}
+
+    # a seat change whose transaction commits after a later cursor was handed out
+    # is still reported from that cursor
+    claimed, commit = threading.Event(), threading.Event()
+
+    def claim_slowly():
+        try:
+            with transaction.atomic():
+                Section.claim_seat(sections[2].pk)
+                claimed.set()
+                commit.wait()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=claim_slowly)
+    thread.start()
+    claimed.wait()
+    response = client.get(seats_url, {"since": cursor})
+    assert response.data["seats"] == {sections[1].pk: 0}
+    cursor = response.data["cursor"]
+    commit.set()
+    thread.join()
+    response = client.get(seats_url, {"since": cursor})
+    assert response.data["seats"] == {sections[2].pk: 1}
+
+    response = client.get(seats_url, {"since": "yesterday"})
+    assert response.status_code == 400
+
+
+def get_roster(client, course, roster, **params):
+    """Fetch a coordinator roster of the course, returning the data and query count."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(f"/api/coord/{course.pk}/{roster}/", params)
+    assert response.status_code == 200
+    return response.data, len(queries)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("roster", ["students", "mentors"])
+def test_coord_roster_queries(client, setup_course, roster):
+    """
+    Check that the coordinator rosters take a constant number of queries.
+    """
+    course, sections = setup_course
+    client.force_login(CoordinatorFactory.create(course=course).user)
+
+    StudentFactory.create(course=course, section=sections[0])
+    _, num_queries = get_roster(client, course, roster)
+
+    for section in sections:
+        StudentFactory.create_batch(3, course=course, section=section)
+        SpacetimeFactory.create(section=section)
+    MentorFactory.create(course=course)
+    data, more_queries = get_roster(client, course, roster)
+    assert more_queries == num_queries
+    assert len(data) == (10 if roster == "students" else 4)
+
+
+@pytest.mark.django_db
+def test_coord_roster_search_sort_paginate(client, setup_course):
+    """
+    Check that the coordinator student roster can be searched, sorted
+    and paginated with cursors.
+    """
+    course, sections = setup_course
+    client.force_login(CoordinatorFactory.create(course=course).user)
+    for section in sections:
+        StudentFactory.create_batch(3, course=course, section=section)
+    students, _ = get_roster(client, course, "students")
+    names = [student["name"] for student in students]
+    assert names == sorted(names)
+
+    for sort in ("name", "-email", "num_unexcused"):
+        pages = []
+        data, _ = get_roster(client, course, "students", sort=sort, limit=4)
+        pages.append(data["results"])
+        while data["next"] is not None:
+            data, _ = get_roster(
+                client, course, "students", sort=sort, limit=4, cursor=data["next"]
+            )
+            pages.append(data["results"])
+        assert [len(page) for page in pages] == [4, 4, 1]
+        unpaginated, _ = get_roster(client, course, "students", sort=sort)
+        assert [student for page in pages for student in page] == unpaginated
+
+    email = students[5]["email"]
+    data, _ = get_roster(client, course, "students", search=email.upper())
+    assert [student["email"] for student in data] == [email]
+
+    response = client.get(f"/api/coord/{course.pk}/students/", {"sort": "section"})
+    assert response.status_code == 400
+    response = client.get(f"/api/coord/{course.pk}/students/", {"cursor": "x"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_coord_roster_paginate_missing_keys(client, setup_course):
+    """
+    Check that rosters sorted by a key that may be missing (the section time of
+    mentors without a section) page through every row, with missing keys last.
+    """
+    course, sections = setup_course
+    client.force_login(CoordinatorFactory.create(course=course).user)
+    for section, hour in zip(sections, (9, 9, 14)):
+        section.spacetimes.update(start_time=datetime.time(hour))
+    MentorFactory.create_batch(3, course=course)
+
+    for sort in ("time", "-time"):
+        pages = []
+        data, _ = get_roster(client, course, "mentors", sort=sort, limit=2)
+        pages.append(data["results"])
+        while data["next"] is not None:
+            data, _ = get_roster(
+                client, course, "mentors", sort=sort, limit=2, cursor=data["next"]
+            )
+            pages.append(data["results"])
+        assert [len(page) for page in pages] == [2, 2, 2]
+        unpaginated, _ = get_roster(client, course, "mentors", sort=sort)
+        assert [mentor for page in pages for mentor in page] == unpaginated
+        assert [mentor["section"] is None for mentor in unpaginated] == [False] * 3 + [
+            True
+        ] * 3
+
+
+def test_cursor_keys():
+    """
+    Check that cursors round-trip sort keys that JSON cannot represent,
+    and are rejected for other sorts.
+    """
+    for key in (
+        None,
+        "name",
+        3,
+        datetime.date(2020, 6, 2),
+        datetime.datetime(2020, 6, 2, 10, 30, tzinfo=datetime.timezone.utc),
+        datetime.time(10, 30),
+        datetime.timedelta(hours=1, minutes=30),
+        Decimal("1.50"),
+    ):
+        cursor = encode_cursor("time", key, 7)
+        assert decode_cursor(cursor, "time") == (key, 7)
+        with pytest.raises(ValidationError):
+            decode_cursor(cursor, "-time")
+
+
+@pytest.mark.django_db
+def test_at_risk_students(client, setup_course):
+    """
+    Check that students over, or close to, the permitted absences are listed
+    across all of the coordinator's courses, with a single query for the students.
+    """
+    course, sections = setup_course
+    other_course = CourseFactory.create(permitted_absences=1)
+    other_section = SectionFactory.create(
+        mentor=MentorFactory.create(course=other_course)
+    )
+    coordinator_user = CoordinatorFactory.create(course=course).user
+    CoordinatorFactory.create(course=other_course, user=coordinator_user)
+    client.force_login(coordinator_user)
+    Course.objects.filter(pk=course.pk).update(permitted_absences=2)
+
+    def create_student(section, num_unexcused):
+        """Create a student with the given number of unexcused absences."""
+        student = StudentFactory.create(course=section.mentor.course, section=section)
+        for day in range(num_unexcused):
+            occurrence, _ = SectionOccurrence.objects.get_or_create(
+                section=section, date=datetime.date(2020, 6, 1 + day)
+            )
+            Attendance.objects.create(
+                student=student, sectionOccurrence=occurrence, presence="UN"
+            )
+        return student
+
+    over = create_student(sections[0], 3)
+    close = create_student(sections[1], 2)
+    create_student(sections[2], 0)
+    other_over = create_student(other_section, 2)
+
+    def at_risk(**params):
+        """Fetch the at-risk students, as {course id: [student ids]}."""
+        response = client.get("/api/coord/at-risk/", params)
+        assert response.status_code == 200
+        return {
+            at_risk_course["id"]: [
+                student["id"] for student in at_risk_course["students"]
+            ]
+            for at_risk_course in response.data
+        }
+
+    with CaptureQueriesContext(connection) as queries:
+        assert at_risk() == {course.pk: [over.pk], other_course.pk: [other_over.pk]}
+    # the versions of the summaries, then the students
+    assert sum("scheduler_attendancesummary" in query["sql"] for query in queries) == 2
+    assert at_risk(within=1, courses=course.pk) == {course.pk: [over.pk, close.pk]}
+    response = client.get("/api/coord/at-risk/", {"within": "-1"})
+    assert response.status_code == 400
+
+    # cached lists change as soon as an absence is marked or the permitted absences do
+    with CaptureQueriesContext(connection) as queries:
+        assert at_risk()[course.pk] == [over.pk]
+    assert sum("scheduler_attendancesummary" in query["sql"] for query in queries) == 1
+    occurrence, _ = SectionOccurrence.objects.get_or_create(
+        section=sections[1], date=datetime.date(2020, 6, 3)
+    )
+    Attendance.objects.create(
+        student=close, sectionOccurrence=occurrence, presence="UN"
+    )
+    assert set(at_risk()[course.pk]) == {over.pk, close.pk}
+    Course.objects.filter(pk=course.pk).update(permitted_absences=3)
+    assert at_risk()[course.pk] == []
+    Course.objects.filter(pk=course.pk).update(permitted_absences=2)
+    create_student(sections[0], 4)
+    assert len(at_risk()[course.pk]) == 3
+
+    out = io.StringIO()
+    management.call_command("at_risk_students", "--within", "1", stdout=out)
+    assert len(out.getvalue().splitlines()) == 5
+
+    # course names are reused every term, so they only select courses that have not
+    # ended, while ids select any course
+    past_course = CourseFactory.create()
+    Course.objects.filter(pk=past_course.pk).update(
+        name=course.name, valid_until=datetime.date(2015, 5, 15)
+    )
+    assert set(Course.by_id_or_name([course.name, str(other_course.pk)])) == {
+        course,
+        other_course,
+    }
+    assert list(Course.by_id_or_name([str(past_course.pk)])) == [past_course]
+    out = io.StringIO()
+    management.call_command(
+        "at_risk_students", "--within", "1", "--course", course.name, stdout=out
+    )
+    assert len(out.getvalue().splitlines()) == 4
+
+    client.force_login(UserFactory.create())
+    response = client.get("/api/coord/at-risk/")
+    assert response.status_code == 403
@@ -0,0 +1,208 @@
+import pytest
+from django.core import management
+from django.db.models import F
+from django.urls import reverse
+from scheduler.factories import (
+    CoordinatorFactory,
+    CourseFactory,
+    MentorFactory,
+    SectionFactory,
+    SectionOccurrenceFactory,
+    StudentFactory,
+    UserFactory,
+)
+from scheduler.models import Attendance, Course, ExportJob, Student
+from scheduler.views import export
+
+
+# avoid pylint warning redefining name in outer scope
+@pytest.fixture(name="setup_export")
+def fixture_setup_export(db, settings, tmp_path):  # pylint: disable=unused-argument
+    """
+    Set up a course with students and a coordinator, storing exports on the local
+    filesystem.
+    """
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": str(tmp_path)},
+        },
+    }
+    course = CourseFactory.create()
+    for _ in range(2):
+        section = SectionFactory.create(mentor=MentorFactory.create(course=course))
+        StudentFactory.create_batch(3, course=course, section=section)
+    coordinator_user = UserFactory.create()
+    CoordinatorFactory.create(user=coordinator_user, course=course)
+    return course, coordinator_user
+
+
+def test_export_job(client, setup_export, tmp_path, monkeypatch):
+    """
+    Check that export jobs are run by the worker into the default storage, produce the
+    same CSV as the synchronous export, and are reused for identical requests until
+    the data changes.
+    """
+    course, coordinator_user = setup_export
+    monkeypatch.setattr(export, "EXPORT_JOB_PROGRESS_INTERVAL", 2)
+    client.force_login(coordinator_user)
+    params = {
+        "type": "STUDENT_DATA",
+        "courses": str(course.pk),
+        "fields": "course_name,section_id,num_present",
+    }
+    create_url = reverse("export-jobs")
+
+    response = client.post(create_url, params, content_type="application/json")
+    assert response.status_code == 201
+    job = response.json()
+    assert job["status"] == "pending"
+    assert job["download"] is None
+
+    # identical requests reuse the pending job
+    response = client.post(
+        create_url,
+        {**params, "fields": "num_present,section_id,course_name"},
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == job["id"]
+    download_url = reverse("export-job-download", kwargs={"pk": job["id"]})
+    assert client.get(download_url).status_code == 409
+
+    management.call_command("run_export_jobs", "--once")
+    response = client.get(reverse("export-job", kwargs={"pk": job["id"]}))
+    assert response.status_code == 200
+    job = response.json()
+    assert job["status"] == "done"
+    assert job["progress"] == 1.0
+    assert job["download"] == download_url
+
+    # the artifact is stored on the local filesystem
+    job_file = ExportJob.objects.get(pk=job["id"]).file
+    assert (tmp_path / job_file.name).is_file()
+    response = client.get(download_url)
+    assert response.status_code == 200
+    content = b"".join(response.streaming_content)
+    expected = b"".join(client.get("/api/export/", params).streaming_content)
+    assert content == expected
+    assert len(content.splitlines()) == 7
+
+    # the finished export is reused until the course's data changes
+    response = client.post(create_url, params, content_type="application/json")
+    assert response.status_code == 200
+    assert response.json()["id"] == job["id"]
+    Course.objects.filter(pk=course.pk).update(data_version=F("data_version") + 1)
+    response = client.post(create_url, params, content_type="application/json")
+    assert response.status_code == 201
+    assert response.json()["id"] != job["id"]
+
+    # attendance writes do not bump the data version, but still change the key
+    keys = set(ExportJob.objects.values_list("key", flat=True))
+    student = Student.objects.filter(course=course).first()
+    attendance = Attendance.objects.create(
+        student=student,
+        sectionOccurrence=SectionOccurrenceFactory.create(
+            section=student.section, date=course.section_start
+        ),
+    )
+    response = client.post(create_url, params, content_type="application/json")
+    assert response.status_code == 201
+    Attendance.objects.filter(pk=attendance.pk).update(presence="PR")
+    response = client.post(create_url, params, content_type="application/json")
+    assert response.status_code == 201
+    assert len(set(ExportJob.objects.values_list("key", flat=True)) - keys) == 2
+
+    # only coordinators of all the courses can see the job
+    client.force_login(UserFactory.create())
+    assert (
+        client.get(reverse("export-job", kwargs={"pk": job["id"]})).status_code == 403
+    )
+    assert client.get(download_url).status_code == 403
+
+
+def test_export_job_failure(client, setup_export, monkeypatch):
+    """Check that failing export jobs are reported, and invalid types rejected."""
+    course, coordinator_user = setup_export
+    client.force_login(coordinator_user)
+    create_url = reverse("export-jobs")
+
+    response = client.post(
+        create_url,
+        {"type": "INVALID", "courses": str(course.pk)},
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database on fire")
+
+    monkeypatch.setattr(export, "prepare_csv", fail)
+    response = client.post(
+        create_url,
+        {"type": "COURSE_DATA", "courses": str(course.pk)},
+        content_type="application/json",
+    )
+    management.call_command("run_export_jobs", "--once")
+    job = client.get(reverse("export-job", kwargs={"pk": response.json()["id"]})).json()
+    assert job["status"] == "failed"
+    assert job["error"] == "database on fire"
+
+    # failed jobs are not reused
+    response = client.post(
+        create_url,
+        {"type": "COURSE_DATA", "courses": str(course.pk)},
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+
+
+def test_export_job_params(client, setup_export):
+    """
+    Check that courses and fields are accepted as lists or comma-separated strings,
+    and that invalid parameters and other users are rejected.
+    """
+    course, coordinator_user = setup_export
+    create_url = reverse("export-jobs")
+    client.force_login(coordinator_user)
+
+    response = client.post(
+        create_url,
+        {"type": "COURSE_DATA", "courses": [course.pk], "fields": ["course_name"]},
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    response = client.post(
+        create_url,
+        {"type": "COURSE_DATA", "courses": str(course.pk), "fields": "course_name"},
+        content_type="application/json",
+    )
+    assert response.status_code == 200
+
+    for invalid in (
+        {"courses": "one,two"},
+        {"courses": [[course.pk]]},
+        {"courses": [True]},
+        {"courses": {"id": course.pk}},
+        {"courses": [course.pk], "fields": [1]},
+        {"courses": [course.pk], "type": ["COURSE_DATA"]},
+    ):
+        response = client.post(
+            create_url,
+            {"type": "COURSE_DATA", **invalid},
+            content_type="application/json",
+        )
+        assert response.status_code == 400, invalid
+
+    client.force_login(UserFactory.create())
+    response = client.post(
+        create_url,
+        {"type": "COURSE_DATA", "courses": [course.pk]},
+        content_type="application/json",
+    )
+    assert response.status_code == 403
+    response = client.get(
+        "/api/export/", {"type": "COURSE_DATA", "courses": str(course.pk)}
+    )
+    assert response.status_code == 403
@@ -0,0 +1,258 @@
+import datetime
+
+import pytest
+from django.db.models import Prefetch
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.settings import api_settings
+from scheduler.factories import (
+    AttendanceFactory,
+    CoordinatorFactory,
+    CourseFactory,
+    MentorFactory,
+    OverrideFactory,
+    SectionFactory,
+    SectionOccurrenceFactory,
+    SpacetimeFactory,
+    StudentFactory,
+    UserFactory,
+)
+from scheduler.fast_serializers import (
+    annotate_coord_mentors,
+    annotate_coord_students,
+    serialize_catalog_sections,
+    serialize_coord_mentors,
+    serialize_coord_students,
+    serialize_profiles,
+    serialize_section_occurrences,
+    serialize_sections,
+    serialize_students,
+)
+from scheduler.models import (
+    Attendance,
+    Mentor,
+    Section,
+    SectionOccurrence,
+    Spacetime,
+    Student,
+)
+from scheduler.serializers import (
+    CoordMentorSerializer,
+    CoordStudentSerializer,
+    ProfileSerializer,
+    SectionOccurrenceSerializer,
+    SectionSerializer,
+    StudentSerializer,
+)
+
+
+def render(data):
+    """Render the data exactly as API responses are rendered."""
+    return api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data)
+
+
+# avoid pylint warning redefining name in outer scope
+@pytest.fixture(name="setup_course")
+def fixture_setup_course(db):  # pylint: disable=unused-argument
+    """
+    Set up a course with sections, spacetimes (including online ones),
+    students and attendances.
+    """
+    course = CourseFactory.create(word_of_the_day_limit=datetime.timedelta(days=2))
+    sections = [
+        SectionFactory.create(mentor=MentorFactory.create(course=course))
+        for _ in range(4)
+    ]
+    sections.append(
+        SectionFactory.create(
+            mentor=MentorFactory.create(course=course, family="online"),
+            description="online",
+            spacetimes=[
+                SpacetimeFactory.create(location="https://berkeley.zoom.us/j/1"),
+                SpacetimeFactory.create(location="Soda 283"),
+            ],
+        )
+    )
+    for section in sections:
+        students = StudentFactory.create_batch(3, course=course, section=section)
+        StudentFactory.create(course=course, section=section, active=False)
+        for week in range(3):
+            occurrence = SectionOccurrenceFactory.create(
+                section=section,
+                # well before any occurrences created on enrollment
+                date=datetime.date(2020, 1, 6) + datetime.timedelta(weeks=week),
+            )
+            for student, presence in zip(students, ("PR", "UN", "")):
+                AttendanceFactory.create(
+                    student=student, sectionOccurrence=occurrence, presence=presence
+                )
+    # an upcoming and an expired override
+    today = timezone.now().astimezone(timezone.get_default_timezone()).date()
+    for section, date in zip(
+        sections, (today + datetime.timedelta(days=9), datetime.date(2020, 1, 8))
+    ):
+        OverrideFactory.create(
+            overriden_spacetime=section.spacetimes.first(),
+            spacetime=SpacetimeFactory.create(day_of_week=date.strftime("%A")),
+            date=date,
+        )
+    Section.recompute_enrolled_counts()
+    return course, sections
+
+
+def ordered_spacetimes(lookup="spacetimes"):
+    """Prefetch spacetimes in the order of the fast serializers."""
+    return Prefetch(
+        lookup, queryset=Spacetime.objects.order_by("day_of_week", "start_time")
+    )
+
+
+@pytest.mark.django_db
+def test_catalog_sections_parity(setup_course):
+    """
+    Check that the fast course catalog matches `SectionSerializer`.
+    """
+    course, _ = setup_course
+    sections = Section.objects.filter(mentor__course=course).order_by("pk")
+    expected = SectionSerializer(
+        sections.select_related("mentor__user", "mentor__course").prefetch_related(
+            ordered_spacetimes()
+        ),
+        many=True,
+        context={
+            "omit_spacetime_links": True,
+            "omit_mentor_emails": True,
+            "omit_overrides": True,
+        },
+    ).data
+    assert render(serialize_catalog_sections(sections)) == render(expected)
+
+
+@pytest.mark.django_db
+def test_students_parity(setup_course):
+    """
+    Check that the fast section students match `StudentSerializer`.
+    """
+    course, _ = setup_course
+    students = Student.objects.filter(course=course).order_by("pk")
+    expected = StudentSerializer(
+        students.select_related("user").prefetch_related(
+            Prefetch("attendance_set", queryset=Attendance.objects.all())
+        ),
+        many=True,
+    ).data
+    assert render(serialize_students(students)) == render(expected)
+
+
+@pytest.mark.django_db
+def test_coord_students_parity(setup_course):
+    """
+    Check that the fast coordinator student list matches `CoordStudentSerializer`.
+    """
+    course, _ = setup_course
+    students = Student.objects.filter(course=course, active=True).order_by(
+        "user__first_name", "pk"
+    )
+    expected = CoordStudentSerializer(students, many=True).data
+    assert render(
+        serialize_coord_students(annotate_coord_students(students))
+    ) == render(expected)
+
+
+@pytest.mark.django_db
+def test_coord_mentors_parity(setup_course):
+    """
+    Check that the fast coordinator mentor list matches `CoordMentorSerializer`.
+    """
+    course, _ = setup_course
+    mentors = Mentor.objects.filter(course=course).order_by("user__first_name", "pk")
+    expected = CoordMentorSerializer(mentors, many=True).data
+    assert render(serialize_coord_mentors(annotate_coord_mentors(mentors))) == render(
+        expected
+    )
+
+
+@pytest.mark.django_db
+def test_sections_parity(setup_course):
+    """
+    Check that the fast section details match `SectionSerializer` for students,
+    mentors, coordinators and other users.
+    """
+    course, sections = setup_course
+    coordinator = CoordinatorFactory.create(course=course)
+    users = [
+        sections[0].students.first().user,
+        sections[1].mentor.user,
+        coordinator.user,
+        UserFactory.create(),
+    ]
+    queryset = Section.objects.filter(mentor__course=course).order_by("pk")
+    for user in users:
+        request = RequestFactory().get("/")
+        request.user = user
+        expected = SectionSerializer(
+            queryset.prefetch_related(ordered_spacetimes()),
+            many=True,
+            context={"request": request},
+        ).data
+        serialized = serialize_sections(queryset, user)
+        assert render(serialized) == render(expected)
+    # only the upcoming override is included
+    assert [
+        spacetime["override"] is not None
+        for section in serialized
+        for spacetime in section["spacetimes"]
+    ].count(True) == 1
+
+
+@pytest.mark.django_db
+def test_profiles_parity(setup_course):
+    """
+    Check that the fast profiles match `ProfileSerializer`, including mentors
+    without a section and dropped students.
+    """
+    course, sections = setup_course
+    user = sections[0].mentor.user
+    StudentFactory.create(user=user, course=course, section=sections[1])
+    StudentFactory.create(user=user, course=course, section=sections[2], active=False)
+    MentorFactory.create(user=user, course=CourseFactory.create())
+    CoordinatorFactory.create(user=user, course=CourseFactory.create())
+
+    expected = ProfileSerializer(
+        [
+            *user.student_set.filter(active=True, banned=False)
+            .order_by("pk")
+            .prefetch_related(ordered_spacetimes("section__spacetimes")),
+            *user.mentor_set.order_by("pk").prefetch_related(
+                ordered_spacetimes("section__spacetimes")
+            ),
+            *user.coordinator_set.order_by("pk"),
+        ],
+        many=True,
+    ).data
+    assert render(serialize_profiles(user)) == render(expected)
+
+
+@pytest.mark.django_db
+def test_section_occurrences_parity(setup_course):
+    """
+    Check that the fast section attendances match `SectionOccurrenceSerializer`.
+    """
+    course, sections = setup_course
+    occurrences = SectionOccurrence.objects.filter(section=sections[0])
+    expected = SectionOccurrenceSerializer(
+        occurrences.prefetch_related(
+            Prefetch(
+                "attendance_set",
+                queryset=Attendance.objects.select_related("student__user").order_by(
+                    "pk"
+                ),
+            )
+        ),
+        many=True,
+        context={"word_of_the_day_limit": course.word_of_the_day_limit},
+    ).data
+    assert render(
+        serialize_section_occurrences(occurrences, course.word_of_the_day_limit)
+    ) == render(expected)
+    assert serialize_section_occurrences(occurrences.none(), None) == []
@@ -1,7 +1,21 @@
+import datetime
+import io
+import json
+
 import pytest
+from django.core import management
+from django.core.management import CommandError
 
-from scheduler.models import Mentor, User
-from scheduler.factories import CourseFactory
+from scheduler.management.commands.checkintegrity import find_overlaps
+from scheduler.models import Course, Mentor, Student, User
+from scheduler.factories import (
+    CourseFactory,
+    MentorFactory,
+    SectionFactory,
+    SpacetimeFactory,
+    StudentFactory,
+    UserFactory,
+)
 
 
 @pytest.mark.django_db
@@ -29,3 +43,109 @@ def test_create_two_mentors_for_one_course():
     assert mentor.user == user
 
     assert Mentor.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_checkintegrity():
+    """
+    Check that checkintegrity reports users with several student profiles in a course,
+    students who also mentor, and mentors teaching at overlapping times, within and
+    across courses held at the same time.
+    """
+    course, other_course, past_course = CourseFactory.create_batch(3)
+    Course.objects.filter(pk=past_course.pk).update(
+        section_start=datetime.date(2015, 1, 20),
+        valid_until=datetime.date(2015, 5, 15),
+    )
+    user = UserFactory.create()
+
+    def create_section(course, *times, user=user):
+        """Create a section of the course taught by the user, at the Monday times."""
+        return SectionFactory.create(
+            mentor=MentorFactory.create(course=course, user=user),
+            spacetimes=[
+                SpacetimeFactory.create(
+                    day_of_week="Monday",
+                    start_time=datetime.time(hour=hour, minute=minute),
+                    duration=datetime.timedelta(hours=1),
+                )
+                for hour, minute in times
+            ],
+        )
+
+    first = create_section(course, (10, 0), (12, 0))
+    second = create_section(other_course, (10, 30))
+    third = create_section(course, (14, 0), (16, 0))
+    create_section(past_course, (10, 0))
+    create_section(other_course, (10, 0), user=UserFactory.create())
+
+    student_user = UserFactory.create()
+    enrolled = StudentFactory.create(user=student_user, course=course, section=third)
+    # only active student profiles are unique per course
+    dropped = StudentFactory.create(
+        user=student_user, course=course, section=first, active=False
+    )
+    StudentFactory.create(user=student_user, course=other_course, section=second)
+    StudentFactory.create(user=user, course=other_course, section=second)
+
+    out = io.StringIO()
+    with pytest.raises(CommandError):
+        management.call_command(
+            "checkintegrity", "--format", "json", "--workers", "1", stdout=out
+        )
+    issues = {
+        (found["check"], found["course"], tuple(found["objects"]))
+        for found in json.loads(out.getvalue())["issues"]
+    }
+    first_times = list(first.spacetimes.order_by("start_time"))
+    assert issues == {
+        ("duplicate_students", course.name, (enrolled.pk, dropped.pk)),
+        (
+            "student_and_mentor",
+            other_course.name,
+            (Student.objects.get(user=user).pk,),
+        ),
+        (
+            "overlapping_spacetimes",
+            min(course, other_course, key=lambda c: c.pk).name,
+            (first_times[0].pk, second.spacetimes.get().pk),
+        ),
+    }
+
+    # overlaps with courses that are not checked are still reported
+    later_course = max(course, other_course, key=lambda c: c.pk)
+    out = io.StringIO()
+    with pytest.raises(CommandError):
+        management.call_command(
+            "checkintegrity",
+            "--format",
+            "json",
+            "--course",
+            str(later_course.pk),
+            stdout=out,
+        )
+    assert (
+        "overlapping_spacetimes",
+        later_course.name,
+        (first_times[0].pk, second.spacetimes.get().pk),
+    ) in {
+        (found["check"], found["course"], tuple(found["objects"]))
+        for found in json.loads(out.getvalue())["issues"]
+    }
+
+    management.call_command(
+        "checkintegrity", "--course", past_course.name, stdout=io.StringIO()
+    )
+
+
+def test_find_overlaps():
+    """
+    Check that sweeping over sorted intervals finds every overlapping pair.
+    """
+    intervals = [(0, 10, "a"), (2, 4, "b"), (3, 12, "c"), (10, 11, "d"), (12, 13, "e")]
+    assert set(find_overlaps(intervals)) == {
+        ("a", "b"),
+        ("a", "c"),
+        ("b", "c"),
+        ("c", "d"),
+    }
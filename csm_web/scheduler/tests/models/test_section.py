@@ -0,0 +1,349 @@
+import datetime
+import threading
+from types import SimpleNamespace
+
+import pytest
+from django.contrib import admin
+from django.core import management
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from freezegun import freeze_time
+from scheduler.admin import StudentAdmin
+from scheduler.factories import (
+    CoordinatorFactory,
+    CourseFactory,
+    MentorFactory,
+    SectionFactory,
+    SpacetimeFactory,
+    StudentFactory,
+    UserFactory,
+)
+from scheduler.models import Attendance, Course, Section, Student
+from scheduler.serializers import Role, SectionSerializer
+
+
+# avoid pylint warning redefining name in outer scope
+@pytest.fixture(name="setup_section")
+def fixture_setup_section(db):  # pylint: disable=unused-argument
+    """
+    Set up a section in a course that is currently open for enrollment.
+    """
+    course = CourseFactory.create()
+    mentor = MentorFactory.create(course=course)
+    section = SectionFactory.create(mentor=mentor, capacity=3)
+    return course, section
+
+
+@pytest.mark.django_db
+def test_student_enroll_full_section(client, setup_section):
+    """
+    Check that a student cannot enroll in a section that is full.
+    """
+    course, section = setup_section
+    StudentFactory.create_batch(section.capacity, course=course, section=section)
+    section.refresh_from_db()
+    assert section.enrolled_count == section.capacity
+
+    student_user = UserFactory.create()
+    client.force_login(student_user)
+    response = client.put(reverse("section-students", kwargs={"pk": section.pk}))
+
+    assert response.status_code == 423
+    assert not Student.objects.filter(user=student_user).exists()
+    section.refresh_from_db()
+    assert section.enrolled_count == section.capacity
+
+
+@pytest.mark.django_db
+def test_student_enroll_and_drop_updates_seat_count(client, setup_section):
+    """
+    Check that the seat counter follows a student enrolling and dropping.
+    """
+    _, section = setup_section
+    student_user = UserFactory.create()
+    client.force_login(student_user)
+
+    response = client.put(reverse("section-students", kwargs={"pk": section.pk}))
+    assert response.status_code == 201
+    section.refresh_from_db()
+    assert section.enrolled_count == 1
+
+    student = Student.objects.get(user=student_user)
+    client.patch(reverse("student-drop", kwargs={"pk": student.pk}))
+    section.refresh_from_db()
+    assert section.enrolled_count == 0
+
+    # re-enrolling reuses the dropped student profile
+    response = client.put(reverse("section-students", kwargs={"pk": section.pk}))
+    assert response.status_code == 204
+    section.refresh_from_db()
+    assert section.enrolled_count == 1
+
+
+@pytest.mark.django_db
+def test_seat_count_follows_swap_admin_actions_and_delete(setup_section):
+    """
+    Check that the seat counter is kept exact by swaps, admin drops/undrops and deletions.
+    """
+    course, section = setup_section
+    other_section = SectionFactory.create(
+        mentor=MentorFactory.create(course=course), capacity=3
+    )
+    students = StudentFactory.create_batch(3, course=course, section=section)
+    section.refresh_from_db()
+    assert section.enrolled_count == 3
+
+    # swap a student into another section
+    students[0].section = other_section
+    students[0].save()
+    section.refresh_from_db()
+    other_section.refresh_from_db()
+    assert (section.enrolled_count, other_section.enrolled_count) == (2, 1)
+
+    student_admin = StudentAdmin(Student, admin.site)
+    student_admin.drop_students(None, Student.objects.filter(course=course))
+    section.refresh_from_db()
+    other_section.refresh_from_db()
+    assert (section.enrolled_count, other_section.enrolled_count) == (0, 0)
+
+    student_admin.undrop_students(None, Student.objects.filter(section=section))
+    section.refresh_from_db()
+    assert section.enrolled_count == 2
+
+    students[1].delete()
+    section.refresh_from_db()
+    assert section.enrolled_count == 1
+
+
+@pytest.mark.django_db
+def test_repair_enrolled_counts(setup_section):
+    """
+    Check that the repair command recomputes drifted seat counters.
+    """
+    course, section = setup_section
+    StudentFactory.create_batch(2, course=course, section=section)
+    Section.objects.filter(pk=section.pk).update(enrolled_count=0)
+
+    management.call_command("repair_enrolled_counts", "--dry-run")
+    section.refresh_from_db()
+    assert section.enrolled_count == 0
+
+    management.call_command("repair_enrolled_counts")
+    section.refresh_from_db()
+    assert section.enrolled_count == 2
+
+
+def coordinator_add(client, section, emails):
+    """
+    Enroll the emails in the section through the coordinator endpoint,
+    returning the response and the number of queries made.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = client.put(
+            reverse("section-students", kwargs={"pk": section.pk}),
+            {
+                "emails": [{"email": email} for email in emails],
+                "actions": {"capacity": "EXPAND"},
+            },
+            content_type="application/json",
+        )
+    return response, len(queries)
+
+
+@pytest.mark.django_db
+def test_coordinator_add_constant_queries(client):
+    """
+    Check that enrolling students as a coordinator takes the same number of queries
+    regardless of the number of students, and keeps seat counts and attendances exact.
+    """
+    # next Monday, in the middle of the term
+    today = datetime.date.today()
+    monday = today + datetime.timedelta(days=7 - today.weekday())
+    course = CourseFactory.create(
+        section_start=monday - datetime.timedelta(weeks=2),
+        valid_until=monday + datetime.timedelta(weeks=10),
+    )
+    # both batches overflow their section, so both expand its capacity
+    small_section, large_section = (
+        SectionFactory.create(
+            mentor=MentorFactory.create(course=course),
+            capacity=1,
+            spacetimes=[
+                SpacetimeFactory.create(
+                    day_of_week="Wednesday", start_time=datetime.time(10)
+                )
+            ],
+        )
+        for _ in range(2)
+    )
+    other_section = SectionFactory.create(mentor=MentorFactory.create(course=course))
+    coord_user = UserFactory.create()
+    CoordinatorFactory.create(user=coord_user, course=course)
+    client.force_login(coord_user)
+
+    # inactive students from another section are swapped in with the new students
+    dropped = StudentFactory.create_batch(
+        2, course=course, section=other_section, active=False
+    )
+    small = [student.user.email for student in dropped[:1]] + ["small@example.com"]
+    large = [student.user.email for student in dropped[1:]] + [
+        f"large{i}@example.com" for i in range(9)
+    ]
+
+    # noon on Monday, Pacific time
+    with freeze_time(datetime.datetime.combine(monday, datetime.time(20))):
+        Course.materialize_occurrences(Course.objects.filter(pk=course.pk))
+        response, small_queries = coordinator_add(client, small_section, small)
+        assert response.status_code == 200
+        response, large_queries = coordinator_add(client, large_section, large)
+        assert response.status_code == 200
+    assert small_queries == large_queries
+
+    for section, emails in ((small_section, small), (large_section, large)):
+        section.refresh_from_db()
+        assert section.enrolled_count == len(emails) == section.capacity
+        # one attendance for this week's occurrence, as when students enroll
+        # themselves; later weeks are left to the weekly job
+        assert set(
+            Attendance.objects.filter(sectionOccurrence__section=section).values_list(
+                "student", "date"
+            )
+        ) == {
+            (student, monday + datetime.timedelta(days=2))
+            for student in section.students.values_list("pk", flat=True)
+        }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_student_enroll_never_overbooks():
+    """
+    Check that many students enrolling at the same time never overbook a section.
+    """
+    course = CourseFactory.create()
+    mentor = MentorFactory.create(course=course)
+    section = SectionFactory.create(mentor=mentor, capacity=3)
+    student_users = UserFactory.create_batch(12)
+
+    enroll_url = reverse("section-students", kwargs={"pk": section.pk})
+    barrier = threading.Barrier(len(student_users))
+    status_codes = []
+
+    def enroll(user):
+        try:
+            client = Client()
+            client.force_login(user)
+            barrier.wait()
+            status_codes.append(client.put(enroll_url).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=enroll, args=(user,)) for user in student_users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(status_codes) == [201] * section.capacity + [423] * (
+        len(student_users) - section.capacity
+    )
+    section = Section.objects.get(pk=section.pk)
+    assert section.enrolled_count == section.capacity
+    assert section.students.filter(active=True).count() == section.capacity
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_duplicate_enroll_claims_one_seat():
+    """
+    Check that repeated enrollment requests of the same user at the same time enroll
+    the user only once, both for new and returning students.
+    """
+    course = CourseFactory.create()
+    section = SectionFactory.create(
+        mentor=MentorFactory.create(course=course), capacity=5
+    )
+    new_user, returning_user = UserFactory.create_batch(2)
+    StudentFactory.create(
+        user=returning_user,
+        course=course,
+        section=SectionFactory.create(mentor=MentorFactory.create(course=course)),
+        active=False,
+    )
+
+    enroll_url = reverse("section-students", kwargs={"pk": section.pk})
+    requests = [new_user] * 4 + [returning_user] * 4
+    barrier = threading.Barrier(len(requests))
+    status_codes = {new_user.pk: [], returning_user.pk: []}
+
+    def enroll(user):
+        try:
+            client = Client()
+            client.force_login(user)
+            barrier.wait()
+            status_codes[user.pk].append(client.put(enroll_url).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=enroll, args=(user,)) for user in requests]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(code == 201 for code in status_codes[new_user.pk]) == 1
+    assert sum(code == 204 for code in status_codes[returning_user.pk]) == 1
+    section = Section.objects.get(pk=section.pk)
+    assert section.enrolled_count == 2
+    for user in (new_user, returning_user):
+        assert (
+            Student.objects.filter(user=user, course=course, active=True).count() == 1
+        )
+
+
+@pytest.mark.django_db
+def test_section_serializer_role_resolution(setup_section):
+    """
+    Check that the user's role in each section of a list is resolved correctly,
+    with the same number of queries regardless of the number of sections.
+    """
+    course, mentored_section = setup_section
+    user = mentored_section.mentor.user
+    enrolled_section = SectionFactory.create(
+        mentor=MentorFactory.create(course=CourseFactory.create())
+    )
+    student = StudentFactory.create(
+        user=user, course=enrolled_section.mentor.course, section=enrolled_section
+    )
+    coord_course = CourseFactory.create()
+    coordinator = CoordinatorFactory.create(user=user, course=coord_course)
+    coord_sections = [
+        SectionFactory.create(mentor=MentorFactory.create(course=coord_course))
+        for _ in range(4)
+    ]
+    other_section = SectionFactory.create(mentor=MentorFactory.create(course=course))
+
+    sections = Section.objects.select_related("mentor").order_by("pk")
+    context = {"request": SimpleNamespace(user=user)}
+    with CaptureQueriesContext(connection) as queries:
+        data = SectionSerializer(sections, many=True, context=context).data
+    roles = {
+        section["id"]: (section["user_role"], section["associated_profile_id"])
+        for section in data
+    }
+    assert roles == {
+        mentored_section.pk: (Role.MENTOR.value, mentored_section.mentor.pk),
+        enrolled_section.pk: (Role.STUDENT.value, student.pk),
+        **{
+            section.pk: (Role.COORDINATOR.value, coordinator.pk)
+            for section in coord_sections
+        },
+        other_section.pk: (None, None),
+    }
+    profile_queries = [
+        query["sql"]
+        for query in queries
+        if '"scheduler_student"' in query["sql"]
+        or '"scheduler_coordinator"' in query["sql"]
+    ]
+    assert len(profile_queries) == 2
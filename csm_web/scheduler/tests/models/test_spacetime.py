@@ -12,6 +12,7 @@ from scheduler.factories import (
     SpacetimeFactory,
     UserFactory,
 )
+from scheduler.models import Section
 
 DEFAULT_TZ = timezone.get_default_timezone()
 
@@ -146,6 +147,7 @@ def test_delete_spacetime(client, setup_section, day, spacetime_index):
     section, _, coord, spacetimes = setup_section
 
     with freeze_time(day):
+        Section.materialize_occurrences(Section.objects.filter(pk=section.pk))
         client.force_login(coord.user)
         spacetime = spacetimes[spacetime_index]
         delete_url = reverse("spacetime-detail", kwargs={"pk": spacetime.pk})
@@ -155,14 +157,16 @@ def test_delete_spacetime(client, setup_section, day, spacetime_index):
         assert section.spacetimes.filter(pk=spacetime.pk).count() == 0
 
         # make sure future section occurrences have been deleted
-        # FIX ME: Once issue #303 is resolved, this should search
-        #     through the directly related section occurences
         assert (
             section.sectionoccurrence_set.filter(
-                date__gte=day, date__week_day=spacetime.day_number()
+                date__gte=day.date(), date__iso_week_day=spacetime.day_number() + 1
             ).count()
             == 0
         )
+        # and those of the other spacetime kept
+        assert section.sectionoccurrence_set.filter(
+            date__iso_week_day=spacetimes[1 - spacetime_index].day_number() + 1
+        ).exists()
 
 
 @pytest.mark.django_db
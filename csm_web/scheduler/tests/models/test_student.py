@@ -1,8 +1,16 @@
+import datetime
+import threading
+
 import pytest
 
 from django.core.exceptions import ValidationError
-from scheduler.models import Student, User
-from scheduler.factories import UserFactory, CourseFactory, SectionFactory, StudentFactory, MentorFactory
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from freezegun import freeze_time
+from scheduler.models import Attendance, Course, DayOfWeekField, Section, Student, User
+from scheduler.factories import UserFactory, CourseFactory, SectionFactory, SpacetimeFactory, StudentFactory, MentorFactory
 
 
 @pytest.mark.django_db
@@ -46,3 +54,100 @@ def test_create_duplicate_student():
             course=course,
             section=section,
         )
+
+
+@pytest.mark.django_db
+def test_student_save_creates_attendances_only_on_enrollment_change():
+    # next Monday, in the middle of the term
+    today = datetime.date.today()
+    monday = today + datetime.timedelta(days=7 - today.weekday())
+    course = CourseFactory.create(
+        section_start=monday - datetime.timedelta(weeks=2),
+        valid_until=monday + datetime.timedelta(weeks=10),
+    )
+    spacetimes = [
+        SpacetimeFactory.create(day_of_week=day, start_time=datetime.time(10))
+        for day in (DayOfWeekField.DAYS[2], DayOfWeekField.DAYS[4])
+    ]
+    section = SectionFactory.create(
+        mentor=MentorFactory.create(course=course), spacetimes=spacetimes
+    )
+
+    Course.materialize_occurrences(Course.objects.filter(pk=course.pk))
+
+    # noon on Monday, Pacific time
+    with freeze_time(datetime.datetime.combine(monday, datetime.time(20))):
+        student = Student.objects.create(
+            user=UserFactory.create(), course=course, section=section
+        )
+        # one attendance for each of the sections later this week
+        assert set(
+            student.attendance_set.values_list("sectionOccurrence__date", flat=True)
+        ) == {monday + datetime.timedelta(days=2), monday + datetime.timedelta(days=4)}
+
+        # saving without changing the enrollment does not touch attendances
+        student = Student.objects.get(pk=student.pk)
+        student.banned = True
+        with CaptureQueriesContext(connection) as queries:
+            student.save()
+        assert not any("attendance" in query["sql"] for query in queries)
+
+        # re-enrolling does not duplicate attendances
+        student.active = False
+        student.save()
+        student.active = True
+        student.save()
+        assert Attendance.objects.filter(student=student).count() == 2
+
+
+@pytest.mark.django_db
+def test_student_save_reads_enrollment_from_database():
+    section = SectionFactory.create(mentor=MentorFactory.create())
+    course = section.mentor.course
+    student = StudentFactory.create(course=course, section=section)
+    assert Section.objects.get(pk=section.pk).enrolled_count == 1
+
+    # dropping through a stale copy of an already dropped student releases no seat
+    stale = Student.objects.get(pk=student.pk)
+    student.active = False
+    student.save()
+    stale.active = False
+    stale.save()
+    assert Section.objects.get(pk=section.pk).enrolled_count == 0
+
+    # an instance built in memory for an existing student is not a new enrollment
+    student.active = True
+    student.save()
+    copy = Student(
+        pk=student.pk, user=student.user, course=course, section=section, active=True
+    )
+    copy._state.adding = False  # pylint: disable=protected-access
+    copy.save()
+    assert Section.objects.get(pk=section.pk).enrolled_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_student_drops_release_one_seat():
+    section = SectionFactory.create(mentor=MentorFactory.create())
+    student = StudentFactory.create(course=section.mentor.course, section=section)
+    drop_url = reverse("student-drop", kwargs={"pk": student.pk})
+    barrier = threading.Barrier(2)
+    status_codes = []
+
+    def drop():
+        try:
+            client = Client()
+            client.force_login(student.user)
+            barrier.wait()
+            status_codes.append(client.patch(drop_url).status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=drop) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert status_codes == [204, 204]
+    assert Section.objects.get(pk=section.pk).enrolled_count == 0
@@ -1,5 +1,15 @@
 import pytest
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from scheduler.factories import (
+    CourseFactory,
+    MentorFactory,
+    SectionFactory,
+    StudentFactory,
+    UserFactory,
+)
 from scheduler.models import User
 
 
@@ -13,3 +23,58 @@ def test_create_user():
     assert user.username == username
     assert User.objects.count() == 1
     assert User.objects.get(email=email).username == username
+
+
+@pytest.mark.django_db
+def test_enrollment_eligibility():
+    """
+    Check that the eligibility resolver agrees with the per-course checks.
+    """
+    user = UserFactory.create()
+    student_course, mentor_course, open_course, restricted_course = (
+        CourseFactory.create_batch(4)
+    )
+    restricted_course.is_restricted = True
+    restricted_course.save()
+    StudentFactory.create(
+        user=user,
+        course=student_course,
+        section=SectionFactory.create(
+            mentor=MentorFactory.create(course=student_course)
+        ),
+    )
+    SectionFactory.create(mentor=MentorFactory.create(user=user, course=mentor_course))
+
+    eligibility = user.enrollment_eligibility
+    courses = (student_course, mentor_course, open_course, restricted_course)
+    assert [eligibility.can_enroll(course) for course in courses] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert not eligibility.is_whitelisted_for(restricted_course)
+    for course in courses:
+        assert eligibility.can_enroll(course) == user.can_enroll_in_course(course)
+        assert eligibility.enrollment_open(course) == course.is_open()
+
+
+@pytest.mark.django_db
+def test_course_list_constant_queries(client):
+    """
+    Check that listing courses does not query the user's eligibility per course.
+    """
+    user = UserFactory.create()
+    client.force_login(user)
+
+    CourseFactory.create()
+    with CaptureQueriesContext(connection) as few_courses:
+        response = client.get(reverse("course-list"))
+    assert len(response.data) == 1
+
+    CourseFactory.create_batch(5)
+    with CaptureQueriesContext(connection) as many_courses:
+        response = client.get(reverse("course-list"))
+    assert len(response.data) == 6
+    assert all(course["user_can_enroll"] for course in response.data)
+    assert len(few_courses) == len(many_courses)
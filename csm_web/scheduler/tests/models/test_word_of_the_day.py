@@ -1,6 +1,8 @@
 import datetime
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from freezegun import freeze_time
@@ -11,7 +13,7 @@ from scheduler.factories import (
     SpacetimeFactory,
     UserFactory,
 )
-from scheduler.models import Attendance, SectionOccurrence, Student
+from scheduler.models import Attendance, Course, SectionOccurrence, Student
 
 DEFAULT_TZ = timezone.get_default_timezone()
 
@@ -63,6 +65,7 @@ def fixture_setup_section(db):  # pylint: disable=unused-argument
             ),
         ],
     )
+    Course.materialize_occurrences(Course.objects.filter(pk=course.pk))
     return mentor_user, student_user, course, section
 
 
@@ -198,7 +201,9 @@ def test_submit_attendance_failure(client, setup_section, word):
         client.put(enroll_url)
 
     # Set word of the day
-    section_occurrence = SectionOccurrence.objects.all().first()
+    section_occurrence = SectionOccurrence.objects.filter(
+        attendance__isnull=False
+    ).first()
     section_occurrence.word_of_the_day = "password"
     section_occurrence.save()
     assert section_occurrence.word_of_the_day == "password"
@@ -240,7 +245,9 @@ def test_submit_another_student_wotd_failure(client, setup_section):
         client.put(enroll_url)
 
     # set word of the day
-    section_occurrence = SectionOccurrence.objects.all().first()
+    section_occurrence = SectionOccurrence.objects.filter(
+        attendance__isnull=False
+    ).first()
     section_occurrence.word_of_the_day = "password"
     section_occurrence.save()
     assert section_occurrence.word_of_the_day == "password"
@@ -425,7 +432,9 @@ def test_student_submit_wotd_for_previous_attendance_failure(client, setup_secti
         enroll_url = reverse("section-students", kwargs={"pk": section.pk})
         client.put(enroll_url)
 
-    section_occurrence = SectionOccurrence.objects.all().first()
+    section_occurrence = SectionOccurrence.objects.filter(
+        attendance__isnull=False
+    ).first()
     section_occurrence.word_of_the_day = "correct"
     section_occurrence.save()
 
@@ -450,3 +459,58 @@ def test_student_submit_wotd_for_previous_attendance_failure(client, setup_secti
     # attendance should be unchanged
     attendance.refresh_from_db()
     assert attendance.presence == "UN"
+
+
+@pytest.mark.django_db
+def test_submit_wotd_single_query(client, setup_section):
+    """
+    Check that a correct word of the day submission authorizes and marks attendance
+    with a single query, and that the responses for rejected submissions are kept.
+    """
+    _mentor, student_user, _course, section = setup_section
+    with freeze_time(timezone.datetime(2020, 6, 1, 0, 0, 0, tzinfo=DEFAULT_TZ)):
+        client.force_login(student_user)
+        client.put(reverse("section-students", kwargs={"pk": section.pk}))
+    student = Student.objects.get(user=student_user)
+    attendance = student.attendance_set.first()
+    submit_attendance_url = reverse("section-wotd", kwargs={"pk": section.pk})
+
+    def submit(word):
+        with freeze_time(attendance.date):
+            return client.put(
+                submit_attendance_url,
+                {"attendanceId": attendance.id, "wordOfTheDay": word},
+                content_type="application/json",
+            )
+
+    # an empty submission does not match an occurrence without a word of the day
+    assert submit(" ").status_code == 400
+
+    SectionOccurrence.objects.filter(pk=attendance.sectionOccurrence_id).update(
+        word_of_the_day="password"
+    )
+    response = submit("wrong")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Incorrect word of the day"
+
+    with CaptureQueriesContext(connection) as queries:
+        response = submit(" Password ")
+    assert response.status_code == 200
+    # besides the queries authenticating the user
+    assert (
+        len(
+            [
+                query
+                for query in queries
+                if "django_session" not in query["sql"]
+                and 'FROM "scheduler_user"' not in query["sql"]
+            ]
+        )
+        == 1
+    )
+    attendance.refresh_from_db()
+    assert attendance.presence == "PR"
+
+    response = submit("password")
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Attendance already taken"
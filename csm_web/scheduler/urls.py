@@ -26,5 +26,13 @@ urlpatterns += [
     path("coord/<int:pk>/students/", views.coord.view_students),
     path("coord/<int:pk>/mentors/", views.coord.view_mentors),
     path("coord/<int:pk>/section/", views.coord.delete_section),
+    path("coord/at-risk/", views.coord.view_at_risk_students),
     path("export/", views.export_data),
+    path("export/jobs/", views.create_export_job, name="export-jobs"),
+    path("export/jobs/<int:pk>/", views.export_job, name="export-job"),
+    path(
+        "export/jobs/<int:pk>/download/",
+        views.download_export_job,
+        name="export-job-download",
+    ),
 ]
@@ -1,7 +1,7 @@
 from . import matcher
 from .coord import delete_section, view_mentors, view_students
 from .course import CourseViewSet
-from .export import export_data
+from .export import create_export_job, download_export_job, export_data, export_job
 from .profile import ProfileViewSet
 from .resource import ResourceViewSet
 from .section import SectionViewSet
@@ -1,10 +1,23 @@
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
-from scheduler.serializers import CoordMentorSerializer, CoordStudentSerializer
-from scheduler.views.utils import get_object_or_error
+from scheduler.fast_serializers import (
+    annotate_coord_mentors,
+    annotate_coord_students,
+    full_name,
+    serialize_coord_mentors,
+    serialize_coord_students,
+)
+from scheduler.views.utils import get_object_or_error, search_sort_paginate
 
-from ..models import Course, Mentor, Section, Student
+from ..models import AttendanceSummary, Course, Mentor, Section, Student
+
+# cached at-risk lists are keyed by everything they are computed from, so a list is
+# never read again once it changes; the timeout only frees up space in the cache
+AT_RISK_CACHE_TIMEOUT = 60 * 60 * 24
 
 
 @api_view(["GET"])
@@ -14,6 +27,11 @@ def view_students(request, pk=None):
     pk = course id
 
     GET: view all students in course
+        query parameters (see `search_sort_paginate`):
+        - search: filter by name or email
+        - sort: one of name, email, num_unexcused, time, optionally prefixed with "-"
+        - limit, cursor: paginate the list; the response is then
+          {"results": [students], "next": cursor or null}
     """
 
     is_coord = bool(
@@ -26,11 +44,23 @@ def view_students(request, pk=None):
             "You do not have permission to view the coordinator view."
         )
 
-    students = Student.objects.filter(active=True, course=pk).order_by(
-        "user__first_name"
+    students, next_cursor, paginated = search_sort_paginate(
+        request,
+        annotate_coord_students(Student.objects.filter(active=True, course=pk)),
+        sort_fields={
+            "name": "full_name",
+            "email": "user__email",
+            "num_unexcused": "num_unexcused",
+            "time": "start_time",
+        },
+        search_fields=["full_name", "user__email"],
+        default_sort="name",
     )
 
-    return Response(CoordStudentSerializer(students, many=True).data)
+    serialized = serialize_coord_students(students)
+    if paginated:
+        return Response({"results": serialized, "next": next_cursor})
+    return Response(serialized)
 
 
 @api_view(["GET"])
@@ -40,6 +70,13 @@ def view_mentors(request, pk=None):
     pk= course id
 
     GET: view all mentors in course
+        query parameters (see `search_sort_paginate`):
+        - search: filter by name or email
+        - sort: one of name, email, num_students, family, time (of the first spacetime
+          of their section; mentors without a section come last), optionally
+          prefixed with "-"
+        - limit, cursor: paginate the list; the response is then
+          {"results": [mentors], "next": cursor or null}
     """
 
     is_coord = bool(
@@ -52,8 +89,24 @@ def view_mentors(request, pk=None):
             "You do not have permission to view the coordinator view."
         )
 
-    mentors = Mentor.objects.filter(course=pk).order_by("user__first_name")
-    return Response(CoordMentorSerializer(mentors, many=True).data)
+    mentors, next_cursor, paginated = search_sort_paginate(
+        request,
+        annotate_coord_mentors(Mentor.objects.filter(course=pk)),
+        sort_fields={
+            "name": "full_name",
+            "email": "user__email",
+            "num_students": "num_students",
+            "family": "family",
+            "time": "start_time",
+        },
+        search_fields=["full_name", "user__email"],
+        default_sort="name",
+    )
+
+    serialized = serialize_coord_mentors(mentors)
+    if paginated:
+        return Response({"results": serialized, "next": next_cursor})
+    return Response(serialized)
 
 
 @api_view(["DELETE"])
@@ -76,3 +129,132 @@ def delete_section(request, pk):
     # Delete the section itself, will cascade and delete everything else
     section.delete()
     return Response(status=204)
+
+
+def get_at_risk_students(courses, within):
+    """
+    Retrieve the at-risk students (see `Course.at_risk_students`) of each course,
+    as {course id: [students]}; lists that are not cached yet are retrieved
+    with a single query across the courses.
+
+    Lists are cached per course data version, permitted absences and versions of the
+    students' attendance summaries, as attendance writes do not bump the data version.
+    """
+    # every attendance write increments the version of at least one summary
+    attendance_versions = {
+        row["student__course"]: f"{row['count']}:{row['version']}"
+        for row in AttendanceSummary.objects.filter(
+            student__course__in=[course.pk for course in courses]
+        )
+        .values("student__course")
+        .annotate(count=Count("pk"), version=Sum("version"))
+        .order_by()
+    }
+    cache_keys = {
+        course.pk: (
+            f"course-at-risk:{course.pk}:{course.data_version}"
+            f":{course.permitted_absences}"
+            f":{attendance_versions.get(course.pk, '0:0')}:{within}"
+        )
+        for course in courses
+    }
+    cached = cache.get_many(cache_keys.values())
+    at_risk = {
+        course_id: cached[key] for course_id, key in cache_keys.items() if key in cached
+    }
+    missing = [course_id for course_id in cache_keys if course_id not in at_risk]
+    if missing:
+        at_risk.update({course_id: [] for course_id in missing})
+        students = (
+            Course.at_risk_students(Course.objects.filter(pk__in=missing), within)
+            .order_by("-num_unexcused", "user__first_name", "user__last_name", "pk")
+            .values(
+                "pk",
+                "course",
+                "user__first_name",
+                "user__last_name",
+                "user__email",
+                "section",
+                "section__mentor__user__first_name",
+                "section__mentor__user__last_name",
+                "num_unexcused",
+                "attendance_summary__last_attended",
+            )
+        )
+        for row in students:
+            at_risk[row["course"]].append(
+                {
+                    "id": row["pk"],
+                    "name": full_name(row["user__first_name"], row["user__last_name"]),
+                    "email": row["user__email"],
+                    "section": row["section"],
+                    "mentor_name": full_name(
+                        row["section__mentor__user__first_name"],
+                        row["section__mentor__user__last_name"],
+                    ),
+                    "num_unexcused": row["num_unexcused"],
+                    "last_attended": row["attendance_summary__last_attended"],
+                }
+            )
+        cache.set_many(
+            {cache_keys[course_id]: at_risk[course_id] for course_id in missing},
+            AT_RISK_CACHE_TIMEOUT,
+        )
+    return at_risk
+
+
+@api_view(["GET"])
+def view_at_risk_students(request):
+    """
+    Endpoint: /coord/at-risk/
+
+    GET: view the students over, or close to, their course's permitted (unexcused)
+    absences, in every course the user coordinates
+        query parameters:
+        - within: also include students within this many absences of exceeding
+          the permitted absences (default 0)
+        - courses: comma-separated list of course ids, to only include these courses
+        format: [{"id", "name", "permitted_absences", "students": [
+            {"id", "name", "email", "section", "mentor_name", "num_unexcused",
+            "last_attended"}
+        ]}]
+    """
+    try:
+        within = int(request.query_params.get("within", 0))
+        course_ids = [
+            int(course_id)
+            for course_id in request.query_params.get("courses", "").split(",")
+            if course_id
+        ]
+    except ValueError:
+        return Response(
+            {"error": "within and courses must be integers"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if within < 0:
+        return Response(
+            {"error": "within must not be negative"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    courses = Course.objects.filter(coordinator__user=request.user).order_by("name")
+    if course_ids:
+        courses = courses.filter(pk__in=course_ids)
+    courses = list(courses.only("pk", "name", "permitted_absences", "data_version"))
+    if not courses:
+        raise PermissionDenied(
+            "You do not have permission to view the coordinator view."
+        )
+
+    at_risk = get_at_risk_students(courses, within)
+    return Response(
+        [
+            {
+                "id": course.pk,
+                "name": course.name,
+                "permitted_absences": course.permitted_absences,
+                "students": at_risk[course.pk],
+            }
+            for course in courses
+        ]
+    )
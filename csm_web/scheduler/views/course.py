@@ -1,19 +1,26 @@
 import csv
-from itertools import groupby
+import datetime
 
 from django.contrib.postgres.aggregates import ArrayAgg
-from django.db.models import Count, Prefetch, Q
+from django.core.cache import cache
+from django.db import transaction
 from django.http import HttpResponse
 from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
-from ..models import Course, Section, Spacetime, Student, User
-from ..serializers import CourseSerializer, SectionSerializer, UserSerializer
+from ..fast_serializers import serialize_catalog_sections
+from ..models import Course, Holiday, Section, Student, User
+from ..serializers import CourseSerializer, UserSerializer
 from .utils import get_object_or_error, viewset_with
 
+# cached catalogs are keyed by the course data version, so stale entries are never
+# read again; the timeout only bounds how long they take up space in the cache
+SECTION_CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 class CourseViewSet(*viewset_with("list")):
     serializer_class = CourseSerializer
@@ -47,8 +54,7 @@ class CourseViewSet(*viewset_with("list")):
         """Get a course's sections, grouped by the days the section occurs."""
         sections = (
             # get all mentor sections
-            Section.objects.select_related("mentor")
-            .filter(mentor__course=course)
+            Section.objects.filter(mentor__course=course)
             .annotate(
                 day_key=ArrayAgg(
                     "spacetimes__day_of_week",
@@ -61,57 +67,95 @@ class CourseViewSet(*viewset_with("list")):
                     distinct=True,
                 ),
             )
-            .order_by("day_key", "time_key")
-            .prefetch_related(
-                Prefetch(
-                    "spacetimes",
-                    queryset=Spacetime.objects.order_by("day_of_week", "start_time"),
-                )
-            )
-            .select_related("mentor__user")
-            .annotate(
-                num_students_annotation=Count(
-                    "students", filter=Q(students__active=True), distinct=True
-                )
-            )
+            .order_by("day_key", "time_key", "pk")
         )
-        # omit_spacetime_links makes it such that if a section is occuring online and therefore has
-        # a link as its location, instead of the link being returned, just the word 'Online' is.
-        # The reason we do this here is that we don't want desperate and/or malicious students
-        # poking around in their browser devtools to be able to find links for sections they aren't
-        # enrolled in and then go and crash them. omit_mentor_emails has a similar purpose.
-        # omit_overrides is done for performance reasons, as we avoid the extra join since we don't
-        # need actually need overrides here.
+        # The catalog omits spacetime links, such that if a section is occuring online and
+        # therefore has a link as its location, instead of the link being returned, just the
+        # word 'Online' is. The reason we do this here is that we don't want desperate and/or
+        # malicious students poking around in their browser devtools to be able to find links
+        # for sections they aren't enrolled in and then go and crash them. Mentor emails are
+        # omitted for a similar purpose, and overrides are omitted for performance reasons.
         #
-        # Python's groupby assumes things are in sorted order, all it does is find the indices
-        # where one group ends and the next begins, the DB is doing all the heavy lifting here.
-        return {
-            day_key: SectionSerializer(
-                group,
-                many=True,
-                context={
-                    "omit_spacetime_links": True,
-                    "omit_mentor_emails": True,
-                    "omit_overrides": True,
-                },
-            ).data
-            for day_key, group in groupby(sections, lambda section: section.day_key)
-        }
+        # The sections are grouped by day key in the order returned by the DB,
+        # so the DB is doing all the heavy lifting here.
+        return serialize_catalog_sections(sections, group_by="day_key")
+
+    def get_cached_sections_by_day(self, course):
+        """
+        Get a course's sections grouped by day, from the cache if the catalog
+        for the current version of the course has already been built.
+        """
+        cache_key = f"course-sections:{course.pk}:{course.data_version}"
+        sections_by_day = cache.get(cache_key)
+        if sections_by_day is None:
+            sections_by_day = self.get_sections_by_day(course)
+            cache.set(cache_key, sections_by_day, SECTION_CATALOG_CACHE_TIMEOUT)
+        return sections_by_day
 
     @action(detail=True)
     def sections(self, request, pk=None):
         """
         Get course sections, grouped by date, along with metadata for whether the user
         is a coordinator for the course.
+
+        The section catalog is the same for every user, so it is cached per course data
+        version; the response carries an ETag so that clients can revalidate with
+        If-None-Match and receive a 304 if nothing has changed.
+        """
+        course = get_object_or_error(self.get_queryset(), pk=pk)
+        user_is_coordinator = course.coordinator_set.filter(user=request.user).exists()
+
+        etag = f'"{course.pk}-{course.data_version}-{int(user_is_coordinator)}"'
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        # compare weakly, as the gzip middleware weakens the ETag
+        if_none_match = {
+            tag.removeprefix("W/")
+            for tag in parse_etags(request.headers.get("If-None-Match", ""))
+        }
+        if etag in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        return Response(
+            {
+                "userIsCoordinator": user_is_coordinator,
+                "sections": self.get_cached_sections_by_day(course),
+            },
+            headers=headers,
+        )
+
+    @action(detail=True)
+    def seats(self, request, pk=None):
+        """
+        Get the number of students enrolled in each section of the course whose seat
+        count changed since the `since` cursor (all sections if no cursor is given),
+        along with the cursor to use for the next request.
+
+        format: {"cursor": str, "seats": {section_id: num_students_enrolled}}
+
+        Seat counts are absolute, so changes that are sent more than once are harmless.
         """
         course = get_object_or_error(self.get_queryset(), pk=pk)
-        sections_by_day = self.get_sections_by_day(course)
+        # seat changes are stamped with the id of their transaction, which may commit
+        # after transactions with higher ids; the cursor is the oldest transaction
+        # still running, taken before the seats are read, so changes that are not yet
+        # visible are always sent on a later request
+        cursor = Section.seat_feed_watermark()
+        sections = Section.objects.filter(mentor__course=course)
+
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since = int(since)
+            except ValueError:
+                return Response(
+                    {"error": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            sections = sections.filter(seats_txid__gte=since)
+
         return Response(
             {
-                "userIsCoordinator": course.coordinator_set.filter(
-                    user=request.user
-                ).exists(),
-                "sections": sections_by_day,
+                "cursor": str(cursor),
+                "seats": dict(sections.values_list("pk", "enrolled_count")),
             }
         )
 
@@ -207,3 +251,49 @@ class CourseViewSet(*viewset_with("list")):
         # return updated course
         serializer = CourseSerializer(course)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"])
+    def occurrences(self, request, pk=None):
+        """
+        Materialize the section occurrences of the whole term for every section in the course,
+        skipping the course's holidays. Safe to repeat after spacetimes change.
+
+        Format of request body:
+        {
+            "holidays": [ (optional) list of dates (YYYY-MM-DD) to add as holidays first ]
+        }
+        Format of response:
+        {
+            "created": number of occurrences created,
+            "deleted": number of upcoming occurrences deleted
+        }
+        """
+        course = get_object_or_error(self.get_queryset(), pk=pk)
+
+        if not request.user.coordinator_set.filter(course=course).exists():
+            raise PermissionDenied(
+                detail="Must be a coordinator to materialize section occurrences"
+            )
+
+        try:
+            holidays = [
+                datetime.date.fromisoformat(date)
+                for date in request.data.get("holidays", [])
+            ]
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Holidays must be dates in the form YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            Holiday.objects.bulk_create(
+                [Holiday(course=course, date=date) for date in holidays],
+                ignore_conflicts=True,
+            )
+            created, deleted = Course.materialize_occurrences(
+                Course.objects.filter(pk=course.pk)
+            )
+        return Response(
+            {"created": created, "deleted": deleted}, status=status.HTTP_200_OK
+        )
@@ -1,15 +1,27 @@
 import csv
 import datetime
 import io
+import tempfile
 from typing import Generator, Iterable, List, Optional, Tuple
 
 from django.contrib.postgres.aggregates import ArrayAgg, JSONBAgg
 from django.core.exceptions import BadRequest
-from django.db.models import CharField, Count, Q, Value
-from django.db.models.functions import Concat
-from django.http.response import StreamingHttpResponse
+from django.core.files import File
+from django.db.models import CharField, Count, Value
+from django.db.models.functions import Coalesce, Concat
+from django.http.response import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
 from rest_framework.decorators import api_view
-from scheduler.models import Attendance, Course, Section, Student
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
+from scheduler.models import Attendance, Course, ExportJob, Section, Student
+
+from .utils import get_object_or_error, logger
+
+# number of rows between progress updates of background export jobs
+EXPORT_JOB_PROGRESS_INTERVAL = 500
 
 
 @api_view(["GET"])
@@ -29,41 +41,15 @@ def export_data(request):
                 type of data to export
     """
 
-    export_type = request.query_params.get("type", None)
-    courses_str = request.query_params.get("courses", None)
-    fields_str = request.query_params.get("fields", "")
+    export_type, courses, fields = parse_export_params(request, request.query_params)
     preview = request.query_params.get("preview", None)
 
-    if courses_str is None or export_type is None:
-        raise BadRequest(
-            "Must include `courses` and `type` fields in the query parameters"
-        )
-
-    # convert courses query param into a list of ints
-    try:
-        courses = [int(course_id) for course_id in courses_str.split(",")]
-    except ValueError as exc:
-        raise BadRequest(
-            "`courses` query parameter must be a comma-separated list of integers"
-        ) from exc
-    fields = fields_str.split(",")
-
-    # check course ids against the user's coordinator courses
-    coordinator_courses = set(
-        request.user.coordinator_set.values_list("course__id", flat=True)
-    )
-    courses_set_diff = set(courses).difference(coordinator_courses)
-    if len(courses_set_diff) > 0:
-        raise PermissionError(
-            "You must be a coordinator for all of the courses in the request"
-        )
-
     # convert preview query param into an int
     if preview is not None:
         try:
             preview = int(preview)
         except ValueError as exc:
-            raise BadRequest(
+            raise ValidationError(
                 "`preview` query parameter must be an integer or excluded"
             ) from exc
 
@@ -83,6 +69,207 @@ def export_data(request):
     return response
 
 
+@api_view(["POST"])
+def create_export_job(request):
+    """
+    Endpoint: /api/export/jobs
+
+    POST: Start exporting data in the background, for exports that take too long to
+        be returned within a request. If an identical export is in progress or was
+        done recently (and the data has not changed since), it is returned instead.
+        Body parameters are the same as the query parameters of /api/export,
+        except for `preview`.
+
+        Returns the export job (see `export_job`); 201 if a new job was created.
+    """
+    export_type, courses, fields = parse_export_params(request, request.data)
+    if export_row_count(export_type, courses) is None:
+        raise ValidationError("Invalid export type")
+
+    job, created = ExportJob.find_or_create(request.user, export_type, courses, fields)
+    return Response(
+        serialize_export_job(job),
+        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+    )
+
+
+@api_view(["GET"])
+def export_job(request, pk):
+    """
+    Endpoint: /api/export/jobs/<pk>
+
+    GET: Poll the status of an export job.
+        Format of response:
+        {
+            "id": int,
+            "type": str,
+            "courses": int[],
+            "fields": str[],
+            "status": "pending" | "running" | "done" | "failed",
+            "progress": fraction of the rows written, or null if not known yet,
+            "download": url of the CSV file once done, otherwise null
+            "error": str
+        }
+    """
+    job = get_export_job(request, pk)
+    return Response(serialize_export_job(job), status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def download_export_job(request, pk):
+    """
+    Endpoint: /api/export/jobs/<pk>/download
+
+    GET: Returns the CSV file of a finished export job.
+    """
+    job = get_export_job(request, pk)
+    if job.status != ExportJob.Status.DONE:
+        return Response(
+            {"error": "Export is not done yet"}, status=status.HTTP_409_CONFLICT
+        )
+    return FileResponse(
+        job.file.open("rb"),
+        as_attachment=True,
+        filename=job.file.name.rsplit("/", 1)[-1],
+        content_type="text/csv",
+    )
+
+
+def get_export_job(request, pk) -> ExportJob:
+    """
+    Retrieve an export job, checking that the user is a coordinator of all its courses.
+    """
+    job = get_object_or_error(ExportJob.objects.all(), pk=pk)
+    coordinator_courses = set(
+        request.user.coordinator_set.values_list("course__id", flat=True)
+    )
+    if not coordinator_courses.issuperset(job.courses):
+        raise PermissionDenied(
+            "You must be a coordinator for all of the courses in the export"
+        )
+    return job
+
+
+def serialize_export_job(job: ExportJob) -> dict:
+    """Serialize an export job, as returned to clients polling it."""
+    return {
+        "id": job.pk,
+        "type": job.export_type,
+        "courses": job.courses,
+        "fields": job.fields,
+        "status": job.status,
+        "progress": job.progress,
+        "download": (
+            reverse("export-job-download", kwargs={"pk": job.pk})
+            if job.status == ExportJob.Status.DONE
+            else None
+        ),
+        "error": job.error,
+    }
+
+
+def export_row_count(export_type: str, courses: List[int]) -> Optional[int]:
+    """
+    Number of rows (excluding the header) in an export of the courses without preview,
+    used to report the progress of export jobs; None if the export type is invalid.
+    """
+    if export_type in ("ATTENDANCE_DATA", "STUDENT_DATA"):
+        return Student.objects.filter(course__id__in=courses).count()
+    if export_type == "COURSE_DATA":
+        return Course.objects.filter(id__in=courses).count()
+    if export_type == "SECTION_DATA":
+        return Section.objects.filter(mentor__course__id__in=courses).count()
+    return None
+
+
+def run_export_job(job: ExportJob):
+    """
+    Run a claimed export job: write the CSV to a temporary file, recording progress
+    every `EXPORT_JOB_PROGRESS_INTERVAL` rows, then save it to the default storage.
+    """
+    try:
+        ExportJob.objects.filter(pk=job.pk).update(
+            total_rows=export_row_count(job.export_type, job.courses),
+            updated_at=timezone.now(),
+        )
+        csv_generator, filename = prepare_csv(job.export_type, job.courses, job.fields)
+        rows_written = 0
+        with tempfile.TemporaryFile() as file:
+            # the first chunk is the header row
+            for index, chunk in enumerate(csv_generator):
+                file.write(chunk.encode("utf-8"))
+                rows_written = index
+                if index and index % EXPORT_JOB_PROGRESS_INTERVAL == 0:
+                    ExportJob.objects.filter(pk=job.pk).update(
+                        rows_written=rows_written, updated_at=timezone.now()
+                    )
+            file.seek(0)
+            job.refresh_from_db()
+            job.file.save(filename, File(file), save=False)
+        job.rows_written = rows_written
+        job.status = ExportJob.Status.DONE
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        logger.exception("<Export> Export job %s failed", job.pk)
+        job.refresh_from_db()
+        job.status = ExportJob.Status.FAILED
+        job.error = str(exc)
+    job.finished_at = timezone.now()
+    job.save()
+
+
+def parse_export_params(request, params) -> Tuple[str, List[int], List[str]]:
+    """
+    Parse the export type, course ids and fields from the request parameters,
+    checking that the user is a coordinator of every course.
+
+    `courses` and `fields` are comma-separated strings in query parameters,
+    and may also be lists in JSON bodies.
+    """
+    export_type = params.get("type", None)
+    courses_param = params.get("courses", None)
+    fields_param = params.get("fields", "")
+
+    if courses_param is None or export_type is None:
+        raise ValidationError(
+            "Must include `courses` and `type` fields in the query parameters"
+        )
+    if not isinstance(export_type, str):
+        raise ValidationError("`type` must be a string")
+
+    if isinstance(courses_param, str):
+        courses_param = courses_param.split(",")
+    if isinstance(fields_param, str):
+        fields_param = fields_param.split(",")
+
+    # convert courses into a list of ints
+    if not isinstance(courses_param, list) or not all(
+        isinstance(course_id, (int, str)) and not isinstance(course_id, bool)
+        for course_id in courses_param
+    ):
+        raise ValidationError("`courses` must be a list of integers")
+    try:
+        courses = [int(course_id) for course_id in courses_param]
+    except ValueError as exc:
+        raise ValidationError("`courses` must be a list of integers") from exc
+    if not isinstance(fields_param, list) or not all(
+        isinstance(field, str) for field in fields_param
+    ):
+        raise ValidationError("`fields` must be a list of strings")
+    fields = fields_param
+
+    # check course ids against the user's coordinator courses
+    coordinator_courses = set(
+        request.user.coordinator_set.values_list("course__id", flat=True)
+    )
+    courses_set_diff = set(courses).difference(coordinator_courses)
+    if len(courses_set_diff) > 0:
+        raise PermissionDenied(
+            "You must be a coordinator for all of the courses in the request"
+        )
+
+    return export_type, courses, fields
+
+
 def get_section_times_dict(courses: List[int], section_ids: Iterable[int]):
     """
     Query the database for section times data, restricting to the given iterable of section ids.
@@ -263,19 +450,19 @@ def prepare_attendance_data(
         export_headers.append("Mentor name")
     if "num_present" in fields:
         student_queryset = student_queryset.annotate(
-            num_present=Count("attendance", filter=Q(attendance__presence="PR"))
+            num_present=Coalesce("attendance_summary__present_count", 0)
         )
         export_fields.append("num_present")
         export_headers.append("Present count")
     if "num_unexcused" in fields:
         student_queryset = student_queryset.annotate(
-            num_unexcused=Count("attendance", filter=Q(attendance__presence="UN"))
+            num_unexcused=Coalesce("attendance_summary__unexcused_count", 0)
         )
         export_fields.append("num_unexcused")
         export_headers.append("Unexcused count")
     if "num_excused" in fields:
         student_queryset = student_queryset.annotate(
-            num_excused=Count("attendance", filter=Q(attendance__presence="EX"))
+            num_excused=Coalesce("attendance_summary__excused_count", 0)
         )
         export_fields.append("num_excused")
         export_headers.append("Excused count")
@@ -290,12 +477,8 @@ def prepare_attendance_data(
     for student in student_values:
         attendance_ids.update(student["attendance_ids"])
 
-    attendance_queryset = Attendance.objects.filter(
-        id__in=attendance_ids
-    ).select_related("sectionOccurrence")
-
-    attendance_values = attendance_queryset.values(
-        "id", "presence", "sectionOccurrence__date"
+    attendance_values = Attendance.objects.filter(id__in=attendance_ids).values(
+        "id", "presence", "date"
     )
 
     # preprocess to get all possible columns
@@ -303,7 +486,7 @@ def prepare_attendance_data(
     date_set = set()
     for attendance in attendance_values:
         attendance_dict[attendance["id"]] = attendance
-        date_set.add(attendance["sectionOccurrence__date"])
+        date_set.add(attendance["date"])
 
     sorted_dates = sorted(date_set)
 
@@ -326,7 +509,7 @@ def prepare_attendance_data(
                 continue
 
             attendance = attendance_dict[attendance_id]
-            att_date = attendance["sectionOccurrence__date"]
+            att_date = attendance["date"]
             att_presence = attendance["presence"]
 
             row[att_date.isoformat()] = att_presence
@@ -572,21 +755,21 @@ def prepare_student_data(
 
     if "num_present" in fields:
         student_queryset = student_queryset.annotate(
-            num_present=Count("attendance", filter=Q(attendance__presence="PR"))
+            num_present=Coalesce("attendance_summary__present_count", 0)
         )
         export_fields.append("num_present")
         export_qs_fields.append("num_present")
         export_headers.append("Present count")
     if "num_unexcused" in fields:
         student_queryset = student_queryset.annotate(
-            num_unexcused=Count("attendance", filter=Q(attendance__presence="UN"))
+            num_unexcused=Coalesce("attendance_summary__unexcused_count", 0)
         )
         export_fields.append("num_unexcused")
         export_qs_fields.append("num_unexcused")
         export_headers.append("Unexcused count")
     if "num_excused" in fields:
         student_queryset = student_queryset.annotate(
-            num_excused=Count("attendance", filter=Q(attendance__presence="EX"))
+            num_excused=Coalesce("attendance_summary__excused_count", 0)
         )
         export_fields.append("num_excused")
         export_qs_fields.append("num_excused")
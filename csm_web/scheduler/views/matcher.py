@@ -632,6 +632,7 @@ def create(request, pk=None):
 
     # create sections; atomic to create all sections at once
     with transaction.atomic():
+        section_ids = []
         for cur in local_data:
             mentor = Mentor.objects.get(pk=cur["mentor"])
             # create section
@@ -640,6 +641,7 @@ def create(request, pk=None):
                 capacity=cur["section"]["capacity"],
                 description=cur["section"]["description"],
             )
+            section_ids.append(section.pk)
             # create spacetimes
             slot = MatcherSlot.objects.get(pk=cur["slot"])
             for time in slot.times:
@@ -653,6 +655,7 @@ def create(request, pk=None):
                     day_of_week=time["day"],
                     location=DEFAULT_LOCATION,
                 )
+        Section.materialize_occurrences(Section.objects.filter(pk__in=section_ids))
         # close the matcher after sections have been created
         matcher.active = False
         matcher.save()
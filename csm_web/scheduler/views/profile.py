@@ -3,7 +3,7 @@ from .utils import viewset_with
 from django.db.models.query import EmptyQuerySet
 from rest_framework.response import Response
 
-from ..serializers import ProfileSerializer
+from ..fast_serializers import serialize_profiles
 
 
 class ProfileViewSet(*viewset_with("list")):
@@ -11,13 +11,4 @@ class ProfileViewSet(*viewset_with("list")):
     queryset = EmptyQuerySet
 
     def list(self, request):
-        return Response(
-            ProfileSerializer(
-                [
-                    *request.user.student_set.filter(active=True, banned=False),
-                    *request.user.mentor_set.all(),  # .exclude(section=None),
-                    *request.user.coordinator_set.all(),
-                ],
-                many=True,
-            ).data
-        )
+        return Response(serialize_profiles(request.user))
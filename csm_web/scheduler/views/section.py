@@ -1,5 +1,6 @@
 import datetime
 import re
+from collections import Counter
 
 from django.core.exceptions import ValidationError as ModelValidationError
 from django.db import transaction
@@ -9,26 +10,31 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
+from scheduler.fast_serializers import (
+    serialize_attendance_grid,
+    serialize_section_occurrences,
+    serialize_sections,
+    serialize_students,
+)
 from scheduler.models import (
     Attendance,
     Course,
     Mentor,
     Section,
+    SectionFullError,
     SectionOccurrence,
     Spacetime,
     Student,
     User,
+    week_bounds,
 )
-from scheduler.serializers import (
-    SectionOccurrenceSerializer,
-    SectionSerializer,
-    StudentSerializer,
-)
+from scheduler.serializers import SectionSerializer
 
 from .utils import (
     get_object_or_error,
     log_str,
     logger,
+    parse_query_date,
     viewset_with,
     weekday_iso_to_string,
 )
@@ -66,6 +72,15 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
             .distinct()
         )
 
+    def retrieve(self, request, pk=None):
+        """
+        Fetch the section, with the role of the user in it (see `serialize_sections`).
+        """
+        section = get_object_or_error(self.get_queryset().prefetch_related(None), pk=pk)
+        return Response(
+            serialize_sections(Section.objects.filter(pk=section.pk), request.user)[0]
+        )
+
     def create(self, request):
         """
         Handle request to create new section through the UI;
@@ -162,6 +177,7 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                 raise ValidationError(err.error_dict) from err
 
             section.save()
+            Section.materialize_occurrences(Section.objects.filter(pk=section.pk))
 
         serializer = self.serializer_class(section)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -196,15 +212,145 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
         )
         return Response(status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-    @action(detail=True, methods=["get"])
+    @action(detail=True, methods=["get", "put"])
     def attendance(self, request, pk=None):
-        """Fetch all section occurrences for the section"""
-        section = get_object_or_error(self.get_queryset(), pk=pk)
+        """
+        GET: Fetch the section occurrences for the section, with their attendances,
+        within a window of dates.
+        PUT: Record attendance for a section occurrence (see `_attendance_update`)
+
+        GET query parameters:
+        - from, to: first and last date (inclusive, YYYY-MM-DD) of the window;
+          each defaults to the bounds of the current week
+        - all: if true, fetch every section occurrence (ignoring from/to)
+        - layout: "grid" for a compact students x dates grid of presence codes
+          (see `serialize_attendance_grid`), along with the window:
+          {"from": str | null, "to": str | null, "occurrences": [...], "students": [...]}
+        """
+        section = get_object_or_error(
+            self.get_queryset().select_related("mentor__course"), pk=pk
+        )
+        if request.method == "PUT":
+            return self._attendance_update(request, section)
+
+        section_occurrences = section.sectionoccurrence_set.all()
+
+        window_start = window_end = None
+        if request.query_params.get("all", "").lower() not in ("true", "1"):
+            now = timezone.now().astimezone(timezone.get_default_timezone())
+            week_start, week_end = week_bounds(now.date())
+            try:
+                window_start = parse_query_date(request, "from", week_start)
+                window_end = parse_query_date(
+                    request, "to", week_end - datetime.timedelta(days=1)
+                )
+            except ValueError as error:
+                return Response(
+                    {"error": str(error)}, status=status.HTTP_400_BAD_REQUEST
+                )
+            section_occurrences = section_occurrences.filter(
+                date__gte=window_start, date__lte=window_end
+            )
+
+        if request.query_params.get("layout") == "grid":
+            return Response(
+                {
+                    "from": window_start,
+                    "to": window_end,
+                    **serialize_attendance_grid(section_occurrences),
+                }
+            )
+
         return Response(
-            SectionOccurrenceSerializer(
-                section.sectionoccurrence_set.all(), many=True
-            ).data
+            serialize_section_occurrences(
+                section_occurrences, section.mentor.course.word_of_the_day_limit
+            )
+        )
+
+    def _attendance_update(self, request, section):
+        """
+        Records the attendance of many students at a section occurrence at once,
+        as the section's mentor or a coordinator of its course.
+
+        Request format:
+            {
+                "section_occurrence_id": int,
+                "attendances": [{"student_id": int, "presence": str}, ...]
+            }
+            where presence is one of "PR", "UN", "EX" or "" (not yet taken)
+
+        All of the attendances are updated in a single query, or none are:
+        responds with 400 if the request is invalid, or if some of the students
+        have no attendance for the section occurrence.
+        """
+        is_mentor = section.mentor.user_id == request.user.pk
+        if (
+            not is_mentor
+            and not section.mentor.course.coordinator_set.filter(
+                user=request.user
+            ).exists()
+        ):
+            raise PermissionDenied(
+                "Only the section's mentor or a coordinator can record attendance"
+            )
+
+        section_occurrence_id = request.data.get("section_occurrence_id")
+        attendances = request.data.get("attendances")
+        if not isinstance(section_occurrence_id, int) or not isinstance(
+            attendances, list
+        ):
+            return Response(
+                {"error": "Must specify section_occurrence_id and attendances"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not section.sectionoccurrence_set.filter(pk=section_occurrence_id).exists():
+            return Response(
+                {"error": "Section occurrence is not in this section"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        presences = {}
+        valid_presences = {"", *Attendance.Presence.values}
+        for attendance in attendances:
+            if (
+                not isinstance(attendance, dict)
+                or not isinstance(attendance.get("student_id"), int)
+                or attendance.get("presence") not in valid_presences
+            ):
+                return Response(
+                    {"error": f"Invalid attendance {attendance}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            presences[attendance["student_id"]] = attendance["presence"]
+
+        with transaction.atomic():
+            updated = Attendance.mark_presences(section_occurrence_id, presences)
+            missing = sorted(presences.keys() - updated)
+            if missing:
+                transaction.set_rollback(True)
+                logger.error(
+                    "<Attendance:Failure> Could not record attendance for User %s,"
+                    " students %s have no attendance for SectionOccurrence %s",
+                    log_str(request.user),
+                    missing,
+                    section_occurrence_id,
+                )
+                return Response(
+                    {
+                        "error": "Some students have no attendance for this occurrence",
+                        "student_ids": missing,
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        logger.info(
+            "<Attendance:Success> %s attendances for SectionOccurrence %s recorded by"
+            " User %s",
+            len(updated),
+            section_occurrence_id,
+            log_str(request.user),
         )
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=["get", "put"])
     def students(self, request, pk=None):
@@ -277,36 +423,36 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
         """
         if request.method == "GET":
             section = get_object_or_error(self.get_queryset(), pk=pk)
-            return Response(
-                StudentSerializer(
-                    section.students.select_related("user")
-                    # , queryset=Attendance.objects.order_by("date")
-                    .prefetch_related(Prefetch("attendance_set")).filter(active=True),
-                    many=True,
-                ).data
-            )
+            return Response(serialize_students(section.students.filter(active=True)))
         # PUT
+        section = get_object_or_error(
+            Section.objects.select_related("mentor__course"), pk=pk
+        )
+        is_coordinator = section.mentor.course.coordinator_set.filter(
+            user=request.user
+        ).exists()
+        if not is_coordinator:
+            # students never lock the section; seats are claimed atomically instead
+            return self._student_add(request, section)
+
         with transaction.atomic():
-            # We reload the section object for atomicity. Even though we do not update
-            # the section directly, any student trying to enroll must first acquire a lock on the
-            # desired section. This allows us to assume that current_student_count is correct.
-            section = get_object_or_error(Section.objects, pk=pk)
+            # We reload the section object for atomicity. Coordinators may enroll many
+            # students at once, so they must first acquire a lock on the desired section.
+            # This allows us to assume that current_student_count is correct.
             section = (
                 Section.objects.select_for_update()
-                .prefetch_related("mentor__course")
+                .prefetch_related("mentor__course", "spacetimes")
                 .get(pk=section.pk)
             )
-            is_coordinator = bool(
-                section.mentor.course.coordinator_set.filter(user=request.user).count()
-            )
-
-            if is_coordinator:
-                return self._coordinator_add(request, section)
-            return self._student_add(request, section)
+            return self._coordinator_add(request, section)
 
     def _coordinator_add(self, request, section):
         """
         Adds a list of students as a coordinator.
+
+        Users, existing student profiles, whitelist entries and mentor profiles for all
+        of the emails are resolved up front in a constant number of queries, and the
+        enrollment itself is applied with bulk queries, regardless of the roster size.
         """
 
         class Status:
@@ -340,6 +486,7 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
             WHITELIST = "WHITELIST"
 
         data = request.data
+        course = section.mentor.course
 
         if not data.get("emails"):
             return Response(
@@ -383,25 +530,24 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                     "capacity"
                 ] = "There is no space available in this section"
 
-        statuses = []  # status for each email
-        # set of coord users (contains user ids)
-        course_coords = section.mentor.course.coordinator_set.values_list(
-            "user", flat=True
-        )
+        # get all students with the emails in the course; the rows are locked so that
+        # they can't be dropped or enrolled elsewhere until we're done with them
+        students_by_email = {}
+        for student in (
+            Student.objects.select_for_update(of=("self",))
+            .select_related("user", "section__mentor__course")
+            .prefetch_related("section__spacetimes")
+            .filter(course=course, user__email__in=email_set)
+        ):
+            students_by_email.setdefault(student.user.email, []).append(student)
 
-        # Phase 1: go through emails and check for validity/conflicts
         for email_obj in emails:
             email = email_obj["email"]
-            curstatus = {"email": email}
-            # check to see if the student can be added
-
-            # get all students with the email in the course
-            student_queryset = Student.objects.filter(
-                course=section.mentor.course, user__email=email
-            )
-
-            if student_queryset.count() > 1:
+            if len(students_by_email.get(email, ())) > 1:
                 # something bad happened, return immediately with error
+                student_queryset = Student.objects.filter(
+                    course=course, user__email=email
+                )
                 logger.error(
                     "<Enrollment:Critical> Multiple student objects exist in the"
                     " database (Students %s)!",
@@ -418,16 +564,68 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                     },
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 )
-            if student_queryset.count() == 0:
-                # check if the user can actually enroll in the section
-                student_user, _ = User.objects.get_or_create(
-                    username=email.split("@")[0], email=email
+
+        # users for emails without a student profile in the course,
+        # creating the users that do not exist yet
+        new_emails = [email for email in email_set if email not in students_by_email]
+        users = {
+            (user.username, user.email): user
+            for user in User.objects.filter(email__in=new_emails)
+        }
+        users.update(
+            {
+                (user.username, user.email): user
+                for user in User.objects.bulk_create(
+                    User(username=email.split("@")[0], email=email)
+                    for email in new_emails
+                    if (email.split("@")[0], email) not in users
+                )
+            }
+        )
+        user_by_email = {
+            email: users[(email.split("@")[0], email)] for email in new_emails
+        }
+
+        # set of coord users (contains user ids)
+        course_coords = set(course.coordinator_set.values_list("user", flat=True))
+        # set of whitelisted users among all of the users involved (contains user ids)
+        involved_user_ids = {user.pk for user in user_by_email.values()} | {
+            students[0].user_id for students in students_by_email.values()
+        }
+        whitelisted = (
+            set(
+                course.whitelist.filter(pk__in=involved_user_ids).values_list(
+                    "pk", flat=True
                 )
+            )
+            if course.is_restricted
+            else involved_user_ids
+        )
+        # map from mentor user id to whether they are mentoring a section in the course
+        course_mentors = {}
+        for user_id, mentor_section in Mentor.objects.filter(
+            course=course, user__in=user_by_email.values()
+        ).values_list("user", "section"):
+            course_mentors[user_id] = (
+                course_mentors.get(user_id, False) or mentor_section is not None
+            )
+
+        statuses = []  # status for each email
+        conflicts = []  # (status, section id) for students enrolled in another section
+
+        # Phase 1: go through emails and check for validity/conflicts
+        for email_obj in emails:
+            email = email_obj["email"]
+            curstatus = {"email": email}
+            # check to see if the student can be added
+
+            if email not in students_by_email:
+                # check if the user can actually enroll in the section
+                student_user = user_by_email[email]
                 if (
                     student_user.id not in course_coords
-                    and student_user.can_enroll_in_course(
-                        section.mentor.course, bypass_enrollment_time=True
-                    )
+                    and student_user.id in whitelisted
+                    and not course_mentors.get(student_user.id, False)
                 ):
                     # student does not exist yet; we can always create it
                     db_actions.append(("create", email))
@@ -435,7 +633,7 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                 else:
                     # user can't enroll; give details on the reason why
                     curstatus["status"] = Status.CONFLICT
-                    if not student_user.is_whitelisted_for(section.mentor.course):
+                    if student_user.id not in whitelisted:
                         if (
                             email_obj.get("restricted_action")
                             == RestrictedAction.WHITELIST
@@ -450,13 +648,11 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                         reason = "other"
                         if student_user.id in course_coords:
                             reason = "coordinator"
-                        elif student_user.mentor_set.filter(
-                            course=section.mentor.course
-                        ).exists():
+                        elif student_user.id in course_mentors:
                             reason = "mentor"
                         curstatus["detail"] = {"reason": reason}
-            else:  # student_queryset.count() == 1
-                student = student_queryset.get()
+            else:  # exactly one student in the course
+                student = students_by_email[email][0]
 
                 if student.active:
                     # active student already exists
@@ -467,9 +663,7 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                     else:  # no response, give warning
                         any_invalid = True
                         curstatus["status"] = Status.CONFLICT
-                        curstatus["detail"] = {
-                            "section": SectionSerializer(student.section).data
-                        }
+                        conflicts.append((curstatus, student.section_id))
                 elif student.banned:
                     # check if there is a response
                     if email_obj.get("ban_action") == BanAction.UNBAN_SKIP:
@@ -486,7 +680,7 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                 else:
                     # student is inactive (i.e. they've dropped a section)
                     if (
-                        not student.user.is_whitelisted_for(student.course)
+                        student.user_id not in whitelisted
                         and email_obj.get("restricted_action")
                         != RestrictedAction.WHITELIST
                     ):
@@ -497,106 +691,107 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                         curstatus["status"] = Status.OK
             statuses.append(curstatus)
 
+        if conflicts:
+            # serialize all of the conflicting sections at once
+            conflict_sections = (
+                Section.objects.select_related("mentor__user", "mentor__course")
+                .prefetch_related(
+                    Prefetch(
+                        "spacetimes",
+                        queryset=Spacetime.objects.select_related(
+                            "_override__spacetime"
+                        ),
+                    )
+                )
+                .in_bulk({section_id for _, section_id in conflicts})
+            )
+            for curstatus, section_id in conflicts:
+                curstatus["detail"] = {
+                    "section": SectionSerializer(conflict_sections[section_id]).data
+                }
+
         if any_invalid:
             # stop early and return the warnings
             response["progress"] = statuses
             return Response(response, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-        # Phase 2: everything's good to go; do the database actions
-        expand_capacity = False
-        for db_action in db_actions:
-            action_type, obj = db_action
-            if action_type == "capacity":
-                if obj == CapacityAction.EXPAND:
-                    # expand after we've enrolled everybody so we know how many we're enrolling
-                    expand_capacity = True
-            elif action_type == "create":  # obj=email, type str
-                email = obj
-                # create student
-                user, _ = User.objects.get_or_create(
-                    email=email, username=email.split("@")[0]
-                )
-                # whitelist if necessary
-                if section.mentor.course.is_restricted:
-                    section.mentor.course.whitelist.add(user)
-                student = Student.objects.create(
-                    user=user, section=section, course=section.mentor.course
-                )
-                # generate new attendance objects for this student
-                # in all section occurrences past this date
-                now = timezone.now().astimezone(timezone.get_default_timezone())
-                future_section_occurrences = section.sectionoccurrence_set.filter(
-                    Q(date__gte=now.date())
-                )
-                for section_occurrence in future_section_occurrences:
-                    att, created = Attendance.objects.get_or_create(
-                        student=student,
-                        sectionOccurrence=section_occurrence,
-                    )
-                    if created:
-                        att.presence = ""
-                        att.save()
-                logger.info(
-                    "<Enrollment> Created %s new attendances for user %s in Section %s",
-                    len(future_section_occurrences),
-                    log_str(student.user),
-                    log_str(section),
-                )
-                student.save()
-                logger.info(
-                    "<Enrollment:Success> User %s enrolled in Section %s",
-                    log_str(student.user),
-                    log_str(section),
-                )
-            elif action_type in ("enroll", "unban_enroll"):  # obj=student, type Student
-                student = obj
-                if action_type == "unban_enroll":  # unban student first
-                    student.banned = False
-                # enroll student
-                old_section = student.section
-                student.section = section
-                student.active = True
-                # whitelist if not already
-                if not student.user.is_whitelisted_for(student.course):
-                    student.course.whitelist.add(student.user)
-                # generate new attendance objects for this student
-                # in all section occurrences past this date
-                now = timezone.now().astimezone(timezone.get_default_timezone())
-                future_section_occurrences = section.sectionoccurrence_set.filter(
-                    Q(date__gte=now.date())
-                )
-                for section_occurrence in future_section_occurrences:
-                    att, created = Attendance.objects.get_or_create(
-                        student=student,
-                        sectionOccurrence=section_occurrence,
-                    )
-                    if created:
-                        att.presence = ""
-                        att.save()
-                logger.info(
-                    "<Enrollment> Created %s new attendances for user %s in Section %s",
-                    len(future_section_occurrences),
-                    log_str(student.user),
-                    log_str(section),
-                )
-                student.save()
-                logger.info(
-                    "<Enrollment:Success> User %s swapped into Section %s from"
-                    " Section %s",
-                    log_str(student.user),
-                    log_str(section),
-                    log_str(old_section),
-                )
-            elif action_type == "unban":  # obj=student, type Student
-                student = obj
-                # unban student
-                student.banned = False
-                student.save()
+        # Phase 2: everything's good to go; do the database actions in bulk
+        # expand after we've enrolled everybody so we know how many we're enrolling
+        expand_capacity = ("capacity", CapacityAction.EXPAND) in db_actions
+        create_users = [
+            user_by_email[obj]
+            for action_type, obj in db_actions
+            if action_type == "create"
+        ]
+        enroll_students = [
+            obj
+            for action_type, obj in db_actions
+            if action_type in ("enroll", "unban_enroll")
+        ]
+        unban_students = [
+            obj
+            for action_type, obj in db_actions
+            if action_type in ("unban", "unban_enroll")
+        ]
+
+        # whitelist if necessary
+        if course.is_restricted:
+            course.whitelist.add(
+                *create_users, *(student.user for student in enroll_students)
+            )
 
-        if expand_capacity:
-            section.capacity = max(
-                section.capacity, section.students.filter(active=True).count()
+        # create students; bulk creation bypasses Student.save,
+        # so seat counts and attendances are handled below
+        created_students = Student.objects.bulk_create(
+            Student(user=user, section=section, course=course) for user in create_users
+        )
+
+        # enroll students (includes drop & enroll)
+        section_deltas = Counter({section.pk: len(created_students)})
+        old_sections = {}
+        for student in enroll_students:
+            old_sections[student.pk] = student.section
+            if student.active:
+                section_deltas[student.section_id] -= 1
+            section_deltas[section.pk] += 1
+            student.section = section
+            student.active = True
+        Student.objects.filter(
+            pk__in=[student.pk for student in enroll_students]
+        ).update(section=section, active=True)
+        Student.objects.filter(
+            pk__in=[student.pk for student in unban_students]
+        ).update(banned=False)
+        Section.adjust_enrolled_counts(section_deltas)
+
+        # generate attendances for the remainder of this week, as for students
+        # enrolling themselves; later weeks are created by the weekly job
+        enrolled_students = [*created_students, *enroll_students]
+        num_attendances = Student.create_current_week_attendances(enrolled_students)
+
+        for student in created_students:
+            logger.info(
+                "<Enrollment:Success> User %s enrolled in Section %s",
+                log_str(student.user),
+                log_str(section),
+            )
+        for student in enroll_students:
+            logger.info(
+                "<Enrollment:Success> User %s swapped into Section %s from Section %s",
+                log_str(student.user),
+                log_str(section),
+                log_str(old_sections[student.pk]),
             )
+        logger.info(
+            "<Enrollment> Created %s new attendances for %s users in Section %s",
+            num_attendances,
+            len(enrolled_students),
+            log_str(section),
+        )
+
+        if expand_capacity:
+            section.refresh_from_db(fields=["enrolled_count"])
+            section.capacity = max(section.capacity, section.enrolled_count)
             section.save()
 
         return Response(status=status.HTTP_200_OK)
@@ -604,7 +799,21 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
     def _student_add(self, request, section):
         """
         Adds a student to a section (initiated by a student)
+
+        No lock is taken on the section while checking eligibility; the seat is claimed
+        with a single conditional UPDATE on the section's seat counter as the last
+        statement of the enrollment transaction, so the section can never be overbooked.
+
+        Enrollments of the same user (e.g. a double submission) are serialized by locking
+        the user's row, so that only the first one passes the eligibility check.
         """
+        with transaction.atomic():
+            User.objects.select_for_update().filter(pk=request.user.pk).exists()
+            return self._student_add_locked(request, section)
+
+    def _student_add_locked(self, request, section):
+        """Adds a student to a section, holding the lock on the user."""
+        # eligibility is loaded after taking the lock, to see concurrent enrollments
         if not request.user.can_enroll_in_course(section.mentor.course):
             logger.warning(
                 "<Enrollment:Failure> User %s was unable to enroll in Section %s"
@@ -617,16 +826,9 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                 " section, or the course is closed for enrollment",
                 status.HTTP_422_UNPROCESSABLE_ENTITY,
             )
-        if section.current_student_count >= section.capacity:
-            logger.warning(
-                "<Enrollment:Failure> User %s was unable to enroll in Section %s"
-                " because it was full",
-                log_str(request.user),
-                log_str(section),
-            )
-            raise PermissionDenied(
-                "There is no space available in this section", status.HTTP_423_LOCKED
-            )
+        if section.enrolled_count >= section.capacity:
+            # cheap early exit; the seat claim below is the authoritative check
+            return self._section_full_response(request, section)
 
         student_queryset = request.user.student_set.filter(
             active=False, course=section.mentor.course
@@ -648,23 +850,11 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
             old_section = student.section
             student.section = section
             student.active = True
-            # generate new attendance objects for this student
-            # in all section occurrences past this date
-            now = timezone.now().astimezone(timezone.get_default_timezone())
-            future_section_occurrences = section.sectionoccurrence_set.filter(
-                Q(date__gte=now.date())
-            )
-            for section_occurrence in future_section_occurrences:
-                Attendance(
-                    student=student, sectionOccurrence=section_occurrence, presence=""
-                ).save()
-            logger.info(
-                "<Enrollment> Created %s new attendances for user %s in Section %s",
-                len(future_section_occurrences),
-                log_str(student.user),
-                log_str(section),
-            )
-            student.save()
+            try:
+                # saving the student creates the attendances of the remainder of the week
+                student.save(enforce_capacity=True)
+            except SectionFullError:
+                return self._section_full_response(request, section)
             logger.info(
                 "<Enrollment:Success> User %s swapped into Section %s from Section %s",
                 log_str(student.user),
@@ -674,9 +864,13 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         # student_queryset.count() == 0
-        student = Student.objects.create(
+        student = Student(
             user=request.user, section=section, course=section.mentor.course
         )
+        try:
+            student.save(enforce_capacity=True)
+        except SectionFullError:
+            return self._section_full_response(request, section)
         logger.info(
             "<Enrollment:Success> User %s enrolled in Section %s",
             log_str(student.user),
@@ -684,6 +878,19 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
         )
         return Response({"id": student.id}, status=status.HTTP_201_CREATED)
 
+    def _section_full_response(self, request, section):
+        """Log and respond to a student enrollment into a full section."""
+        logger.warning(
+            "<Enrollment:Failure> User %s was unable to enroll in Section %s"
+            " because it was full",
+            log_str(request.user),
+            log_str(section),
+        )
+        return Response(
+            {"detail": "There is no space available in this section"},
+            status=status.HTTP_423_LOCKED,
+        )
+
     @action(detail=True, methods=["get", "put"])
     def wotd(self, request, pk=None):
         """
@@ -700,6 +907,22 @@ class SectionViewSet(*viewset_with("retrieve", "partial_update", "create")):
                 { id: int, word: string }
                 where "id" is the section occurrence id
         """
+        if request.method == "PUT":
+            # fast path for students submitting the word of the day, which tends to
+            # happen for the whole section at once; anything it rejects goes through
+            # the checks below to produce the appropriate error response
+            attendance_pk = request.data.get("attendance_id", None)
+            submitted_word = request.data.get("word_of_the_day", None)
+            if (
+                isinstance(attendance_pk, int)
+                and isinstance(submitted_word, str)
+                and submitted_word.strip()
+                and Attendance.submit_word_of_the_day(
+                    request.user, pk, attendance_pk, submitted_word.lower().strip()
+                )
+            ):
+                return Response({}, status=status.HTTP_200_OK)
+
         section = get_object_or_error(Section.objects, pk=pk)
         course = section.mentor.course
 
@@ -2,13 +2,12 @@ import datetime
 
 from django.db import transaction
 from django.db.models import Q
-from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 
-from ..models import Spacetime
+from ..models import Section, Spacetime
 from ..serializers import OverrideSerializer
 from .utils import get_object_or_error, log_str, logger, weekday_iso_to_string
 
@@ -56,17 +55,11 @@ class SpacetimeViewSet(viewsets.GenericViewSet):
                 data={"error": "Only one spacetime left!"},
             )
 
-        now = timezone.now().astimezone(timezone.get_default_timezone())
-
-        # FIX ME: Once issue #303 is resolved, this should delete
-        # the directly related section occurences
-        future_section_occurrences = section.sectionoccurrence_set.filter(
-            date__gte=now.date(), date__week_day=spacetime.day_number()
-        )
-
+        # rematerializing deletes the spacetime's upcoming section occurrences,
+        # unless attendance was already taken
         with transaction.atomic():
             spacetime.delete()
-            future_section_occurrences.delete()
+            Section.materialize_occurrences(Section.objects.filter(pk=section.pk))
 
         logger.info(
             "<Spacetime Deletion:Success> Deleted Spacetime %s",
@@ -93,8 +86,12 @@ class SpacetimeViewSet(viewsets.GenericViewSet):
                 request.data.get("day_of_week")
             )
 
-        # validate and save
-        spacetime.save()
+        # validate and save, then move the upcoming section occurrences
+        with transaction.atomic():
+            spacetime.save()
+            Section.materialize_occurrences(
+                Section.objects.filter(pk=spacetime.section_id)
+            )
         logger.info(
             "<Spacetime:Success> Modified Spacetime %s (previously %s)",
             log_str(spacetime),
@@ -118,7 +115,11 @@ class SpacetimeViewSet(viewsets.GenericViewSet):
                 )
                 status_code = status.HTTP_201_CREATED
             if serializer.is_valid():
-                override = serializer.save()
+                with transaction.atomic():
+                    override = serializer.save()
+                    Section.materialize_occurrences(
+                        Section.objects.filter(pk=spacetime.section_id)
+                    )
                 logger.info(
                     "<Override:Success> Overrode Spacetime %s with Override %s",
                     log_str(spacetime),
@@ -155,7 +156,11 @@ class SpacetimeViewSet(viewsets.GenericViewSet):
 
             if hasattr(spacetime, "_override"):
                 override = spacetime._override  # pylint: disable=protected-access
-                override.delete()
+                with transaction.atomic():
+                    override.delete()
+                    Section.materialize_occurrences(
+                        Section.objects.filter(pk=spacetime.section_id)
+                    )
 
             logger.info(
                 "<Override Deletion:Success> Deleted override for %s",
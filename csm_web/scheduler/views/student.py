@@ -49,7 +49,7 @@ class StudentViewSet(viewsets.GenericViewSet):
         now = timezone.now().astimezone(timezone.get_default_timezone())
         num_deleted, _ = student.attendance_set.filter(
             Q(
-                sectionOccurrence__date__gte=now.date(),
+                date__gte=now.date(),
                 sectionOccurrence__section=student.section,
             )
         ).delete()
@@ -63,7 +63,13 @@ class StudentViewSet(viewsets.GenericViewSet):
         student = get_object_or_error(self.get_queryset(), pk=pk)
         if request.method == "GET":
             return Response(
-                AttendanceSerializer(student.attendance_set.all(), many=True).data
+                AttendanceSerializer(
+                    student.attendance_set.all(),
+                    many=True,
+                    context={
+                        "word_of_the_day_limit": student.course.word_of_the_day_limit
+                    },
+                ).data
             )
         # PUT
         if student.user == self.request.user:
@@ -1,10 +1,23 @@
+import datetime
+import json
 import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from decimal import Decimal
 from operator import attrgetter
 from typing import Any
 
 from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
+from django.utils.dateparse import (
+    parse_date,
+    parse_datetime,
+    parse_duration,
+    parse_time,
+)
 from rest_framework import mixins, viewsets
+from rest_framework.exceptions import ValidationError
 from scheduler.models import (
     Attendance,
     DayOfWeekField,
@@ -43,7 +56,7 @@ def log_str(obj) -> str:
         if isinstance(obj, Override):
             return log_format("pk", "date", "spacetime.pk")
         if isinstance(obj, Attendance):
-            return log_format("pk", "sectionOccurrence.date", "presence")
+            return log_format("pk", "date", "presence")
     except Exception as error:  # pylint: disable=broad-exception-caught
         # we want to catch all exceptions here, since logging shouldn't break the application;
         # any exceptions raised during logging should just be logged and ignored
@@ -94,3 +107,144 @@ def weekday_iso_to_string(day_of_week: int) -> str:
     Convert a weekday int (in ISO format, where Monday = 1) into a string
     """
     return DayOfWeekField.DAYS[day_of_week - 1]
+
+
+def parse_query_date(request, name: str, default: datetime.date) -> datetime.date:
+    """
+    Parse a YYYY-MM-DD date from the query parameters of the request,
+    or return the default if it is not given; raises a ValueError if it is invalid.
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError as error:
+        raise ValueError(f"Invalid date for {name}; expected YYYY-MM-DD") from error
+
+
+# page size of keyset paginated lists, if the `limit` query parameter is not given
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+# sort keys that JSON cannot represent are encoded by `DjangoJSONEncoder`, and tagged
+# with their type in the cursor to be decoded; datetimes are checked before dates,
+# as they are instances of both
+CURSOR_KEY_TYPES = (
+    ("datetime", datetime.datetime, parse_datetime),
+    ("date", datetime.date, parse_date),
+    ("time", datetime.time, parse_time),
+    ("duration", datetime.timedelta, parse_duration),
+    ("decimal", Decimal, Decimal),
+)
+
+
+def encode_cursor(sort: str, key, pk) -> str:
+    """
+    Encode the sort and the sort key and id of the last row of a page
+    as an opaque cursor.
+    """
+    key_type = next(
+        (name for name, cls, _ in CURSOR_KEY_TYPES if isinstance(key, cls)), None
+    )
+    return urlsafe_b64encode(
+        json.dumps([sort, key_type, key, pk], cls=DjangoJSONEncoder).encode()
+    ).decode()
+
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    Decode a cursor from `encode_cursor` into the sort key (which may be None)
+    and id, checking that it was made for the same sort.
+    """
+    decoders = {name: decode for name, _, decode in CURSOR_KEY_TYPES}
+    try:
+        cursor_sort, key_type, key, pk = json.loads(urlsafe_b64decode(cursor.encode()))
+        if key_type is not None:
+            key = decoders[key_type](key)
+            if key is None:
+                raise ValueError("Invalid sort key")
+    except (ValueError, TypeError, KeyError, ArithmeticError) as error:
+        raise ValidationError({"error": "Invalid cursor"}) from error
+    if cursor_sort != sort or not isinstance(pk, int):
+        raise ValidationError({"error": "Invalid cursor"})
+    if key_type is None and not isinstance(key, (str, int, float, type(None))):
+        raise ValidationError({"error": "Invalid cursor"})
+    return key, pk
+
+
+def search_sort_paginate(
+    request, queryset, sort_fields: dict, search_fields: list, default_sort: str
+):
+    """
+    Filter, sort and paginate a queryset from the query parameters of the request:
+    - `search`: only keep rows where every whitespace-separated term is contained
+      (case-insensitively) in one of `search_fields`
+    - `sort`: one of the keys of `sort_fields` (which maps to the field or annotation
+      to sort by), optionally prefixed with "-" for descending order; ties are broken
+      by id, so the order is stable, and rows without a value come last either way
+    - `limit`/`cursor`: keyset pagination; if either is given, at most `limit` rows
+      after the `cursor` (from the previous page) are returned, and the cursor of the
+      next page is returned along with them
+
+    Returns (queryset, next cursor, whether the list is paginated); the next cursor
+    is None if there are no more rows. Invalid parameters raise a ValidationError.
+    """
+    params = request.query_params
+
+    for term in params.get("search", "").split():
+        term_filter = Q()
+        for field in search_fields:
+            term_filter |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(term_filter)
+
+    sort = params.get("sort", default_sort)
+    descending = sort.startswith("-")
+    sort_field = sort_fields.get(sort.removeprefix("-"))
+    if sort_field is None:
+        raise ValidationError(
+            {"error": f"Invalid sort; expected one of {', '.join(sort_fields)}"}
+        )
+    queryset = queryset.order_by(
+        *(
+            (
+                F(field).desc(nulls_last=True)
+                if descending
+                else F(field).asc(nulls_last=True)
+            )
+            for field in (sort_field, "pk")
+        )
+    )
+
+    if "limit" not in params and "cursor" not in params:
+        return queryset, None, False
+
+    try:
+        limit = int(params.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError as error:
+        raise ValidationError({"error": "Invalid limit"}) from error
+    if not 0 < limit <= MAX_PAGE_SIZE:
+        raise ValidationError({"error": f"Limit must be between 1 and {MAX_PAGE_SIZE}"})
+
+    if params.get("cursor"):
+        key, pk = decode_cursor(params["cursor"], sort)
+        comparison = "lt" if descending else "gt"
+        after_key = Q(**{f"{sort_field}__isnull": True, f"pk__{comparison}": pk})
+        if key is not None:
+            # rows without a value come after all the others
+            after_key |= (
+                Q(**{f"{sort_field}__{comparison}": key})
+                | Q(**{sort_field: key, f"pk__{comparison}": pk})
+                | Q(**{f"{sort_field}__isnull": True})
+            )
+        queryset = queryset.filter(after_key)
+
+    # fetch one more row than needed to know whether there is a next page
+    keys = list(queryset.values_list(sort_field, "pk")[: limit + 1])
+    next_cursor = encode_cursor(sort, *keys[limit - 1]) if len(keys) > limit else None
+    return (
+        queryset.filter(pk__in=[pk for _, pk in keys[:limit]]),
+        next_cursor,
+        True,
+    )
@@ -1,4 +1,6 @@
 #!/usr/bin/env bash
 
 python3 csm_web/manage.py migrate
+python3 csm_web/manage.py createcachetable
+python3 csm_web/manage.py manage_partitions
 exec python3 csm_web/manage.py runserver 0.0.0.0:8000
@@ -1,2 +1,4 @@
 #!/usr/bin/env sh
 python3 csm_web/manage.py migrate
+python3 csm_web/manage.py createcachetable
+python3 csm_web/manage.py manage_partitions